@@ -0,0 +1,187 @@
+"""oid profiles compartilhados
+
+Revision ID: 674705c03aa0
+Revises: 5ed6e2ec0454
+Create Date: 2026-10-19 09:12:40.518233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '674705c03aa0'
+down_revision: Union[str, Sequence[str], None] = '5ed6e2ec0454'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Cópia de api/oid_profiles.py no momento desta revisão
+OID_FIELDS = (
+    "sysDescr", "sysName", "sysUpTime", "hrProcessorLoad",
+    "memTotalReal", "memAvailReal", "hrStorageSize", "hrStorageUsed",
+    "hrStorageDescr", "ifOperStatus", "ifInOctets", "ifOutOctets"
+)
+
+DEFAULT_OID_PROFILE = "linux-net-snmp"
+
+DEFAULT_OID_PROFILES = {
+    "linux-net-snmp": {
+        "description": "Servidores Linux com net-snmp (HOST-RESOURCES-MIB e UCD-SNMP-MIB)",
+        "sysDescr": "1.3.6.1.2.1.1.1.0",
+        "sysName": "1.3.6.1.2.1.1.5.0",
+        "sysUpTime": "1.3.6.1.2.1.1.3.0",
+        "hrProcessorLoad": "1.3.6.1.2.1.25.3.3.1.2",
+        "memTotalReal": "1.3.6.1.4.1.2021.4.5.0",
+        "memAvailReal": "1.3.6.1.4.1.2021.4.6.0",
+        "hrStorageSize": "1.3.6.1.2.1.25.2.3.1.5",
+        "hrStorageUsed": "1.3.6.1.2.1.25.2.3.1.6",
+        "hrStorageDescr": "1.3.6.1.2.1.25.2.3.1.3",
+        "ifOperStatus": "1.3.6.1.2.1.2.2.1.8",
+        "ifInOctets": "1.3.6.1.2.1.2.2.1.10",
+        "ifOutOctets": "1.3.6.1.2.1.2.2.1.16",
+    },
+    "cisco-ios": {
+        "description": "Roteadores e switches Cisco IOS (CISCO-PROCESS-MIB e IF-MIB)",
+        "sysDescr": "1.3.6.1.2.1.1.1.0",
+        "sysName": "1.3.6.1.2.1.1.5.0",
+        "sysUpTime": "1.3.6.1.2.1.1.3.0",
+        "hrProcessorLoad": "1.3.6.1.4.1.9.9.109.1.1.1.1.8",
+        "memTotalReal": None,
+        "memAvailReal": None,
+        "hrStorageSize": None,
+        "hrStorageUsed": None,
+        "hrStorageDescr": None,
+        "ifOperStatus": "1.3.6.1.2.1.2.2.1.8",
+        "ifInOctets": "1.3.6.1.2.1.31.1.1.1.6",
+        "ifOutOctets": "1.3.6.1.2.1.31.1.1.1.10",
+    },
+}
+
+# Mesma consulta da view de api/models.py (ENDPOINT_OIDS_VIEW_DDL) no momento desta revisão
+ENDPOINT_OIDS_SELECT = """SELECT e.id AS id, e.id AS id_end_point,
+        """ + ",\n        ".join(f'COALESCE(o."{field}", p."{field}") AS "{field}"' for field in OID_FIELDS) + """
+    FROM endpoints e
+    LEFT JOIN oid_profiles p ON p.id = e.id_oid_profile
+    LEFT JOIN endpoint_oid_overrides o ON o.id_end_point = e.id
+    WHERE p.id IS NOT NULL OR o.id IS NOT NULL"""
+
+
+oid_profiles = sa.table(
+    'oid_profiles',
+    sa.column('id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('description', sa.Text),
+    *[sa.column(field, sa.String) for field in OID_FIELDS]
+)
+endpoints = sa.table(
+    'endpoints',
+    sa.column('id', sa.Integer),
+    sa.column('id_oid_profile', sa.Integer)
+)
+endpoints_oids = sa.table(
+    'endpoints_oids',
+    sa.column('id_end_point', sa.Integer),
+    *[sa.column(field, sa.String) for field in OID_FIELDS]
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('oid_profiles',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('sysDescr', sa.Text(), nullable=True),
+    sa.Column('sysName', sa.String(), nullable=True),
+    sa.Column('sysUpTime', sa.String(), nullable=True),
+    sa.Column('hrProcessorLoad', sa.String(), nullable=True),
+    sa.Column('memTotalReal', sa.String(), nullable=True),
+    sa.Column('memAvailReal', sa.String(), nullable=True),
+    sa.Column('hrStorageSize', sa.String(), nullable=True),
+    sa.Column('hrStorageUsed', sa.String(), nullable=True),
+    sa.Column('hrStorageDescr', sa.String(), nullable=True),
+    sa.Column('ifOperStatus', sa.String(), nullable=True),
+    sa.Column('ifInOctets', sa.String(), nullable=True),
+    sa.Column('ifOutOctets', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('endpoints') as batch_op:
+        batch_op.add_column(sa.Column('id_oid_profile', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_endpoints_oid_profile', 'oid_profiles', ['id_oid_profile'], ['id'])
+    op.create_table('endpoint_oid_overrides',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('id_end_point', sa.Integer(), nullable=False),
+    sa.Column('sysDescr', sa.Text(), nullable=True),
+    *[sa.Column(field, sa.String(), nullable=True) for field in OID_FIELDS if field != 'sysDescr'],
+    sa.ForeignKeyConstraint(['id_end_point'], ['endpoints.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id_end_point')
+    )
+
+    # Migra as cópias por endpoint para perfis deduplicados
+    conn = op.get_bind()
+    op.bulk_insert(oid_profiles, [
+        {"name": name, **values} for name, values in DEFAULT_OID_PROFILES.items()
+    ])
+    profile_ids = {
+        tuple(row[1:]): row[0]
+        for row in conn.execute(sa.select(oid_profiles.c.id, *[oid_profiles.c[f] for f in OID_FIELDS]))
+    }
+
+    rows = conn.execute(sa.select(endpoints_oids.c.id_end_point, *[endpoints_oids.c[f] for f in OID_FIELDS])).all()
+    for row in rows:
+        oids = tuple(row[1:])
+        if oids not in profile_ids:
+            name = f"migrated-{len(profile_ids) + 1}"
+            conn.execute(oid_profiles.insert().values(
+                name=name,
+                description="Perfil gerado a partir de OIDs existentes por endpoint",
+                **dict(zip(OID_FIELDS, oids))
+            ))
+            profile_ids[oids] = conn.execute(
+                sa.select(oid_profiles.c.id).where(oid_profiles.c.name == name)
+            ).scalar_one()
+        conn.execute(endpoints.update()
+                     .where(endpoints.c.id == row.id_end_point)
+                     .values(id_oid_profile=profile_ids[oids]))
+
+    default_id = conn.execute(
+        sa.select(oid_profiles.c.id).where(oid_profiles.c.name == DEFAULT_OID_PROFILE)
+    ).scalar_one()
+    conn.execute(endpoints.update()
+                 .where(endpoints.c.id_oid_profile.is_(None))
+                 .values(id_oid_profile=default_id))
+
+    # Cada linha virou exatamente um perfil, então não há overrides a migrar. O coletor
+    # externo continua lendo endpoints_oids, agora uma view de perfil + overrides
+    op.drop_table('endpoints_oids')
+    op.execute("CREATE VIEW endpoints_oids AS " + ENDPOINT_OIDS_SELECT)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # endpoints_oids volta a ser tabela, com os OIDs efetivos de cada endpoint
+    op.execute("DROP VIEW endpoints_oids")
+    op.create_table('endpoints_oids',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('id_end_point', sa.Integer(), nullable=True),
+    sa.Column('sysDescr', sa.Text(), nullable=True),
+    *[sa.Column(field, sa.String(), nullable=True) for field in OID_FIELDS if field != 'sysDescr'],
+    sa.ForeignKeyConstraint(['id_end_point'], ['endpoints.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    columns = ", ".join(f'"{field}"' for field in OID_FIELDS)
+    op.execute(
+        f"INSERT INTO endpoints_oids (id_end_point, {columns}) "
+        f"SELECT id_end_point, {columns} FROM ({ENDPOINT_OIDS_SELECT}) resolved"
+    )
+    op.drop_table('endpoint_oid_overrides')
+    with op.batch_alter_table('endpoints') as batch_op:
+        batch_op.drop_constraint('fk_endpoints_oid_profile', type_='foreignkey')
+        batch_op.drop_column('id_oid_profile')
+    op.drop_table('oid_profiles')
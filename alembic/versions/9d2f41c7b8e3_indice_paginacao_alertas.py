@@ -0,0 +1,28 @@
+"""indice paginacao alertas
+
+Revision ID: 9d2f41c7b8e3
+Revises: 674705c03aa0
+Create Date: 2026-10-19 11:40:12.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2f41c7b8e3'
+down_revision: Union[str, Sequence[str], None] = '674705c03aa0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_alerts_created_at_id', 'alerts', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_alerts_created_at_id', table_name='alerts')
@@ -0,0 +1,161 @@
+"""enums alertas
+
+Revision ID: a5d1e8c37f24
+Revises: f2b8d3e64a19
+Create Date: 2026-10-19 19:12:07.264518
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d1e8c37f24'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d3e64a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Valores válidos e padrão de cada coluna (cópia de api.models no momento da migração)
+VALUES = {
+    'severity': (('critical', 'high', 'medium', 'low'), 'medium'),
+    'status': (('active', 'acknowledged', 'resolved'), 'active'),
+    'category': (('infrastructure', 'security', 'performance', 'network'), 'infrastructure'),
+    'impact': (('high', 'medium', 'low'), 'medium'),
+}
+ALIASES = {
+    'severity': {'critico': 'critical', 'crítico': 'critical', 'alto': 'high', 'alta': 'high',
+                 'medio': 'medium', 'médio': 'medium', 'media': 'medium', 'média': 'medium',
+                 'baixo': 'low', 'baixa': 'low'},
+    'status': {'ativo': 'active', 'aberto': 'active', 'open': 'active',
+               'reconhecido': 'acknowledged', 'em_progresso': 'acknowledged', 'em progresso': 'acknowledged',
+               'in_progress': 'acknowledged', 'resolvido': 'resolved', 'fechado': 'resolved', 'closed': 'resolved'},
+    'category': {'infraestrutura': 'infrastructure', 'sistema': 'infrastructure', 'system': 'infrastructure',
+                 'aplicacao': 'infrastructure', 'aplicação': 'infrastructure', 'application': 'infrastructure',
+                 'monitoramento': 'infrastructure', 'monitoring': 'infrastructure',
+                 'seguranca': 'security', 'segurança': 'security', 'desempenho': 'performance', 'rede': 'network'},
+    'impact': {'alto': 'high', 'medio': 'medium', 'médio': 'medium', 'baixo': 'low'},
+}
+
+# Alertas corrigidos por UPDATE
+BATCH_SIZE = 1000
+
+# Triggers da busca textual no SQLite (cópia de api.models.SQLITE_ALERT_FTS_TRIGGERS):
+# a tabela é recriada pelo batch_alter_table e os triggers se perdem
+SQLITE_ALERT_FTS_TRIGGERS = [
+    """CREATE TRIGGER alerts_fts_ai AFTER INSERT ON alerts BEGIN
+        INSERT INTO alerts_fts(rowid, title, description, system, assignee)
+        VALUES (new.id, new.title, new.description, new.system, new.assignee);
+    END""",
+    """CREATE TRIGGER alerts_fts_ad AFTER DELETE ON alerts BEGIN
+        INSERT INTO alerts_fts(alerts_fts, rowid, title, description, system, assignee)
+        VALUES ('delete', old.id, old.title, old.description, old.system, old.assignee);
+    END""",
+    """CREATE TRIGGER alerts_fts_au AFTER UPDATE OF title, description, system, assignee ON alerts BEGIN
+        INSERT INTO alerts_fts(alerts_fts, rowid, title, description, system, assignee)
+        VALUES ('delete', old.id, old.title, old.description, old.system, old.assignee);
+        INSERT INTO alerts_fts(rowid, title, description, system, assignee)
+        VALUES (new.id, new.title, new.description, new.system, new.assignee);
+    END""",
+]
+
+
+def normalize(field, value):
+    valid, default = VALUES[field]
+    value = str(value or '').strip().lower()
+    return value if value in valid else ALIASES[field].get(value, default)
+
+
+def normalize_alerts(bind):
+    """Corrige, em lotes, os alertas com valores fora dos enums e recalcula o fingerprint dos abertos."""
+    alerts = sa.table(
+        'alerts', sa.column('id', sa.Integer), sa.column('id_endpoint', sa.Integer),
+        sa.column('title', sa.String), sa.column('fingerprint', sa.String),
+        *(sa.column(field, sa.String) for field in VALUES)
+    )
+    invalid = sa.or_(*(
+        sa.or_(alerts.c[field].is_(None), alerts.c[field].not_in(valid))
+        for field, (valid, _) in VALUES.items()
+    ))
+    rows = bind.execute(
+        sa.select(alerts.c.id, alerts.c.id_endpoint, alerts.c.title, alerts.c.fingerprint,
+                  *(alerts.c[field] for field in VALUES))
+        .where(invalid)
+        .order_by(alerts.c.id.desc())
+    ).all()
+    if not rows:
+        return
+
+    # Fingerprints de alertas abertos que já estão corretos (não podem ser repetidos)
+    taken = set(bind.scalars(
+        sa.select(alerts.c.fingerprint)
+        .where(alerts.c.status == 'active', alerts.c.fingerprint.is_not(None), sa.not_(invalid))
+        .union(sa.select(alerts.c.fingerprint).where(
+            alerts.c.status == 'acknowledged', alerts.c.fingerprint.is_not(None), sa.not_(invalid)
+        ))
+    ).all())
+    updates = []
+    for row in rows:
+        values = {field: normalize(field, getattr(row, field)) for field in VALUES}
+        fingerprint = None
+        if values['status'] != 'resolved':
+            # Havendo duplicados, apenas o mais recente fica com o fingerprint (como em c71d5e9a0b82)
+            key = f"{row.id_endpoint or ''}|{values['category']}|{row.title}"
+            fingerprint = hashlib.sha1(key.encode()).hexdigest()
+            if fingerprint in taken:
+                fingerprint = None
+            else:
+                taken.add(fingerprint)
+        updates.append({'alert_id': row.id, 'new_fingerprint': fingerprint,
+                         **{f'new_{field}': value for field, value in values.items()}})
+
+    statement = alerts.update().where(alerts.c.id == sa.bindparam('alert_id')).values(
+        fingerprint=sa.bindparam('new_fingerprint'),
+        **{field: sa.bindparam(f'new_{field}') for field in VALUES}
+    )
+    # Primeiro libera os fingerprints antigos (o índice único parcial é verificado por linha)
+    for offset in range(0, len(updates), BATCH_SIZE):
+        bind.execute(
+            alerts.update().where(alerts.c.id.in_([update['alert_id'] for update in updates[offset:offset + BATCH_SIZE]]))
+            .values(fingerprint=None)
+        )
+    for offset in range(0, len(updates), BATCH_SIZE):
+        bind.execute(statement, updates[offset:offset + BATCH_SIZE])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    normalize_alerts(bind)
+
+    checks = {
+        f'ck_alerts_{field}': f"{field} IN ({', '.join(repr(value) for value in valid)})"
+        for field, (valid, _) in VALUES.items()
+    }
+    if bind.dialect.name == 'sqlite':
+        # SQLite não adiciona CHECK a uma tabela existente: batch_alter_table recria a tabela
+        with op.batch_alter_table('alerts', recreate='always') as batch_op:
+            for name, condition in checks.items():
+                batch_op.create_check_constraint(name, condition)
+        for statement in SQLITE_ALERT_FTS_TRIGGERS:
+            op.execute(statement)
+    else:
+        for name, condition in checks.items():
+            op.create_check_constraint(name, 'alerts', condition)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('alerts', recreate='always') as batch_op:
+            for field in reversed(list(VALUES)):
+                batch_op.drop_constraint(f'ck_alerts_{field}', type_='check')
+        for statement in SQLITE_ALERT_FTS_TRIGGERS:
+            op.execute(statement)
+    else:
+        for field in reversed(list(VALUES)):
+            op.drop_constraint(f'ck_alerts_{field}', 'alerts', type_='check')
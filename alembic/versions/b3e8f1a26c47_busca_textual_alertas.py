@@ -0,0 +1,82 @@
+"""busca textual alertas
+
+Revision ID: b3e8f1a26c47
+Revises: 9d2f41c7b8e3
+Create Date: 2026-10-19 14:05:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8f1a26c47'
+down_revision: Union[str, Sequence[str], None] = '9d2f41c7b8e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Índices de busca textual (cópia de api.models.ALERT_SEARCH_DDL no momento desta revisão)
+ALERT_SEARCH_DDL = {
+    "postgresql": [
+        """ALTER TABLE alerts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(system, '') || ' ' || coalesce(assignee, '')), 'C')
+        ) STORED""",
+        "CREATE INDEX ix_alerts_search_vector ON alerts USING GIN (search_vector)",
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX ix_alerts_system_trgm ON alerts USING GIN (system gin_trgm_ops)",
+        "CREATE INDEX ix_alerts_assignee_trgm ON alerts USING GIN (assignee gin_trgm_ops)",
+    ],
+    "sqlite": [
+        """CREATE VIRTUAL TABLE alerts_fts USING fts5(
+            title, description, system, assignee,
+            content='alerts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+    ],
+}
+
+SQLITE_ALERT_FTS_TRIGGERS = [
+    """CREATE TRIGGER alerts_fts_ai AFTER INSERT ON alerts BEGIN
+        INSERT INTO alerts_fts(rowid, title, description, system, assignee)
+        VALUES (new.id, new.title, new.description, new.system, new.assignee);
+    END""",
+    """CREATE TRIGGER alerts_fts_ad AFTER DELETE ON alerts BEGIN
+        INSERT INTO alerts_fts(alerts_fts, rowid, title, description, system, assignee)
+        VALUES ('delete', old.id, old.title, old.description, old.system, old.assignee);
+    END""",
+    """CREATE TRIGGER alerts_fts_au AFTER UPDATE OF title, description, system, assignee ON alerts BEGIN
+        INSERT INTO alerts_fts(alerts_fts, rowid, title, description, system, assignee)
+        VALUES ('delete', old.id, old.title, old.description, old.system, old.assignee);
+        INSERT INTO alerts_fts(rowid, title, description, system, assignee)
+        VALUES (new.id, new.title, new.description, new.system, new.assignee);
+    END""",
+]
+ALERT_SEARCH_DDL["sqlite"] += SQLITE_ALERT_FTS_TRIGGERS
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    for statement in ALERT_SEARCH_DDL.get(dialect, []):
+        op.execute(statement)
+    if dialect == 'sqlite':
+        # Indexa os alertas já existentes
+        op.execute("INSERT INTO alerts_fts(alerts_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('alerts_fts_ai', 'alerts_fts_ad', 'alerts_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS alerts_fts")
+    elif dialect == 'postgresql':
+        op.drop_index('ix_alerts_assignee_trgm', table_name='alerts')
+        op.drop_index('ix_alerts_system_trgm', table_name='alerts')
+        op.drop_index('ix_alerts_search_vector', table_name='alerts')
+        op.drop_column('alerts', 'search_vector')
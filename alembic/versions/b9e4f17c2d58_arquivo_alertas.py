@@ -0,0 +1,64 @@
+"""arquivo alertas
+
+Revision ID: b9e4f17c2d58
+Revises: a5d1e8c37f24
+Create Date: 2026-10-19 20:03:44.518390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4f17c2d58'
+down_revision: Union[str, Sequence[str], None] = 'a5d1e8c37f24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('alerts_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('severity', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('impact', sa.String(length=50), nullable=False),
+    sa.Column('system', sa.String(length=255), nullable=False),
+    sa.Column('assignee', sa.String(length=255), nullable=True),
+    sa.Column('fingerprint', sa.String(length=40), nullable=True),
+    sa.Column('occurrences', sa.Integer(), nullable=False),
+    sa.Column('last_seen', sa.DateTime(), nullable=True),
+    sa.Column('id_endpoint', sa.Integer(), nullable=True),
+    sa.Column('id_user_created', sa.Integer(), nullable=False),
+    sa.Column('id_user_assigned', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('acknowledged_at', sa.DateTime(), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_alerts_archive_created_at_id', 'alerts_archive', ['created_at', 'id'], unique=False)
+    op.create_table('alert_logs_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('id_alert', sa.Integer(), nullable=False),
+    sa.Column('id_user', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(length=100), nullable=False),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_alert_logs_archive_id_alert'), 'alert_logs_archive', ['id_alert'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_alert_logs_archive_id_alert'), table_name='alert_logs_archive')
+    op.drop_table('alert_logs_archive')
+    op.drop_index('ix_alerts_archive_created_at_id', table_name='alerts_archive')
+    op.drop_table('alerts_archive')
@@ -0,0 +1,33 @@
+"""cursor endpoints
+
+Revision ID: c4f7a2e91b36
+Revises: b9e4f17c2d58
+Create Date: 2026-10-19 21:12:08.274511
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f7a2e91b36'
+down_revision: Union[str, Sequence[str], None] = 'b9e4f17c2d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('endpoints', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # Preenche com o horário da aplicação (o mesmo relógio usado pelo ORM), não o do banco
+    op.execute(sa.text("UPDATE endpoints SET updated_at = :now").bindparams(now=datetime.now()))
+    op.create_index('ix_endpoints_data_id_end_point_id', 'endpoints_data', ['id_end_point', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_endpoints_data_id_end_point_id', table_name='endpoints_data')
+    op.drop_column('endpoints', 'updated_at')
@@ -0,0 +1,68 @@
+"""fingerprint alertas
+
+Revision ID: c71d5e9a0b82
+Revises: b3e8f1a26c47
+Create Date: 2026-10-19 15:22:48.530917
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71d5e9a0b82'
+down_revision: Union[str, Sequence[str], None] = 'b3e8f1a26c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('alerts', sa.Column('fingerprint', sa.String(length=40), nullable=True))
+    op.add_column('alerts', sa.Column('occurrences', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('alerts', sa.Column('last_seen', sa.DateTime(), nullable=True))
+
+    # Preenche o fingerprint dos alertas abertos; havendo duplicados, apenas o mais recente
+    # recebe o fingerprint (os demais continuam abertos, fora da deduplicação)
+    bind = op.get_bind()
+    alerts = sa.table(
+        'alerts', sa.column('id', sa.Integer), sa.column('id_endpoint', sa.Integer),
+        sa.column('category', sa.String), sa.column('title', sa.String),
+        sa.column('status', sa.String), sa.column('fingerprint', sa.String)
+    )
+    rows = bind.execute(
+        sa.select(alerts.c.id, alerts.c.id_endpoint, alerts.c.category, alerts.c.title)
+        .where(alerts.c.status != 'resolved')
+        .order_by(alerts.c.id.desc())
+    ).all()
+    seen = set()
+    updates = []
+    for row in rows:
+        key = f"{row.id_endpoint or ''}|{row.category}|{row.title}"
+        fingerprint = hashlib.sha1(key.encode()).hexdigest()
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            updates.append({'alert_id': row.id, 'fingerprint': fingerprint})
+    if updates:
+        bind.execute(
+            alerts.update().where(alerts.c.id == sa.bindparam('alert_id')).values(fingerprint=sa.bindparam('fingerprint')),
+            updates
+        )
+
+    op.create_index(
+        'ux_alerts_fingerprint_open', 'alerts', ['fingerprint'], unique=True,
+        postgresql_where=sa.text("status <> 'resolved'"), sqlite_where=sa.text("status <> 'resolved'")
+    )
+    op.create_index('ix_alerts_fingerprint_resolved_at', 'alerts', ['fingerprint', 'resolved_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_alerts_fingerprint_resolved_at', table_name='alerts')
+    op.drop_index('ux_alerts_fingerprint_open', table_name='alerts')
+    op.drop_column('alerts', 'last_seen')
+    op.drop_column('alerts', 'occurrences')
+    op.drop_column('alerts', 'fingerprint')
@@ -0,0 +1,35 @@
+"""sla metrics period
+
+Revision ID: d8a3c5e17f40
+Revises: c4f7a2e91b36
+Create Date: 2026-10-19 23:41:52.108734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3c5e17f40'
+down_revision: Union[str, Sequence[str], None] = 'c4f7a2e91b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Mantém apenas a linha mais recente (maior id) de cada endpoint e período
+    op.execute(sa.text(
+        "DELETE FROM sla_metrics WHERE id NOT IN ("
+        "SELECT max_id FROM (SELECT max(id) AS max_id FROM sla_metrics "
+        "GROUP BY endpoint_id, timestamp, measurement_period_hours) AS latest)"
+    ))
+    op.create_index('ux_sla_metrics_endpoint_period', 'sla_metrics',
+                    ['endpoint_id', 'timestamp', 'measurement_period_hours'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_sla_metrics_endpoint_period', table_name='sla_metrics')
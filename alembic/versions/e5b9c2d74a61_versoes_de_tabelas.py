@@ -0,0 +1,44 @@
+"""versoes de tabelas
+
+Revision ID: e5b9c2d74a61
+Revises: d8a3c5e17f40
+Create Date: 2026-10-20 09:14:37.520916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9c2d74a61'
+down_revision: Union[str, Sequence[str], None] = 'd8a3c5e17f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Cópia de VERSIONED_TABLES (api/models.py) no momento desta revisão
+VERSIONED_TABLES = (
+    "alerts",
+    "endpoints",
+    "webhook_config",
+    "email_config",
+    "failure_threshold_config",
+    "performance_thresholds",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table_versions = op.create_table(
+        'table_versions',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(table_versions, [{"name": name, "version": 0} for name in VERSIONED_TABLES])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('table_versions')
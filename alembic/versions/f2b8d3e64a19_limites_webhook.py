@@ -0,0 +1,36 @@
+"""limites webhook
+
+Revision ID: f2b8d3e64a19
+Revises: e4a7c2d91f36
+Create Date: 2026-10-19 18:12:07.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d3e64a19'
+down_revision: Union[str, Sequence[str], None] = 'e4a7c2d91f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('webhook_config', sa.Column('batch_size', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('webhook_config', sa.Column('batch_wait_ms', sa.Integer(), server_default='1000', nullable=False))
+    op.add_column('webhook_config', sa.Column('max_concurrency', sa.Integer(), nullable=True))
+    op.add_column('webhook_config', sa.Column('rate_limit', sa.Float(), nullable=True))
+    op.add_column('webhook_config', sa.Column('rate_burst', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('webhook_config', 'rate_burst')
+    op.drop_column('webhook_config', 'rate_limit')
+    op.drop_column('webhook_config', 'max_concurrency')
+    op.drop_column('webhook_config', 'batch_wait_ms')
+    op.drop_column('webhook_config', 'batch_size')
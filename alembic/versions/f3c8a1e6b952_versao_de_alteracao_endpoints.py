@@ -0,0 +1,31 @@
+"""versao de alteracao endpoints
+
+Revision ID: f3c8a1e6b952
+Revises: e5b9c2d74a61
+Create Date: 2026-10-20 10:02:51.347182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8a1e6b952'
+down_revision: Union[str, Sequence[str], None] = 'e5b9c2d74a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Linhas existentes ficam na versão 0: entram apenas na carga inicial (sem cursor)
+    op.add_column('endpoints', sa.Column('change_version', sa.Integer(), server_default='0', nullable=False))
+    op.create_index(op.f('ix_endpoints_change_version'), 'endpoints', ['change_version'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_endpoints_change_version'), table_name='endpoints')
+    op.drop_column('endpoints', 'change_version')
@@ -0,0 +1,196 @@
+import os
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, exists, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import Alerts, AlertLogs, AlertsArchive, AlertLogsArchive, IncidentTracking, NotificationOutbox
+from api.cache import stats_cache
+
+
+
+class AlertArchiver:
+    """
+    Move alertas resolvidos há mais de ALERT_ARCHIVE_AFTER_DAYS dias (e seus logs) para
+    alerts_archive/alert_logs_archive, em lotes de ALERT_ARCHIVE_BATCH_SIZE com um commit
+    por lote, mantendo alerts e alert_logs com apenas o conjunto de trabalho recente.
+    - Os IDs são preservados: GET /alerts/{id} continua encontrando o alerta arquivado.
+    - Alertas referenciados por incidentes (incident_tracking) permanecem em alerts.
+    - No PostgreSQL os alertas do lote são travados (FOR UPDATE SKIP LOCKED), de modo que
+      vários processos podem arquivar ao mesmo tempo sem mover a mesma linha.
+    Variáveis:
+        ALERT_ARCHIVE_AFTER_DAYS (float): Idade mínima da resolução, em dias (padrão 90).
+        ALERT_ARCHIVE_BATCH_SIZE (int): Alertas por lote (padrão 1000).
+        ALERT_ARCHIVE_INTERVAL (float): Intervalo entre execuções em segundos (padrão 3600; 0 desativa).
+    """
+
+    def __init__(self, after_days: float, batch_size: int, interval: float):
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.counters = {"runs": 0, "batches": 0, "alerts": 0, "logs": 0}
+        self.last_run: Optional[dict] = None
+        self.last_error: Optional[str] = None
+
+    def boundary(self) -> datetime:
+        """
+        Limite do arquivo: todo alerta arquivado foi criado antes deste momento, então
+        consultas com date_from posterior a ele não precisam ler alerts_archive.
+        """
+        return datetime.now() - timedelta(days=self.after_days)
+
+    async def archive_batch(self, session: AsyncSession, cutoff: datetime) -> int:
+        """
+        Move um lote de alertas resolvidos antes de cutoff (com seus logs) e faz commit.
+        Args:
+            session (AsyncSession): Sessão assíncrona.
+            cutoff (datetime): Data limite da resolução.
+        Returns:
+            int: Alertas movidos (0 quando não há mais o que arquivar).
+        """
+        ids = (await session.scalars(
+            select(Alerts.id)
+            .where(
+                Alerts.status == "resolved",
+                Alerts.resolved_at < cutoff,
+                ~exists().where(IncidentTracking.alert_id == Alerts.id)
+            )
+            .order_by(Alerts.id)
+            .limit(self.batch_size)
+            # PostgreSQL: alertas travados por outro processo são pulados (ignorado no SQLite)
+            .with_for_update(skip_locked=True)
+        )).all()
+        if not ids:
+            await session.rollback()
+            return 0
+
+        now = datetime.now()
+        alert_columns = [column.name for column in Alerts.__table__.columns]
+        log_columns = [column.name for column in AlertLogs.__table__.columns]
+        await session.execute(insert(AlertsArchive).from_select(
+            alert_columns + ["archived_at"],
+            select(*Alerts.__table__.columns, literal(now)).where(Alerts.id.in_(ids))
+        ))
+        logs = await session.execute(insert(AlertLogsArchive).from_select(
+            log_columns,
+            select(*AlertLogs.__table__.columns).where(AlertLogs.id_alert.in_(ids))
+        ))
+        for statement in (
+            delete(NotificationOutbox).where(NotificationOutbox.id_alert.in_(ids)),
+            delete(AlertLogs).where(AlertLogs.id_alert.in_(ids)),
+            delete(Alerts).where(Alerts.id.in_(ids)),
+        ):
+            await session.execute(statement, execution_options={"synchronize_session": False})
+        await session.commit()
+
+        self.counters["batches"] += 1
+        self.counters["alerts"] += len(ids)
+        self.counters["logs"] += max(logs.rowcount or 0, 0)
+        return len(ids)
+
+    async def run(self, session: AsyncSession) -> dict:
+        """
+        Arquiva todos os alertas elegíveis, lote a lote.
+        Args:
+            session (AsyncSession): Sessão assíncrona.
+        Returns:
+            dict: Alertas movidos, lotes e duração da execução.
+        """
+        start = datetime.now()
+        cutoff = self.boundary()
+        moved = batches = 0
+        while not self._stopping:
+            count = await self.archive_batch(session, cutoff)
+            if not count:
+                break
+            moved += count
+            batches += 1
+            # Cede o loop entre lotes (e a conexão de escrita, no SQLite)
+            await asyncio.sleep(0)
+        if moved:
+            stats_cache.invalidate("alerts", "alerts_archive")
+
+        self.counters["runs"] += 1
+        self.last_run = {
+            "at": start.isoformat(),
+            "cutoff": cutoff.isoformat(),
+            "alerts": moved,
+            "batches": batches,
+            "duration_ms": round((datetime.now() - start).total_seconds() * 1000, 2),
+        }
+        return self.last_run
+
+    def start(self, session_factory):
+        """Inicia as execuções periódicas em segundo plano (uma vez por processo)."""
+        if self.interval > 0 and self._task is None:
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run_forever(session_factory))
+
+    async def stop(self, timeout: float = 5.0):
+        """
+        Interrompe as execuções periódicas; o lote em andamento termina antes (até timeout segundos).
+        Args:
+            timeout (float): Tempo máximo de espera pelo lote em andamento.
+        """
+        if self._task is None:
+            return
+        # A execução para entre um lote e outro; cancelar no meio de um comando
+        # pode deixar a conexão (a única de escrita, no SQLite) presa
+        self._stopping = True
+        self._wake.set()
+        _, pending = await asyncio.wait({self._task}, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run_forever(self, session_factory):
+        while not self._stopping:
+            try:
+                async with session_factory() as session:
+                    await self.run(session)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️ Falha ao arquivar alertas resolvidos: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "after_days": self.after_days,
+            "batch_size": self.batch_size,
+            "interval": self.interval,
+            "boundary": self.boundary().isoformat(),
+            **self.counters,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
+
+
+async def archive_status(session: AsyncSession) -> dict:
+    """
+    Quantidade de alertas no conjunto de trabalho e no arquivo.
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+    Returns:
+        dict: Linhas em alerts e alerts_archive e o arquivamento mais recente.
+    """
+    return {
+        "alerts": await session.scalar(select(func.count()).select_from(Alerts)),
+        "alerts_archive": await session.scalar(select(func.count()).select_from(AlertsArchive)),
+        "last_archived_at": await session.scalar(select(func.max(AlertsArchive.archived_at))),
+    }
+
+
+alert_archiver = AlertArchiver(
+    after_days=float(os.getenv("ALERT_ARCHIVE_AFTER_DAYS", 90)),
+    batch_size=int(os.getenv("ALERT_ARCHIVE_BATCH_SIZE", 1000)),
+    interval=float(os.getenv("ALERT_ARCHIVE_INTERVAL", 3600)),
+)
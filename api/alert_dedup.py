@@ -0,0 +1,134 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import Alerts, AlertLogs, NotificationOutbox, OPEN_ALERT_PREDICATE, alert_fingerprint, normalize_alert_values
+
+
+
+# Janela de histerese (segundos): um alerta resolvido há menos tempo que isso é reaberto
+# quando a mesma condição volta, em vez de gerar um novo alerta
+ALERT_FLAP_WINDOW = float(os.getenv("ALERT_FLAP_WINDOW", 300))
+
+# Linhas por INSERT ... ON CONFLICT
+UPSERT_CHUNK_SIZE = 500
+
+# Colunas opcionais (todas as linhas de um INSERT com vários VALUES têm as mesmas chaves)
+ROW_DEFAULTS = {
+    "description": None, "status": "active", "impact": "medium", "assignee": None,
+    "id_endpoint": None, "id_user_assigned": None,
+}
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _open_alert_conflict(dialect: str):
+    """INSERT que, havendo alerta aberto com o mesmo fingerprint, apenas conta a ocorrência."""
+    statement = _INSERTS[dialect](Alerts.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=[Alerts.fingerprint],
+        # Literal (sem parâmetro) para o PostgreSQL reconhecer o índice parcial
+        index_where=text(OPEN_ALERT_PREDICATE),
+        set_={
+            "occurrences": Alerts.occurrences + 1,
+            "last_seen": statement.excluded.last_seen,
+            "updated_at": statement.excluded.updated_at,
+        }
+    ).returning(Alerts.id, Alerts.occurrences, Alerts.title, Alerts.id_user_created)
+
+
+async def record_alerts(session: AsyncSession, rows: List[Dict[str, Any]], now: datetime = None) -> Dict[str, List[int]]:
+    """
+    Registra ocorrências de alertas deduplicando pelo fingerprint (endpoint, categoria, título).
+    - Já existe alerta aberto (active/acknowledged): incrementa occurrences e last_seen,
+      sem nova linha nem log (busca pelo índice único parcial, via ON CONFLICT).
+    - Existe alerta resolvido há menos de ALERT_FLAP_WINDOW segundos: o alerta é reaberto.
+    - Caso contrário: cria o alerta e o log de criação.
+    Alertas criados e reabertos geram eventos na notification_outbox na mesma transação,
+    entregues depois pelo OutboxRelay (api/outbox.py). Não faz commit.
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+        rows (list): Valores das colunas de Alerts (title, category, id_endpoint, ...).
+        now (datetime): Momento da ocorrência (padrão: agora).
+    Returns:
+        dict: IDs dos alertas "created", "reopened" e "repeated".
+    """
+    now = now or datetime.now()
+    result = {"created": [], "reopened": [], "repeated": []}
+    if not rows:
+        return result
+
+    # Uma linha por fingerprint (ocorrências repetidas no mesmo lote contam uma vez)
+    by_fingerprint: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        # Valores fora dos enums (ex.: categoria de uma regra) seriam rejeitados pelas restrições CHECK
+        row = normalize_alert_values(row)
+        fingerprint = alert_fingerprint(row.get("id_endpoint"), row["category"], row["title"])
+        by_fingerprint.setdefault(fingerprint, {
+            **ROW_DEFAULTS, **row,
+            "fingerprint": fingerprint, "occurrences": 1,
+            "created_at": row.get("created_at", now), "updated_at": now, "last_seen": now,
+        })
+
+    dialect = (await session.connection()).dialect.name
+    fingerprints = list(by_fingerprint)
+    for offset in range(0, len(fingerprints), UPSERT_CHUNK_SIZE):
+        chunk = fingerprints[offset:offset + UPSERT_CHUNK_SIZE]
+
+        # Histerese: reabre o alerta resolvido mais recente, se não houver outro aberto
+        open_fingerprints = select(Alerts.fingerprint).where(
+            Alerts.fingerprint.in_(chunk), Alerts.status != "resolved"
+        )
+        recently_resolved = select(func.max(Alerts.id)).where(
+            Alerts.fingerprint.in_(chunk),
+            Alerts.status == "resolved",
+            Alerts.resolved_at >= now - timedelta(seconds=ALERT_FLAP_WINDOW),
+            Alerts.fingerprint.not_in(open_fingerprints)
+        ).group_by(Alerts.fingerprint)
+        reopened = (await session.execute(
+            update(Alerts)
+            .where(Alerts.id.in_(recently_resolved))
+            .values(
+                status="active", resolved_at=None, acknowledged_at=None,
+                occurrences=Alerts.occurrences + 1, last_seen=now, updated_at=now
+            )
+            .returning(Alerts.id, Alerts.fingerprint, Alerts.id_user_created),
+            execution_options={"synchronize_session": False}
+        )).all()
+        reopened_fingerprints = {alert.fingerprint for alert in reopened}
+
+        values = [by_fingerprint[fingerprint] for fingerprint in chunk if fingerprint not in reopened_fingerprints]
+        upserted = []
+        if values:
+            if dialect in _INSERTS:
+                upserted = (await session.execute(_open_alert_conflict(dialect), values)).all()
+            else:
+                upserted = (await session.execute(
+                    insert(Alerts).returning(Alerts.id, Alerts.occurrences, Alerts.title, Alerts.id_user_created),
+                    values
+                )).all()
+        created = [alert for alert in upserted if alert.occurrences == 1]
+
+        logs = [
+            {"id_alert": alert.id, "id_user": alert.id_user_created, "action": "created",
+             "comment": f"Alerta criado: {alert.title}", "created_at": now}
+            for alert in created
+        ] + [
+            {"id_alert": alert.id, "id_user": alert.id_user_created, "action": "reopened",
+             "comment": "Alerta reaberto: a condição voltou dentro da janela de histerese", "created_at": now}
+            for alert in reopened
+        ]
+        if logs:
+            await session.execute(insert(AlertLogs), logs)
+            await session.execute(insert(NotificationOutbox), [
+                {"event": f"alert.{log['action']}", "id_alert": log["id_alert"], "status": "pending",
+                 "attempts": 0, "created_at": now}
+                for log in logs
+            ])
+
+        result["created"] += [alert.id for alert in created]
+        result["reopened"] += [alert.id for alert in reopened]
+        result["repeated"] += [alert.id for alert in upserted if alert.occurrences > 1]
+    return result
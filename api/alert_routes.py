@@ -1,68 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from api.dependencies import init_session, verify_token
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, desc, func
-from api.models import Users, Alerts, AlertLogs
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from api.dependencies import init_session, init_read_session, verify_token
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, desc, func, insert, select, union_all, update
+from api.models import Users, Alerts, AlertLogs, AlertsArchive, AlertLogsArchive, ALERT_VALUE_ALIASES, alert_duration, alert_fingerprint
+from api.cache import stats_cache
+from api.etag import conditional_get
+from api.pagination import apply_keyset, next_cursor, count_rows
+from api.search import apply_alert_search
+from api.alert_dedup import record_alerts
+from api.outbox import outbox_relay
+from api.alert_archive import alert_archiver
+from api.events import ALERT_ACTION_EVENTS, event_broker, publish_alert_events, publish_recorded_alerts
 from api.schemas import (
     AlertCreateSchema, AlertUpdateSchema, AlertResponseSchema,
     AlertListResponseSchema, AlertFiltersSchema, PaginationSchema,
-    AlertStatsSchema, AlertActionSchema, AlertWithLogsSchema,
+    AlertStatsSchema, AlertActionSchema, AlertWithLogsSchema, AlertExpandedSchema,
     AlertSeverityEnum, AlertStatusEnum, AlertCategoryEnum, AlertImpactEnum
 )
 from typing import List, Optional
-from datetime import datetime
+from collections import Counter
+import heapq
+from datetime import datetime, time, timedelta
 import math
 
 
 
-# Mapeamentos para normalizar valores em português para inglês
-SEVERITY_MAPPING = {
-    'critico': 'critical',
-    'crítico': 'critical',
-    'alto': 'high',
-    'medio': 'medium',
-    'médio': 'medium',
-    'baixo': 'low',
-    'critical': 'critical',
-    'high': 'high',
-    'medium': 'medium',
-    'low': 'low'
-}
-
-STATUS_MAPPING = {
-    'aberto': 'open',
-    'em_progresso': 'in_progress',
-    'em progresso': 'in_progress',
-    'resolvido': 'resolved',
-    'fechado': 'closed',
-    'open': 'open',
-    'in_progress': 'in_progress',
-    'resolved': 'resolved',
-    'closed': 'closed'
-}
-
-IMPACT_MAPPING = {
-    'alto': 'high',
-    'medio': 'medium',
-    'médio': 'medium',
-    'baixo': 'low',
-    'high': 'high',
-    'medium': 'medium',
-    'low': 'low'
-}
-
-CATEGORY_MAPPING = {
-    'rede': 'network',
-    'sistema': 'system',
-    'aplicacao': 'application',
-    'aplicação': 'application',
-    'seguranca': 'security',
-    'segurança': 'security',
-    'network': 'network',
-    'system': 'system',
-    'application': 'application',
-    'security': 'security'
-}
+# Valores aceitos nos filtros (português e legados), convertidos para os valores dos enums
+SEVERITY_MAPPING = ALERT_VALUE_ALIASES["severity"]
+STATUS_MAPPING = ALERT_VALUE_ALIASES["status"]
+IMPACT_MAPPING = ALERT_VALUE_ALIASES["impact"]
+CATEGORY_MAPPING = ALERT_VALUE_ALIASES["category"]
 
 
 def _normalize_filter_values(values: Optional[List[str]], mapping: dict) -> Optional[List[str]]:
@@ -166,6 +137,22 @@ def _safe_build_filters(
 
 alert_router = APIRouter(prefix="/alerts", tags=["alerts"], dependencies=[Depends(verify_token)])
 
+# Quantidade de ids por UPDATE nas ações em lote (mantém o IN (...) abaixo dos limites de parâmetros)
+BULK_CHUNK_SIZE = 500
+
+# Colunas não nulas aceitas na paginação por cursor (chave: coluna + id)
+ALERT_SORT_COLUMNS = {
+    "id": Alerts.id,
+    "created_at": Alerts.created_at,
+    "updated_at": Alerts.updated_at,
+    "title": Alerts.title,
+    "severity": Alerts.severity,
+    "status": Alerts.status,
+    "category": Alerts.category,
+    "impact": Alerts.impact,
+    "system": Alerts.system,
+}
+
 
 def _check_admin_or_monitor(user: Users):
     """Verifica se o usuário tem permissão de ADMIN ou MONITOR"""
@@ -173,85 +160,113 @@ def _check_admin_or_monitor(user: Users):
         raise HTTPException(status_code=403, detail="Operação não permitida: requer nível ADMIN ou MONITOR")
 
 
-def _build_alert_filters(filters: AlertFiltersSchema, query):
-    """Constrói filtros dinâmicos para consultas de alertas"""
-    if filters.search:
-        search_term = f"%{filters.search.lower()}%"
-        query = query.filter(
-            or_(
-                Alerts.title.ilike(search_term),
-                Alerts.description.ilike(search_term),
-                Alerts.system.ilike(search_term),
-                Alerts.assignee.ilike(search_term)
-            )
-        )
-    
+def _resolution_seconds(dialect: str, table=Alerts):
+    """
+    Expressão SQL com a duração (em segundos) entre a criação e a resolução de um alerta.
+    Args:
+        dialect (str): Nome do dialeto da conexão ("postgresql" ou "sqlite").
+        table: Modelo consultado (Alerts ou AlertsArchive).
+    Returns:
+        ColumnElement: Expressão a ser agregada (ex.: AVG).
+    """
+    if dialect == "sqlite":
+        return (func.julianday(table.resolved_at) - func.julianday(table.created_at)) * 86400
+    return func.extract("epoch", table.resolved_at - table.created_at)
+
+
+# Colunas lidas pela listagem sem expand (os campos de AlertResponseSchema, exceto duration)
+ALERT_LIST_COLUMNS = tuple(
+    getattr(Alerts, field) for field in AlertResponseSchema.model_fields if field != "duration"
+)
+
+# As mesmas colunas em alerts_archive (listagem com include_archived ou date_from antigo)
+ARCHIVE_LIST_COLUMNS = tuple(getattr(AlertsArchive, column.key) for column in ALERT_LIST_COLUMNS)
+
+# Relacionamentos que podem ser incluídos na listagem com expand=
+ALERT_EXPANDABLE = {
+    "endpoint": Alerts.endpoint,
+    "user_created": Alerts.user_created,
+    "user_assigned": Alerts.user_assigned,
+}
+
+# Validadores compilados uma única vez (a lista inteira é validada em uma chamada)
+ALERT_LIST_ADAPTER = TypeAdapter(List[AlertResponseSchema])
+ALERT_EXPANDED_LIST_ADAPTER = TypeAdapter(List[AlertExpandedSchema])
+
+
+def _build_alert_filters(filters: AlertFiltersSchema, query, dialect: str, table=Alerts):
+    """
+    Constrói filtros dinâmicos para consultas de alertas.
+    A busca textual usa os índices de busca (tsvector no PostgreSQL, FTS5 no SQLite);
+    os filtros de sistema/responsável são substring com ILIKE e curingas escapados.
+    Args:
+        filters (AlertFiltersSchema): Filtros normalizados.
+        query (Select): Consulta base.
+        dialect (str): Nome do dialeto da conexão.
+        table: Modelo consultado (Alerts ou AlertsArchive).
+    Returns:
+        tuple: (consulta filtrada, ordenação por relevância ou None).
+    """
+    query, relevance = apply_alert_search(
+        query, dialect, search=filters.search, system=filters.system, assignee=filters.assignee, table=table
+    )
+
     if filters.severity:
-        query = query.filter(Alerts.severity.in_([s.value for s in filters.severity]))
+        query = query.filter(table.severity.in_([s.value for s in filters.severity]))
     
     if filters.status:
-        query = query.filter(Alerts.status.in_([s.value for s in filters.status]))
+        query = query.filter(table.status.in_([s.value for s in filters.status]))
     
     if filters.category:
-        query = query.filter(Alerts.category.in_([c.value for c in filters.category]))
+        query = query.filter(table.category.in_([c.value for c in filters.category]))
     
     if filters.impact:
-        query = query.filter(Alerts.impact.in_([i.value for i in filters.impact]))
-    
-    if filters.assignee:
-        query = query.filter(Alerts.assignee.ilike(f"%{filters.assignee}%"))
-    
-    if filters.system:
-        query = query.filter(Alerts.system.ilike(f"%{filters.system}%"))
+        query = query.filter(table.impact.in_([i.value for i in filters.impact]))
     
     if filters.date_from:
-        query = query.filter(Alerts.created_at >= filters.date_from)
+        query = query.filter(table.created_at >= filters.date_from)
     
     if filters.date_to:
-        query = query.filter(Alerts.created_at <= filters.date_to)
+        query = query.filter(table.created_at <= filters.date_to)
     
-    return query
+    return query, relevance
 
 
 @alert_router.post("/", response_model=AlertResponseSchema)
 async def create_alert(
     alert_data: AlertCreateSchema,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Cria um novo alerta no sistema.
+    Se já houver um alerta aberto com o mesmo endpoint, categoria e título, apenas
+    incrementa occurrences/last_seen dele; se um igual foi resolvido há pouco
+    (ALERT_FLAP_WINDOW), ele é reaberto.
     Requer permissão de ADMIN ou MONITOR.
     """
     _check_admin_or_monitor(logged_user)
 
-    new_alert = Alerts(
-        title=alert_data.title,
-        description=alert_data.description,
-        severity=alert_data.severity.value,
-        category=alert_data.category.value,
-        system=alert_data.system,
-        impact=alert_data.impact.value,
-        id_endpoint=alert_data.id_endpoint,
-        id_user_created=logged_user.id,
-        assignee=alert_data.assignee
-    )
-    
-    session.add(new_alert)
-    session.commit()
-    session.refresh(new_alert)
-    
-    # Log da criação
-    log_entry = AlertLogs(
-        id_alert=new_alert.id,
-        id_user=logged_user.id,
-        action="created",
-        comment=f"Alerta criado: {alert_data.title}"
-    )
-    session.add(log_entry)
-    session.commit()
-    
-    return AlertResponseSchema.model_validate(new_alert)
+    # Ocorrência repetida (mesmo endpoint, categoria e título) reaproveita o alerta aberto
+    recorded = await record_alerts(session, [{
+        "title": alert_data.title,
+        "description": alert_data.description,
+        "severity": alert_data.severity.value,
+        "category": alert_data.category.value,
+        "system": alert_data.system,
+        "impact": alert_data.impact.value,
+        "id_endpoint": alert_data.id_endpoint,
+        "id_user_created": logged_user.id,
+        "assignee": alert_data.assignee,
+    }])
+    await session.commit()
+    stats_cache.invalidate("alerts")
+    outbox_relay.wake()
+    await publish_recorded_alerts(session, recorded)
+
+    alert_id = next(ids[0] for ids in recorded.values() if ids)
+    alert = await session.get(Alerts, alert_id, populate_existing=True)
+    return AlertResponseSchema.model_validate(alert)
 
 
 @alert_router.get("/", response_model=AlertListResponseSchema)
@@ -267,15 +282,34 @@ async def list_alerts(
     system: Optional[str] = Query(None, description="Filtro por sistema"),
     date_from: Optional[datetime] = Query(None, description="Data inicial"),
     date_to: Optional[datetime] = Query(None, description="Data final"),
-    sort_by: str = Query("created_at", description="Campo para ordenação"),
+    sort_by: str = Query("created_at", description="Campo para ordenação (relevance: relevância da busca)"),
     sort_order: str = Query("desc", description="Ordem: asc ou desc"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (pagination.next_cursor); substitui page"),
+    count: str = Query("exact", description="Contagem do total: exact, estimated ou none"),
+    expand: Optional[List[str]] = Query(None, description="Relacionamentos incluídos: endpoint, user_created, user_assigned"),
+    include_archived: bool = Query(False, description="Inclui os alertas arquivados (alerts_archive)"),
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Lista alertas com suporte a paginação e filtros avançados.
     Suporta valores em português e inglês, ignorando valores inválidos.
+    A paginação por cursor (chave sort_by + id) tem custo constante em qualquer página;
+    a paginação por page/size continua disponível.
+    Com search, sort_by=relevance ordena pela relevância da busca textual (apenas page/size).
+    Sem expand, apenas as colunas da resposta são lidas (sem objetos ORM nem joins);
+    com expand, os relacionamentos pedidos são carregados e incluídos em cada alerta.
+    O arquivo (alertas resolvidos antigos) só é consultado com include_archived=true ou
+    quando date_from é anterior ao limite do arquivo (ALERT_ARCHIVE_AFTER_DAYS).
     """
+    expand = sorted({name for value in expand or [] for name in value.split(",") if name})
+    invalid = [name for name in expand if name not in ALERT_EXPANDABLE]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"expand inválido: {', '.join(invalid)}. Use: {', '.join(ALERT_EXPANDABLE)}"
+        )
+
     # Construir filtros de forma segura
     filters = _safe_build_filters(
         search=search,
@@ -289,172 +323,220 @@ async def list_alerts(
         date_to=date_to
     )
     
-    # Query base
-    query = session.query(Alerts).options(
-        joinedload(Alerts.endpoint),
-        joinedload(Alerts.user_created),
-        joinedload(Alerts.user_assigned)
+    # Alertas arquivados foram criados antes do limite do arquivo: consultas mais recentes
+    # ficam apenas na tabela alerts
+    archived = include_archived or (filters.date_from is not None and filters.date_from < alert_archiver.boundary())
+    if archived and expand:
+        raise HTTPException(status_code=400, detail="expand não suportado na consulta de alertas arquivados")
+    if archived and sort_by == "relevance":
+        raise HTTPException(status_code=400, detail="sort_by=relevance não suportado na consulta de alertas arquivados")
+
+    # Query base com filtros
+    dialect = (await session.connection()).dialect.name
+    if archived:
+        # Filtros aplicados em cada tabela (índices da tabela alerts) antes da união
+        hot, relevance = _build_alert_filters(filters, select(*ALERT_LIST_COLUMNS), dialect)
+        cold, _ = _build_alert_filters(filters, select(*ARCHIVE_LIST_COLUMNS), dialect, AlertsArchive)
+        source = union_all(hot, cold).subquery("alerts")
+        query, columns = select(source), source.c
+    else:
+        base = select(Alerts).options(*(joinedload(ALERT_EXPANDABLE[name]) for name in expand)) if expand \
+            else select(*ALERT_LIST_COLUMNS)
+        query, relevance = _build_alert_filters(filters, base, dialect)
+        columns = Alerts.__table__.c
+    total, total_is_estimate = await count_rows(
+        session, query, count, "alerts",
+        cache_key=(filters.model_dump_json(), archived),
+        # A estimativa por pg_class vale apenas para a tabela alerts sem filtros
+        filtered=archived or bool(filters.model_dump(exclude_none=True))
     )
     
-    # Aplicar filtros
-    query = _build_alert_filters(filters, query)
-    
-    # Ordenação
-    order_column = getattr(Alerts, sort_by, Alerts.created_at)
-    if sort_order.lower() == "desc":
-        query = query.order_by(desc(order_column))
+    # Ordenação: colunas não nulas usam a chave (coluna, id), que permite cursor
+    descending = sort_order.lower() == "desc"
+    sort_column = columns[sort_by] if sort_by in ALERT_SORT_COLUMNS else None
+    keyset = None
+    if sort_by == "relevance":
+        if cursor:
+            raise HTTPException(status_code=400, detail="Paginação por cursor não suportada para sort_by=relevance")
+        if relevance is None:
+            raise HTTPException(status_code=400, detail="sort_by=relevance requer o parâmetro search")
+        query = query.order_by(relevance, Alerts.id.desc())
+    elif sort_column is not None:
+        keyset = (sort_column,) if sort_by == "id" else (sort_column, columns.id)
+        query = apply_keyset(query, keyset, descending, cursor)
+    elif cursor:
+        raise HTTPException(status_code=400, detail=f"Paginação por cursor não suportada para sort_by={sort_by}")
     else:
-        query = query.order_by(order_column)
-    
-    # Paginação
-    total = query.count()
-    offset = (page - 1) * size
-    alerts = query.offset(offset).limit(size).all()
-    
-    # Converter para schemas de resposta com tratamento seguro para valores inválidos
-    alert_responses = []
-    
-    # Valores válidos para cada campo
-    valid_impacts = ["high", "medium", "low"]
-    valid_severities = ["critical", "high", "medium", "low"]
-    valid_categories = ["infrastructure", "security", "application", "performance", "monitoring"]
-    valid_statuses = ["active", "acknowledged", "resolved"]
-    
-    for alert in alerts:
-        try:
-            # Tenta converter diretamente, mas captura erros de validação
-            alert_response = AlertResponseSchema.model_validate(alert)
-            alert_responses.append(alert_response)
-        except Exception as e:
-            # Se falhar a validação, cria um dicionário com valores seguros
-            try:
-                # Define valores padrão
-                default_impact = "medium"
-                default_severity = "medium"
-                default_category = "infrastructure" 
-                default_status = "active"
-                
-                # Cria um dicionário com valores seguros
-                alert_dict = {
-                    "id": alert.id,
-                    "title": alert.title or "Sem título",
-                    "description": alert.description or "Sem descrição",
-                    "severity": alert.severity if hasattr(alert, "severity") and alert.severity in valid_severities else default_severity,
-                    "category": alert.category if hasattr(alert, "category") and alert.category in valid_categories else default_category,
-                    "system": alert.system or "Desconhecido",
-                    "impact": alert.impact if hasattr(alert, "impact") and alert.impact in valid_impacts else default_impact,
-                    "status": alert.status if hasattr(alert, "status") and alert.status in valid_statuses else default_status,
-                    "assignee": alert.assignee,
-                    "id_endpoint": alert.id_endpoint,
-                    "created_at": alert.created_at,
-                    "updated_at": alert.updated_at,
-                    "acknowledged_at": alert.acknowledged_at,
-                    "resolved_at": alert.resolved_at,
-                    "duration": alert.duration
-                }
-                
-                # Tenta validar com os valores corrigidos
-                alert_response = AlertResponseSchema.model_validate(alert_dict)
-                alert_responses.append(alert_response)
-            except Exception as e2:
-                print(f"Erro ao validar alerta ID {alert.id}: {e2}")
-                continue
+        order_column = columns[sort_by] if sort_by in columns else columns.created_at
+        query = query.order_by(desc(order_column) if descending else order_column)
+    
+    # Paginação (uma linha extra indica se há próxima página)
+    if not cursor:
+        query = query.offset((page - 1) * size)
+    if expand:
+        rows = (await session.scalars(query.limit(size + 1))).unique().all()
+    else:
+        rows = (await session.execute(query.limit(size + 1))).all()
+    cursor_out = next_cursor(rows, keyset, size) if keyset else None
+    rows = rows[:size]
+
+    # Validação da página inteira em uma chamada (os valores gravados seguem os enums:
+    # normalize_alert_values na gravação e restrições CHECK no banco)
+    if expand:
+        adapter = ALERT_EXPANDED_LIST_ADAPTER
+        items = [
+            {
+                **{column.key: getattr(alert, column.key) for column in ALERT_LIST_COLUMNS},
+                "duration": alert.duration,
+                **{name: getattr(alert, name) for name in expand},
+            }
+            for alert in rows
+        ]
+    else:
+        adapter = ALERT_LIST_ADAPTER
+        items = [
+            {**row._asdict(), "duration": alert_duration(row.created_at, row.resolved_at)}
+            for row in rows
+        ]
+    alert_responses = adapter.validate_python(items)
     
     # Calcular informações de paginação
-    pages = math.ceil(total / size)
+    pages = math.ceil(total / size) if total is not None else None
     pagination = PaginationSchema(
         page=page,
         size=size,
         total=total,
-        pages=pages
+        pages=pages,
+        total_is_estimate=total_is_estimate,
+        next_cursor=cursor_out
     )
 
-    return AlertListResponseSchema(
-        data=alert_responses,
-        pagination=pagination,
-        filters_applied=filters
-    )
+    # O payload já é serializado pelo TypeAdapter: JSONResponse evita a nova validação
+    # do response_model e o jsonable_encoder
+    exclude = {"__all__": set(ALERT_EXPANDABLE) - set(expand)} if expand else None
+    return JSONResponse({
+        "success": True,
+        "data": adapter.dump_python(alert_responses, mode="json", exclude=exclude),
+        "pagination": pagination.model_dump(mode="json"),
+        "filters_applied": filters.model_dump(mode="json"),
+    })
 
 
 @alert_router.get("/stats", response_model=AlertStatsSchema)
 async def get_alert_stats(
+    request: Request,
+    response: Response,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_read_session)
 ):
     """
     Retorna estatísticas dos alertas para o dashboard.
+    O resultado fica em cache até a próxima alteração de alertas (ou o fim do TTL).
+    Com If-None-Match igual à ETag atual responde 304 sem calcular as estatísticas.
     """
-    # Estatísticas básicas
-    total_alerts = session.query(Alerts).count()
-    critical_active = session.query(Alerts).filter(
-        and_(Alerts.severity == "critical", Alerts.status == "active")
-    ).count()
-    
-    high_active = session.query(Alerts).filter(
-        and_(Alerts.severity == "high", Alerts.status == "active")
-    ).count()
-    
-    medium_active = session.query(Alerts).filter(
-        and_(Alerts.severity == "medium", Alerts.status == "active")
-    ).count()
-    
-    low_active = session.query(Alerts).filter(
-        and_(Alerts.severity == "low", Alerts.status == "active")
-    ).count()
-    
-    acknowledged = session.query(Alerts).filter(Alerts.status == "acknowledged").count()
-    
-    # Resolvidos hoje
-    today = datetime.now().date()
-    resolved_today = session.query(Alerts).filter(
-        and_(
-            Alerts.status == "resolved",
-            func.date(Alerts.resolved_at) == today
-        )
-    ).count()
-    
-    # MTTR (Mean Time To Resolution) - tempo médio de resolução em horas
-    resolved_alerts = session.query(Alerts).filter(
-        and_(Alerts.status == "resolved", Alerts.resolved_at.isnot(None))
-    ).all()
-    
-    if resolved_alerts:
-        total_resolution_time = sum([
-            (alert.resolved_at - alert.created_at).total_seconds() / 3600
-            for alert in resolved_alerts
-        ])
-        avg_resolution_hours = total_resolution_time / len(resolved_alerts)
-        mttr = f"{avg_resolution_hours:.1f}h"
+    # resolved_today muda com a data mesmo sem alterações nos alertas
+    not_modified = await conditional_get(request, response, session, "alerts.stats", (Alerts,),
+                                         extra=(datetime.now().date(),))
+    if not_modified:
+        return not_modified
+    return await stats_cache.get_or_compute("alerts", "stats", lambda: _compute_alert_stats(session))
+
+
+async def _alert_aggregates(session: AsyncSession, table, dialect: str) -> dict:
+    """
+    Contagens dos alertas de uma tabela, em valores que podem ser somados entre tabelas.
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+        table: Modelo consultado (Alerts ou AlertsArchive).
+        dialect (str): Nome do dialeto da conexão.
+    Returns:
+        dict: Contadores, soma e quantidade das resoluções (MTTR) e contagens por categoria e sistema.
+    """
+    today_start = datetime.combine(datetime.now().date(), time.min)
+    tomorrow_start = today_start + timedelta(days=1)
+    is_resolved = and_(table.status == "resolved", table.resolved_at.isnot(None))
+
+    def active_with(severity: str):
+        return func.count().filter(and_(table.severity == severity, table.status == "active"))
+
+    # Estatísticas básicas e MTTR em uma única varredura (agregação condicional)
+    stats = (await session.execute(select(
+        func.count().label("total_alerts"),
+        active_with("critical").label("critical_active"),
+        active_with("high").label("high_active"),
+        active_with("medium").label("medium_active"),
+        active_with("low").label("low_active"),
+        func.count().filter(table.status == "acknowledged").label("acknowledged"),
+        func.count().filter(and_(
+            table.status == "resolved",
+            table.resolved_at >= today_start,
+            table.resolved_at < tomorrow_start
+        )).label("resolved_today"),
+        # MTTR (Mean Time To Resolution) - soma e quantidade calculadas no banco, em segundos
+        func.sum(_resolution_seconds(dialect, table)).filter(is_resolved).label("resolution_seconds"),
+        func.count().filter(is_resolved).label("resolved")
+    ).select_from(table))).one()
+
+    category_stats = (await session.execute(select(
+        table.category,
+        func.count(table.id).label('count')
+    ).group_by(table.category))).all()
+    system_stats = (await session.execute(select(
+        table.system,
+        func.count(table.id).label('count')
+    ).group_by(table.system))).all()
+
+    by_system = {stat.system: stat.count for stat in system_stats}
+    return {
+        **stats._asdict(),
+        "by_category": {stat.category: stat.count for stat in category_stats},
+        "by_system": by_system,
+        "top_systems": heapq.nlargest(10, by_system, key=by_system.get),
+    }
+
+
+async def _compute_alert_stats(session: AsyncSession) -> AlertStatsSchema:
+    """
+    Calcula as estatísticas dos alertas, incluindo os arquivados (alerts_archive) nos
+    totais, no MTTR e nas contagens por categoria e sistema.
+    """
+    dialect = (await session.connection()).dialect.name
+    current = await _alert_aggregates(session, Alerts, dialect)
+    # O arquivo só muda quando o arquivador roda, que invalida "alerts_archive"
+    archived = await stats_cache.get_or_compute(
+        "alerts_archive", "stats", lambda: _alert_aggregates(session, AlertsArchive, dialect)
+    )
+
+    def total(name: str) -> int:
+        return current[name] + archived[name]
+
+    resolved = total("resolved")
+    if resolved:
+        resolution_seconds = float(current["resolution_seconds"] or 0) + float(archived["resolution_seconds"] or 0)
+        mttr = f"{resolution_seconds / resolved / 3600:.1f}h"
     else:
         mttr = "N/A"
-    
-    # Estatísticas por categoria
-    category_stats = session.query(
-        Alerts.category,
-        func.count(Alerts.id).label('count')
-    ).group_by(Alerts.category).all()
-
-    by_category = {stat.category: stat.count for stat in category_stats}
-
-    # Estatísticas por sistema (top 10)
-    system_stats = session.query(
-        Alerts.system,
-        func.count(Alerts.id).label('count')
-    ).group_by(Alerts.system).order_by(desc('count')).limit(10).all()
-    
-    by_system = {stat.system: stat.count for stat in system_stats}
-    
+
+    by_category = Counter(current["by_category"])
+    by_category.update(archived["by_category"])
+    # Estatísticas por sistema (top 10): um sistema ausente de alerts só soma o que tem no
+    # arquivo, então só entra no top 10 se já estiver no top 10 do arquivo
+    by_system = {
+        system: current["by_system"].get(system, 0) + archived["by_system"].get(system, 0)
+        for system in (*current["by_system"], *archived["top_systems"])
+    }
+
     return AlertStatsSchema(
-        total_alerts=total_alerts,
-        critical_active=critical_active,
-        high_active=high_active,
-        medium_active=medium_active,
-        low_active=low_active,
-        acknowledged=acknowledged,
-        resolved_today=resolved_today,
+        total_alerts=total("total_alerts"),
+        critical_active=total("critical_active"),
+        high_active=total("high_active"),
+        medium_active=total("medium_active"),
+        low_active=total("low_active"),
+        acknowledged=total("acknowledged"),
+        resolved_today=total("resolved_today"),
         average_resolution_time=mttr,
-        by_category=by_category,
-        by_system=by_system
+        by_category=dict(by_category),
+        by_system={system: by_system[system] for system in heapq.nlargest(10, by_system, key=by_system.get)}
     )
 
 
@@ -462,17 +544,25 @@ async def get_alert_stats(
 async def get_alert_details(
     alert_id: int,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Retorna detalhes de um alerta específico com histórico de logs.
+    Alertas arquivados (mesmo ID) são buscados em alerts_archive.
     """
-    alert = session.query(Alerts).options(
-        joinedload(Alerts.alert_logs).joinedload(AlertLogs.user),
+    alert = await session.scalar(select(Alerts).options(
+        selectinload(Alerts.alert_logs).joinedload(AlertLogs.user),
         joinedload(Alerts.endpoint),
         joinedload(Alerts.user_created),
         joinedload(Alerts.user_assigned)
-    ).filter(Alerts.id == alert_id).first()
+    ).where(Alerts.id == alert_id))
+    if not alert:
+        alert = await session.scalar(select(AlertsArchive).options(
+            selectinload(AlertsArchive.alert_logs).joinedload(AlertLogsArchive.user),
+            joinedload(AlertsArchive.endpoint),
+            joinedload(AlertsArchive.user_created),
+            joinedload(AlertsArchive.user_assigned)
+        ).where(AlertsArchive.id == alert_id))
     
     if not alert:
         raise HTTPException(status_code=404, detail="Alerta não encontrado")
@@ -485,7 +575,7 @@ async def update_alert(
     alert_id: int,
     alert_data: AlertUpdateSchema,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Atualiza um alerta existente.
@@ -493,7 +583,7 @@ async def update_alert(
     """
     _check_admin_or_monitor(logged_user)
     
-    alert = session.query(Alerts).filter(Alerts.id == alert_id).first()
+    alert = await session.get(Alerts, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail="Alerta não encontrado")
     
@@ -506,9 +596,15 @@ async def update_alert(
             else:
                 setattr(alert, field, value)
     
+    alert.fingerprint = alert_fingerprint(alert.id_endpoint, alert.category, alert.title)
     alert.updated_at = datetime.now()
-    session.commit()
-    session.refresh(alert)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail="Já existe um alerta aberto com o mesmo endpoint, categoria e título")
+    stats_cache.invalidate("alerts")
+    await session.refresh(alert)
     
     # Log da atualização
     log_entry = AlertLogs(
@@ -518,7 +614,8 @@ async def update_alert(
         comment=f"Alerta atualizado por {logged_user.name}"
     )
     session.add(log_entry)
-    session.commit()
+    await session.commit()
+    await publish_alert_events(session, [alert.id], "alert.updated")
     
     return AlertResponseSchema.model_validate(alert)
 
@@ -528,14 +625,14 @@ async def alert_action(
     alert_id: int,
     action_data: AlertActionSchema,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Executa ações em um alerta (acknowledge, resolve, assign).
     """
     _check_admin_or_monitor(logged_user)
     
-    alert = session.query(Alerts).filter(Alerts.id == alert_id).first()
+    alert = await session.get(Alerts, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail="Alerta não encontrado")
     
@@ -559,7 +656,8 @@ async def alert_action(
         raise HTTPException(status_code=400, detail="Ação inválida")
     
     alert.updated_at = datetime.now()
-    session.commit()
+    await session.commit()
+    stats_cache.invalidate("alerts")
     
     # Log da ação
     log_entry = AlertLogs(
@@ -569,7 +667,8 @@ async def alert_action(
         comment=action_data.comment or action_comment
     )
     session.add(log_entry)
-    session.commit()
+    await session.commit()
+    await publish_alert_events(session, [alert.id], ALERT_ACTION_EVENTS[action_data.action])
     
     return {"success": True, "message": f"Ação '{action_data.action}' executada com sucesso"}
 
@@ -578,7 +677,7 @@ async def alert_action(
 async def delete_alert(
     alert_id: int,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Remove um alerta do sistema.
@@ -587,64 +686,101 @@ async def delete_alert(
     if logged_user.access_level != "ADMIN":
         raise HTTPException(status_code=403, detail="Operação não permitida: requer nível ADMIN")
     
-    alert = session.query(Alerts).filter(Alerts.id == alert_id).first()
+    alert = await session.get(Alerts, alert_id)
     if not alert:
         raise HTTPException(status_code=404, detail="Alerta não encontrado")
     
-    session.delete(alert)
-    session.commit()
+    await session.delete(alert)
+    await session.commit()
+    stats_cache.invalidate("alerts")
+    event_broker.publish("alert.deleted", {"event": "alert.deleted", "alert": {"id": alert_id}})
     
     return {"success": True, "message": "Alerta removido com sucesso"}
 
 
+def _bulk_action_values(action_data: AlertActionSchema, now: datetime):
+    """
+    Define o UPDATE de uma ação em lote.
+    Args:
+        action_data (AlertActionSchema): Ação solicitada.
+        now (datetime): Momento da ação.
+    Raises:
+        HTTPException: Se a ação for inválida.
+    Returns:
+        tuple: (condição de status ou None, valores atualizados).
+    """
+    if action_data.action == "acknowledge":
+        return Alerts.status == "active", {"status": "acknowledged", "acknowledged_at": now, "updated_at": now}
+    if action_data.action == "resolve":
+        return Alerts.status != "resolved", {"status": "resolved", "resolved_at": now, "updated_at": now}
+    if action_data.action == "assign":
+        return None, {"assignee": action_data.assignee, "updated_at": now}
+    raise HTTPException(status_code=400, detail="Ação inválida")
+
+
 @alert_router.post("/bulk-actions")
 async def bulk_alert_actions(
     alert_ids: List[int],
     action_data: AlertActionSchema,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Executa ações em lote em múltiplos alertas.
+    Cada bloco de até BULK_CHUNK_SIZE ids é atualizado com um único UPDATE ... RETURNING
+    (apenas os alertas cujo status permite a ação) e os logs são inseridos de uma vez,
+    sem carregar os alertas na sessão. Tudo é gravado em uma única transação.
     """
     _check_admin_or_monitor(logged_user)
-    
-    alerts = session.query(Alerts).filter(Alerts.id.in_(alert_ids)).all()
-    if not alerts:
-        raise HTTPException(status_code=404, detail="Nenhum alerta encontrado")
-    
+
+    now = datetime.now()
+    status_condition, values = _bulk_action_values(action_data, now)
+    comment = action_data.comment or f"Ação em lote executada por {logged_user.name}"
+    ids = sorted(set(alert_ids))
+
     updated_count = 0
-    for alert in alerts:
-        if action_data.action == "acknowledge" and alert.status == "active":
-            alert.status = "acknowledged"
-            alert.acknowledged_at = datetime.now()
-            updated_count += 1
-            
-        elif action_data.action == "resolve" and alert.status != "resolved":
-            alert.status = "resolved"
-            alert.resolved_at = datetime.now()
-            updated_count += 1
-            
-        elif action_data.action == "assign":
-            alert.assignee = action_data.assignee
-            updated_count += 1
-        
-        alert.updated_at = datetime.now()
-        
-        # Log da ação
-        log_entry = AlertLogs(
-            id_alert=alert.id,
-            id_user=logged_user.id,
-            action=f"bulk_{action_data.action}",
-            comment=action_data.comment or f"Ação em lote executada por {logged_user.name}"
-        )
-        session.add(log_entry)
-    
-    session.commit()
+    updated_alert_ids = []
+    for offset in range(0, len(ids), BULK_CHUNK_SIZE):
+        chunk = ids[offset:offset + BULK_CHUNK_SIZE]
+        statement = update(Alerts).where(Alerts.id.in_(chunk))
+        if status_condition is not None:
+            statement = statement.where(status_condition)
+        updated_ids = (await session.scalars(
+            statement.values(**values).returning(Alerts.id),
+            execution_options={"synchronize_session": False}
+        )).all()
+        if not updated_ids:
+            continue
+
+        # Log da ação (um INSERT em lote por bloco)
+        await session.execute(insert(AlertLogs), [
+            {
+                "id_alert": alert_id,
+                "id_user": logged_user.id,
+                "action": f"bulk_{action_data.action}",
+                "comment": comment,
+                "created_at": now,
+            }
+            for alert_id in updated_ids
+        ])
+        updated_count += len(updated_ids)
+        updated_alert_ids += updated_ids
+
+    if not updated_count:
+        # Nada alterado: distingue ids inexistentes de alertas que já estavam no estado pedido
+        for offset in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = ids[offset:offset + BULK_CHUNK_SIZE]
+            if await session.scalar(select(Alerts.id).where(Alerts.id.in_(chunk)).limit(1)) is not None:
+                break
+        else:
+            raise HTTPException(status_code=404, detail="Nenhum alerta encontrado")
+
+    await session.commit()
+    stats_cache.invalidate("alerts")
+    await publish_alert_events(session, updated_alert_ids, ALERT_ACTION_EVENTS[action_data.action])
     
     return {
         "success": True, 
         "message": f"Ação executada em {updated_count} alertas",
         "updated_count": updated_count
     }
-
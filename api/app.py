@@ -4,7 +4,8 @@ import asyncio
 import sys
 from datetime import datetime
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Detecta se está sendo executado diretamente ou como módulo
@@ -18,6 +19,14 @@ if __name__ == "__main__":
     from api.alert_routes import alert_router
     from api.config_routes import config_router
     from api.sla_routes import sla_router
+    from api.stream_routes import stream_router
+    from api.database import init_database, close_database, BackgroundSessionLocal, WriterBusyError
+    from api.rule_engine import rule_engine, RULE_ENGINE_INTERVAL
+    from api.notifications import notification_dispatcher, email_channel
+    from api.outbox import outbox_relay
+    from api.alert_archive import alert_archiver
+    from api.events import status_watcher
+    from api.sla_engine import sla_engine
 else:
     # Quando importado como módulo (uvicorn api.app:app)
     try:
@@ -28,6 +37,14 @@ else:
         from api.alert_routes import alert_router
         from api.config_routes import config_router
         from api.sla_routes import sla_router
+        from api.stream_routes import stream_router
+        from api.database import init_database, close_database, BackgroundSessionLocal, WriterBusyError
+        from api.rule_engine import rule_engine, RULE_ENGINE_INTERVAL
+        from api.notifications import notification_dispatcher, email_channel
+        from api.outbox import outbox_relay
+        from api.alert_archive import alert_archiver
+        from api.events import status_watcher
+        from api.sla_engine import sla_engine
     except ImportError:
         # Fallback para imports relativos se absolutos falharem
         from .auth_routes import auth_router
@@ -36,15 +53,53 @@ else:
         from .alert_routes import alert_router
         from .config_routes import config_router
         from .sla_routes import sla_router
+        from .stream_routes import stream_router
+        from .database import init_database, close_database, BackgroundSessionLocal, WriterBusyError
+        from .rule_engine import rule_engine, RULE_ENGINE_INTERVAL
+        from .notifications import notification_dispatcher, email_channel
+        from .outbox import outbox_relay
+        from .alert_archive import alert_archiver
+        from .events import status_watcher
+        from .sla_engine import sla_engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicializa e encerra os recursos compartilhados da API."""
+    await init_database()
+    await notification_dispatcher.start()
+    email_channel.start()
+    # Tarefas em segundo plano aguardam a vez de escrever depois das requisições
+    outbox_relay.start(BackgroundSessionLocal)
+    rule_engine.start(BackgroundSessionLocal, RULE_ENGINE_INTERVAL)
+    alert_archiver.start(BackgroundSessionLocal)
+    status_watcher.start(BackgroundSessionLocal)
+    sla_engine.start(BackgroundSessionLocal)
+    yield
+    await sla_engine.stop()
+    await status_watcher.stop()
+    await alert_archiver.stop()
+    await rule_engine.stop()
+    await outbox_relay.stop()
+    await email_channel.stop()
+    await notification_dispatcher.stop()
+    await close_database()
 
 
 app = FastAPI(
     title="API de Monitoramento SNMP",
     description="API que gerencia dispositivos SNMP e coleta métricas em tempo real.",
-    version="2.0.1"
+    version="2.0.1",
+    lifespan=lifespan
 )
 
 
+@app.exception_handler(WriterBusyError)
+async def writer_busy_handler(request: Request, exc: WriterBusyError):
+    """Fila do escritor (SQLite) cheia ou espera esgotada: o cliente pode tentar de novo."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
 # Configuração CORS
 app.add_middleware(
     CORSMiddleware,
@@ -80,14 +135,16 @@ async def detailed_health_check():
 async def database_status():
     """Verifica o status da conexão com o banco de dados."""
     try:
-        from .models import get_database_url, db
+        from sqlalchemy import text
+        from .models import get_database_url
+        from .database import async_db, async_read_db
         import os
         
         db_url = get_database_url()
         
-        # Testar conexão
-        with db.connect() as conn:
-            result = conn.execute("SELECT 1").fetchone()
+        # Testar conexão (no SQLite pelo pool de leitura: a conexão de escrita é da fila do escritor)
+        async with (async_read_db or async_db).connect() as conn:
+            result = (await conn.execute(text("SELECT 1"))).fetchone()
             
         return {
             "status": "connected",
@@ -113,6 +170,7 @@ app.include_router(users_router)
 app.include_router(alert_router)
 app.include_router(config_router)
 app.include_router(sla_router)
+app.include_router(stream_router)
 
 
 if __name__ == "__main__":
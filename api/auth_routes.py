@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt
 from datetime import datetime, timedelta, timezone
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Optional
 from api.models import Users
-from api.dependencies import init_session, verify_token
+from api.dependencies import init_lookup_session, verify_token
 from api.encryption import SECRET_KEY, bcrypt_context, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 from api.schemas import LoginSchemas
 
@@ -38,23 +40,24 @@ def create_token(
 
 
 
-def _authenticate_user(
+async def _authenticate_user(
     email: str,
     password: str,
-    session: Session
+    session: AsyncSession
 ) -> Optional[Users]:
-    user = session.query(Users).filter(Users.email == email).first()
-    if user and bcrypt_context.verify(password, user.password):
+    user = (await session.scalars(select(Users).where(Users.email == email))).first()
+    # bcrypt é custoso em CPU: roda fora do event loop
+    if user and await run_in_threadpool(bcrypt_context.verify, password, user.password):
         return user
     return None
 
 
 @auth_router.post("/login", status_code=status.HTTP_200_OK)
-async def login(login_schemas: LoginSchemas, session: Session = Depends(init_session)):
+async def login(login_schemas: LoginSchemas, session: AsyncSession = Depends(init_lookup_session)):
     """
     Realiza o login de um usuário via JSON.
     """
-    user = _authenticate_user(login_schemas.email, login_schemas.password, session)
+    user = await _authenticate_user(login_schemas.email, login_schemas.password, session)
     if not user:
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     access_token = create_token(user.id, token_type="access")
@@ -70,12 +73,12 @@ async def login(login_schemas: LoginSchemas, session: Session = Depends(init_ses
 @auth_router.post("/login-form", status_code=status.HTTP_200_OK)
 async def login_form(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_lookup_session)
 ):
     """
     Realiza o login de um usuário via formulário.
     """
-    user = _authenticate_user(form_data.username, form_data.password, session)
+    user = await _authenticate_user(form_data.username, form_data.password, session)
     if not user:
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     access_token = create_token(user.id, timeout=timedelta(days=30), token_type="access")
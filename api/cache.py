@@ -0,0 +1,379 @@
+import os
+import time
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+
+class StatsCache:
+    """
+    Cache em memória (por processo) para estatísticas do dashboard.
+    Cada namespace ("alerts", "users", ...) tem um número de versão que as rotas de escrita
+    incrementam após o commit; entradas de uma versão anterior deixam de valer na hora
+    e são descartadas.
+    O TTL curto é apenas uma rede de segurança para escritas feitas fora desta API ou
+    por outros workers do uvicorn, que têm o seu próprio cache.
+    Requisições simultâneas que encontram o cache vazio aguardam um único cálculo.
+    As chaves incluem os filtros (inclusive texto livre): acima de max_entries, as
+    entradas vencidas e depois as menos usadas recentemente são removidas.
+    Variáveis:
+        STATS_CACHE_TTL (float): Validade das entradas em segundos (padrão 10).
+        STATS_CACHE_MAX_ENTRIES (int): Entradas mantidas em memória (padrão 1024).
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._versions: Dict[str, int] = {}
+        self._entries: Dict[Tuple[str, Hashable], Tuple[int, float, Any]] = {}
+        # Lock por chave e quantas requisições o usam; removido quando ninguém mais aguarda
+        self._locks: Dict[Tuple[str, Hashable], Tuple[asyncio.Lock, List[int]]] = {}
+
+    def version(self, namespace: str) -> int:
+        """Retorna a versão atual de um namespace."""
+        return self._versions.get(namespace, 0)
+
+    def invalidate(self, *namespaces: str):
+        """
+        Invalida todas as entradas dos namespaces informados.
+        Args:
+            *namespaces (str): Namespaces alterados (ex.: "alerts").
+        """
+        for namespace in namespaces:
+            self._versions[namespace] = self.version(namespace) + 1
+        for entry_key in [entry_key for entry_key in self._entries if entry_key[0] in namespaces]:
+            del self._entries[entry_key]
+
+    def _lookup(self, entry_key: Tuple[str, Hashable]):
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return False, None
+        version, expires_at, value = entry
+        if version != self.version(entry_key[0]) or time.monotonic() >= expires_at:
+            del self._entries[entry_key]
+            return False, None
+        # Reinserir mantém o dicionário em ordem de uso (LRU)
+        self._entries[entry_key] = self._entries.pop(entry_key)
+        return True, value
+
+    def _store(self, entry_key: Tuple[str, Hashable], version: int, value: Any):
+        self._entries.pop(entry_key, None)
+        self._entries[entry_key] = (version, time.monotonic() + self.ttl, value)
+        if len(self._entries) > self.max_entries:
+            now = time.monotonic()
+            for old_key in [
+                old_key for old_key, (old_version, expires_at, _) in self._entries.items()
+                if old_version != self.version(old_key[0]) or expires_at <= now
+            ]:
+                del self._entries[old_key]
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+    async def get_or_compute(self, namespace: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Retorna o valor em cache ou calcula (uma única vez) e armazena.
+        Args:
+            namespace (str): Namespace usado na invalidação.
+            key (Hashable): Chave dentro do namespace.
+            compute (Callable): Corrotina que calcula o valor.
+        Returns:
+            Any: Valor em cache ou recém-calculado.
+        """
+        entry_key = (namespace, key)
+        found, value = self._lookup(entry_key)
+        if found:
+            self.hits += 1
+            return value
+
+        lock, users = self._locks.setdefault(entry_key, (asyncio.Lock(), [0]))
+        users[0] += 1
+        try:
+            async with lock:
+                # Outra requisição pode ter calculado enquanto esta aguardava
+                found, value = self._lookup(entry_key)
+                if found:
+                    self.hits += 1
+                    return value
+
+                self.misses += 1
+                version = self.version(namespace)
+                value = await compute()
+                # Uma escrita durante o cálculo já invalidou o resultado: não guardar
+                if version == self.version(namespace):
+                    self._store(entry_key, version, value)
+                return value
+        finally:
+            users[0] -= 1
+            if not users[0]:
+                del self._locks[entry_key]
+
+    def snapshot(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "ttl_seconds": self.ttl,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+            "locks": len(self._locks),
+            "versions": dict(self._versions),
+        }
+
+
+class SingleFlight:
+    """
+    Coalescência (single-flight) de leituras caras idênticas, por processo.
+    - Requisições simultâneas com a mesma chave (rota + parâmetros normalizados) aguardam
+      um único cálculo em andamento e recebem o mesmo resultado.
+    - O resultado é reaproveitado por `fresh` segundos; nos `stale` segundos seguintes
+      é servido imediatamente (stale-while-revalidate) enquanto um único recálculo
+      roda em segundo plano.
+    - O cálculo roda em uma tarefa própria: uma requisição cancelada (cliente desconectado)
+      não interrompe o resultado esperado pelas demais. Erros não ficam em cache.
+    Variáveis:
+        SINGLE_FLIGHT_FRESH (float): Segundos em que o resultado é reaproveitado (padrão 5).
+        SINGLE_FLIGHT_STALE (float): Segundos adicionais servindo o resultado antigo (padrão 30).
+        SINGLE_FLIGHT_MAX_ENTRIES (int): Resultados mantidos em memória (padrão 256).
+    """
+
+    def __init__(self, fresh: float, stale: float, max_entries: int):
+        self.fresh = fresh
+        self.stale = stale
+        self.max_entries = max_entries
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.counters = {
+            "requests": 0, "computations": 0, "deduplicated": 0,
+            "fresh_hits": 0, "stale_hits": 0, "refreshes": 0, "errors": 0,
+        }
+
+    @staticmethod
+    def key(route: str, **params: Any) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+        """
+        Chave normalizada: os parâmetros já convertidos pela rota, em ordem alfabética
+        (?days=30&x=1 e ?x=1&days=030 resultam na mesma chave).
+        Args:
+            route (str): Identificador da rota (ex.: "sla.summary").
+            **params: Parâmetros que mudam o resultado.
+        Returns:
+            tuple: Chave do resultado.
+        """
+        return route, tuple(sorted(params.items()))
+
+    def _start(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[asyncio.Task, bool]:
+        task = self._inflight.get(key)
+        if task is not None:
+            return task, False
+        self.counters["computations"] += 1
+        task = asyncio.create_task(self._compute(key, compute))
+        # Recálculos em segundo plano podem falhar sem ninguém aguardando
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = task
+        return task, True
+
+    async def _compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            self._store(key, value)
+            return value
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: Hashable, value: Any):
+        self._results.pop(key, None)
+        self._results[key] = (time.monotonic(), value)
+        if len(self._results) > self.max_entries:
+            expired = time.monotonic() - self.fresh - self.stale
+            for old_key in [k for k, (computed_at, _) in self._results.items() if computed_at < expired]:
+                del self._results[old_key]
+            while len(self._results) > self.max_entries:
+                del self._results[next(iter(self._results))]
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Retorna o resultado da chave, compartilhando o cálculo com requisições simultâneas.
+        Args:
+            key (Hashable): Chave gerada por SingleFlight.key.
+            compute (Callable): Corrotina que calcula o resultado (com sua própria sessão).
+        Returns:
+            Any: Resultado recente, antigo (durante o recálculo) ou recém-calculado.
+        """
+        self.counters["requests"] += 1
+        entry = self._results.get(key)
+        if entry is not None:
+            computed_at, value = entry
+            age = time.monotonic() - computed_at
+            if age < self.fresh:
+                self.counters["fresh_hits"] += 1
+                return value
+            if age < self.fresh + self.stale:
+                self.counters["stale_hits"] += 1
+                _, started = self._start(key, compute)
+                if started:
+                    self.counters["refreshes"] += 1
+                return value
+
+        task, started = self._start(key, compute)
+        if not started:
+            self.counters["deduplicated"] += 1
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> dict:
+        return {
+            "fresh_seconds": self.fresh,
+            "stale_seconds": self.stale,
+            "entries": len(self._results),
+            "in_flight": len(self._inflight),
+            **self.counters,
+        }
+
+
+class _Broadcast:
+    """Pedaços de um produtor compartilhado e a próxima posição de cada leitor."""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.base = 0
+        self.readers: Dict[object, int] = {}
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def head(self) -> int:
+        return self.base + len(self.chunks)
+
+
+class StreamFlight:
+    """
+    Coalescência (single-flight) de respostas transmitidas idênticas, por processo.
+    - A primeira requisição de uma chave inicia um único produtor em tarefa própria; as
+      simultâneas com a mesma chave recebem os mesmos pedaços, desde o início.
+    - O produtor anda no máximo `buffer` pedaços à frente do leitor mais lento, então a
+      memória fica limitada qualquer que seja o tamanho da resposta.
+    - Enquanto o início da resposta ainda está guardado, novas requisições entram no
+      produtor em andamento; depois disso a chave é liberada e a próxima inicia outro.
+    - O produtor é cancelado quando o último leitor desconecta. Erros chegam a todos os
+      leitores depois dos pedaços já entregues.
+    Variáveis:
+        STREAM_FLIGHT_BUFFER (int): Pedaços guardados por produtor (padrão 64).
+    """
+
+    def __init__(self, buffer: int):
+        self.buffer = max(1, buffer)
+        self._inflight: Dict[Hashable, _Broadcast] = {}
+        self.counters = {"requests": 0, "streams": 0, "deduplicated": 0, "errors": 0}
+
+    def stream(self, key: Hashable, produce: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Retorna os pedaços da chave, compartilhando o produtor com requisições simultâneas.
+        Args:
+            key (Hashable): Chave gerada por SingleFlight.key.
+            produce (Callable): Gerador assíncrono da resposta (com sua própria sessão).
+        Returns:
+            AsyncIterator: Pedaços da resposta, na ordem do produtor.
+        """
+        self.counters["requests"] += 1
+        return self._read(key, produce)
+
+    def _join(self, key: Hashable, produce: Callable[[], AsyncIterator[Any]]) -> _Broadcast:
+        shared = self._inflight.get(key)
+        if shared is not None and shared.base == 0:
+            self.counters["deduplicated"] += 1
+            return shared
+        self.counters["streams"] += 1
+        shared = _Broadcast()
+        self._inflight[key] = shared
+        shared.task = asyncio.create_task(self._produce(key, shared, produce))
+        # Sem leitores o erro do produtor não é aguardado por ninguém
+        shared.task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return shared
+
+    def _release(self, key: Hashable, shared: _Broadcast):
+        if self._inflight.get(key) is shared:
+            del self._inflight[key]
+
+    async def _produce(self, key: Hashable, shared: _Broadcast, produce: Callable[[], AsyncIterator[Any]]):
+        try:
+            async with aclosing(produce()) as chunks:
+                async for chunk in chunks:
+                    async with shared.changed:
+                        await shared.changed.wait_for(
+                            lambda: shared.head - min(shared.readers.values(), default=shared.head) < self.buffer
+                        )
+                        if shared.head >= self.buffer:
+                            # O início deixa de caber: descarta o que todos já leram
+                            self._release(key, shared)
+                            low = min(shared.readers.values(), default=shared.head)
+                            del shared.chunks[:low - shared.base]
+                            shared.base = low
+                        shared.chunks.append(chunk)
+                        shared.changed.notify_all()
+        except Exception as e:
+            self.counters["errors"] += 1
+            shared.error = e
+        finally:
+            self._release(key, shared)
+            shared.done = True
+            async with shared.changed:
+                shared.changed.notify_all()
+
+    async def _read(self, key: Hashable, produce: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        # Entrar e registrar a posição sem await no meio: o produtor não descarta o início antes
+        shared = self._join(key, produce)
+        reader = object()
+        shared.readers[reader] = position = shared.base
+        try:
+            while True:
+                async with shared.changed:
+                    await shared.changed.wait_for(lambda: position < shared.head or shared.done)
+                    if position >= shared.head:
+                        break
+                    chunk = shared.chunks[position - shared.base]
+                    position += 1
+                    shared.readers[reader] = position
+                    shared.changed.notify_all()
+                yield chunk
+            if shared.error is not None:
+                raise shared.error
+        finally:
+            del shared.readers[reader]
+            if not shared.readers and not shared.done:
+                self._release(key, shared)
+                shared.task.cancel()
+            elif not shared.done:
+                # O produtor pode estar esperando justamente por este leitor
+                async with shared.changed:
+                    shared.changed.notify_all()
+
+    def snapshot(self) -> dict:
+        return {
+            "buffer_chunks": self.buffer,
+            "in_flight": len(self._inflight),
+            **self.counters,
+        }
+
+
+# Cache compartilhado das estatísticas de alertas e usuários
+stats_cache = StatsCache(
+    ttl=float(os.getenv("STATS_CACHE_TTL", 10)),
+    max_entries=int(os.getenv("STATS_CACHE_MAX_ENTRIES", 1024)),
+)
+
+# Coalescência das leituras caras (relatórios de SLA)
+request_flight = SingleFlight(
+    fresh=float(os.getenv("SINGLE_FLIGHT_FRESH", 5)),
+    stale=float(os.getenv("SINGLE_FLIGHT_STALE", 30)),
+    max_entries=int(os.getenv("SINGLE_FLIGHT_MAX_ENTRIES", 256)),
+)
+
+# Coalescência das respostas transmitidas (relatórios de SLA sem limit)
+stream_flight = StreamFlight(buffer=int(os.getenv("STREAM_FLIGHT_BUFFER", 64)))
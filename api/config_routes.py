@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, delete
 from typing import Optional, List
 from datetime import datetime
 
 from .models import Users, WebHookConfig, EmailConfig, FailureThresholdConfig, PerformanceThresholds
 from .dependencies import init_session, verify_token
-from .encryption import bcrypt_context
+from .database import get_pool_status
+from .cache import stats_cache, request_flight, stream_flight
+from .etag import conditional_get, table_watermarks
+from .rule_engine import rule_engine
+from .notifications import notification_dispatcher, email_channel
+from .outbox import outbox_relay, outbox_status
+from .alert_archive import alert_archiver, archive_status
+from .sla_engine import sla_engine
 from .schemas import (
     WebHookConfigSchema,
     WebHookConfigResponse,
@@ -40,7 +47,7 @@ def check_admin_permission(user: Users):
 @config_router.post("/webhook", response_model=WebHookConfigResponse)
 async def create_webhook_config(
     webhook_data: WebHookConfigSchema,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -54,30 +61,36 @@ async def create_webhook_config(
             url=webhook_data.url,
             active=webhook_data.active,
             timeout=webhook_data.timeout,
-            access_token=webhook_data.access_token
+            access_token=webhook_data.access_token,
+            batch_size=webhook_data.batch_size,
+            batch_wait_ms=webhook_data.batch_wait_ms,
+            max_concurrency=webhook_data.max_concurrency,
+            rate_limit=webhook_data.rate_limit,
+            rate_burst=webhook_data.rate_burst
         )
         
         session.add(new_webhook)
-        session.commit()
-        session.refresh(new_webhook)
+        await session.commit()
+        stats_cache.invalidate("webhooks")
+        await session.refresh(new_webhook)
         
         return new_webhook
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating webhook config: {str(e)}")
 
 
 @config_router.get("/webhook", response_model=List[WebHookConfigResponse])
 async def list_webhook_configs(
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
     Lista todas as configurações de webhook.
     """
     try:
-        webhooks = session.query(WebHookConfig).order_by(WebHookConfig.created_at.desc()).all()
+        webhooks = (await session.scalars(select(WebHookConfig).order_by(WebHookConfig.created_at.desc()))).all()
         return webhooks
         
     except Exception as e:
@@ -87,14 +100,14 @@ async def list_webhook_configs(
 @config_router.get("/webhook/{webhook_id}", response_model=WebHookConfigResponse)
 async def get_webhook_config(
     webhook_id: int,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
     Obtém uma configuração de webhook específica pelo ID.
     """
     try:
-        webhook = session.query(WebHookConfig).filter(WebHookConfig.id == webhook_id).first()
+        webhook = await session.get(WebHookConfig, webhook_id)
         
         if not webhook:
             raise HTTPException(status_code=404, detail="Webhook config not found")
@@ -109,7 +122,7 @@ async def get_webhook_config(
 async def update_webhook_config(
     webhook_id: int,
     webhook_data: WebHookConfigUpdate,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -119,7 +132,7 @@ async def update_webhook_config(
     check_admin_permission(current_user)
     
     try:
-        webhook = session.query(WebHookConfig).filter(WebHookConfig.id == webhook_id).first()
+        webhook = await session.get(WebHookConfig, webhook_id)
         
         if not webhook:
             raise HTTPException(status_code=404, detail="Webhook config not found")
@@ -129,23 +142,32 @@ async def update_webhook_config(
             webhook.url = webhook_data.url
         if webhook_data.active is not None:
             webhook.active = webhook_data.active
+        if webhook_data.batch_size is not None:
+            webhook.batch_size = webhook_data.batch_size
+        if webhook_data.batch_wait_ms is not None:
+            webhook.batch_wait_ms = webhook_data.batch_wait_ms
+        # Limites podem ser removidos enviando null
+        for field in ("max_concurrency", "rate_limit", "rate_burst"):
+            if field in webhook_data.model_fields_set:
+                setattr(webhook, field, getattr(webhook_data, field))
         
         webhook.updated_at = func.now()
         
-        session.commit()
-        session.refresh(webhook)
+        await session.commit()
+        stats_cache.invalidate("webhooks")
+        await session.refresh(webhook)
         
         return webhook
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating webhook config: {str(e)}")
 
 
 @config_router.delete("/webhook/{webhook_id}")
 async def delete_webhook_config(
     webhook_id: int,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -155,18 +177,19 @@ async def delete_webhook_config(
     check_admin_permission(current_user)
     
     try:
-        webhook = session.query(WebHookConfig).filter(WebHookConfig.id == webhook_id).first()
+        webhook = await session.get(WebHookConfig, webhook_id)
         
         if not webhook:
             raise HTTPException(status_code=404, detail="Webhook config not found")
         
-        session.delete(webhook)
-        session.commit()
+        await session.delete(webhook)
+        await session.commit()
+        stats_cache.invalidate("webhooks")
         
         return {"message": "Webhook config deleted successfully"}
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting webhook config: {str(e)}")
 
 
@@ -177,7 +200,7 @@ async def delete_webhook_config(
 @config_router.post("/email", response_model=EmailConfigResponse)
 async def create_email_config(
     email_data: EmailConfigSchema,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -197,26 +220,27 @@ async def create_email_config(
         )
 
         session.add(new_email_config)
-        session.commit()
-        session.refresh(new_email_config)
+        await session.commit()
+        await session.refresh(new_email_config)
+        stats_cache.invalidate("email")
 
         return new_email_config
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating email config: {str(e)}")
 
 
 @config_router.get("/email", response_model=List[EmailConfigResponse])
 async def list_email_configs(
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
     Lista todas as configurações de email.
     """
     try:
-        email_configs = session.query(EmailConfig).order_by(EmailConfig.created_at.desc()).all()
+        email_configs = (await session.scalars(select(EmailConfig).order_by(EmailConfig.created_at.desc()))).all()
         return email_configs
         
     except Exception as e:
@@ -226,14 +250,14 @@ async def list_email_configs(
 @config_router.get("/email/{email_id}", response_model=EmailConfigResponse)
 async def get_email_config(
     email_id: int,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
     Obtém uma configuração de email específica pelo ID.
     """
     try:
-        email_config = session.query(EmailConfig).filter(EmailConfig.id == email_id).first()
+        email_config = await session.get(EmailConfig, email_id)
         
         if not email_config:
             raise HTTPException(status_code=404, detail="Email config not found")
@@ -248,7 +272,7 @@ async def get_email_config(
 async def update_email_config(
     email_id: int,
     email_data: EmailConfigUpdate,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -258,7 +282,7 @@ async def update_email_config(
     check_admin_permission(current_user)
     
     try:
-        email_config = session.query(EmailConfig).filter(EmailConfig.id == email_id).first()
+        email_config = await session.get(EmailConfig, email_id)
         
         if not email_config:
             raise HTTPException(status_code=404, detail="Email config not found")
@@ -267,7 +291,8 @@ async def update_email_config(
         if email_data.email is not None:
             email_config.email = email_data.email
         if email_data.password is not None:
-            email_config.password = bcrypt_context.hash(email_data.password)
+            # Guardada como no cadastro: o envio precisa da senha original para o login SMTP
+            email_config.password = email_data.password
         if email_data.port is not None:
             email_config.port = email_data.port
         if email_data.server is not None:
@@ -275,20 +300,21 @@ async def update_email_config(
 
         email_config.updated_at = func.now()
         
-        session.commit()
-        session.refresh(email_config)
+        await session.commit()
+        await session.refresh(email_config)
+        stats_cache.invalidate("email")
         
         return email_config
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating email config: {str(e)}")
 
 
 @config_router.delete("/email/{email_id}")
 async def delete_email_config(
     email_id: int,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -298,18 +324,19 @@ async def delete_email_config(
     check_admin_permission(current_user)
     
     try:
-        email_config = session.query(EmailConfig).filter(EmailConfig.id == email_id).first()
+        email_config = await session.get(EmailConfig, email_id)
         
         if not email_config:
             raise HTTPException(status_code=404, detail="Email config not found")
         
-        session.delete(email_config)
-        session.commit()
+        await session.delete(email_config)
+        await session.commit()
+        stats_cache.invalidate("email")
         
         return {"message": "Email config deleted successfully"}
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting email config: {str(e)}")
 
 
@@ -320,7 +347,7 @@ async def delete_email_config(
 @config_router.post("/failure-threshold", response_model=FailureThresholdConfigResponse)
 async def create_failure_threshold_config(
     threshold_data: FailureThresholdConfigSchema,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -337,26 +364,26 @@ async def create_failure_threshold_config(
         )
         
         session.add(new_threshold_config)
-        session.commit()
-        session.refresh(new_threshold_config)
+        await session.commit()
+        await session.refresh(new_threshold_config)
         
         return new_threshold_config
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating failure threshold config: {str(e)}")
 
 
 @config_router.get("/failure-threshold", response_model=List[FailureThresholdConfigResponse])
 async def list_failure_threshold_configs(
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
     Lista todas as configurações de limites de falhas.
     """
     try:
-        threshold_configs = session.query(FailureThresholdConfig).order_by(FailureThresholdConfig.created_at.desc()).all()
+        threshold_configs = (await session.scalars(select(FailureThresholdConfig).order_by(FailureThresholdConfig.created_at.desc()))).all()
         return threshold_configs
         
     except Exception as e:
@@ -366,14 +393,14 @@ async def list_failure_threshold_configs(
 @config_router.get("/failure-threshold/{threshold_id}", response_model=FailureThresholdConfigResponse)
 async def get_failure_threshold_config(
     threshold_id: int,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
     Obtém uma configuração de limites de falhas específica pelo ID.
     """
     try:
-        threshold_config = session.query(FailureThresholdConfig).filter(FailureThresholdConfig.id == threshold_id).first()
+        threshold_config = await session.get(FailureThresholdConfig, threshold_id)
         
         if not threshold_config:
             raise HTTPException(status_code=404, detail="Failure threshold config not found")
@@ -388,7 +415,7 @@ async def get_failure_threshold_config(
 async def update_failure_threshold_config(
     threshold_id: int,
     threshold_data: FailureThresholdConfigUpdate,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -398,7 +425,7 @@ async def update_failure_threshold_config(
     check_admin_permission(current_user)
     
     try:
-        threshold_config = session.query(FailureThresholdConfig).filter(FailureThresholdConfig.id == threshold_id).first()
+        threshold_config = await session.get(FailureThresholdConfig, threshold_id)
         
         if not threshold_config:
             raise HTTPException(status_code=404, detail="Failure threshold config not found")
@@ -413,20 +440,20 @@ async def update_failure_threshold_config(
         
         threshold_config.updated_at = func.now()
         
-        session.commit()
-        session.refresh(threshold_config)
+        await session.commit()
+        await session.refresh(threshold_config)
         
         return threshold_config
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating failure threshold config: {str(e)}")
 
 
 @config_router.delete("/failure-threshold/{threshold_id}")
 async def delete_failure_threshold_config(
     threshold_id: int,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -436,18 +463,18 @@ async def delete_failure_threshold_config(
     check_admin_permission(current_user)
     
     try:
-        threshold_config = session.query(FailureThresholdConfig).filter(FailureThresholdConfig.id == threshold_id).first()
+        threshold_config = await session.get(FailureThresholdConfig, threshold_id)
         
         if not threshold_config:
             raise HTTPException(status_code=404, detail="Failure threshold config not found")
         
-        session.delete(threshold_config)
-        session.commit()
+        await session.delete(threshold_config)
+        await session.commit()
         
         return {"message": "Failure threshold config deleted successfully"}
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting failure threshold config: {str(e)}")
 
 
@@ -457,17 +484,24 @@ async def delete_failure_threshold_config(
 
 @config_router.get("/active")
 async def get_active_configs(
-    session: Session = Depends(init_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
     Obtém todas as configurações ativas do sistema.
+    Com If-None-Match igual à ETag atual responde 304 sem consultar as configurações.
     """
+    not_modified = await conditional_get(request, response, session, "config.active",
+                                         (WebHookConfig, EmailConfig, FailureThresholdConfig, PerformanceThresholds))
+    if not_modified:
+        return not_modified
     try:
-        active_webhook = session.query(WebHookConfig).filter(WebHookConfig.active == True).first()
-        active_email = session.query(EmailConfig).filter(EmailConfig.active == True).first()
-        active_threshold = session.query(FailureThresholdConfig).filter(FailureThresholdConfig.active == True).first()
-        performance_thresholds = session.query(PerformanceThresholds).all()
+        active_webhook = (await session.scalars(select(WebHookConfig).where(WebHookConfig.active == True))).first()
+        active_email = (await session.scalars(select(EmailConfig).where(EmailConfig.active == True))).first()
+        active_threshold = (await session.scalars(select(FailureThresholdConfig).where(FailureThresholdConfig.active == True))).first()
+        performance_thresholds = (await session.scalars(select(PerformanceThresholds))).all()
         
         return {
             "webhook": active_webhook,
@@ -487,7 +521,7 @@ async def get_active_configs(
 @config_router.post("/performance-thresholds", response_model=PerformanceThresholdsResponse)
 async def create_performance_threshold(
     threshold_data: PerformanceThresholdsSchemas,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -498,9 +532,9 @@ async def create_performance_threshold(
     
     try:
         # Verificar se já existe configuração para este tipo de métrica
-        existing = session.query(PerformanceThresholds).filter(
+        existing = (await session.scalars(select(PerformanceThresholds).where(
             PerformanceThresholds.metric_type == threshold_data.metric_type
-        ).first()
+        ))).first()
         
         if existing:
             raise HTTPException(
@@ -516,28 +550,35 @@ async def create_performance_threshold(
         )
         
         session.add(new_threshold)
-        session.commit()
-        session.refresh(new_threshold)
+        await session.commit()
+        await session.refresh(new_threshold)
         
         return new_threshold
         
     except HTTPException:
         raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating performance threshold: {str(e)}")
 
 
 @config_router.get("/performance-thresholds", response_model=List[PerformanceThresholdsResponse])
 async def get_performance_thresholds(
-    session: Session = Depends(init_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
     Obtém todas as configurações de limites de performance.
+    Com If-None-Match igual à ETag atual responde 304 sem consultar os limites.
     """
+    not_modified = await conditional_get(request, response, session, "config.performance_thresholds",
+                                         (PerformanceThresholds,))
+    if not_modified:
+        return not_modified
     try:
-        thresholds = session.query(PerformanceThresholds).all()
+        thresholds = (await session.scalars(select(PerformanceThresholds))).all()
         return thresholds
         
     except Exception as e:
@@ -547,16 +588,16 @@ async def get_performance_thresholds(
 @config_router.get("/performance-thresholds/{metric_type}", response_model=PerformanceThresholdsResponse)
 async def get_performance_threshold_by_type(
     metric_type: str,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
     Obtém configuração de limite de performance por tipo de métrica.
     """
     try:
-        threshold = session.query(PerformanceThresholds).filter(
+        threshold = (await session.scalars(select(PerformanceThresholds).where(
             PerformanceThresholds.metric_type == metric_type
-        ).first()
+        ))).first()
         
         if not threshold:
             raise HTTPException(status_code=404, detail=f"Performance threshold for {metric_type} not found")
@@ -573,7 +614,7 @@ async def get_performance_threshold_by_type(
 async def update_performance_threshold(
     threshold_id: int,
     threshold_update: PerformanceThresholdsUpdate,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -583,9 +624,7 @@ async def update_performance_threshold(
     check_admin_permission(current_user)
     
     try:
-        threshold = session.query(PerformanceThresholds).filter(
-            PerformanceThresholds.id == threshold_id
-        ).first()
+        threshold = await session.get(PerformanceThresholds, threshold_id)
         
         if not threshold:
             raise HTTPException(status_code=404, detail="Performance threshold not found")
@@ -600,22 +639,22 @@ async def update_performance_threshold(
         
         threshold.updated_at = datetime.now()
         
-        session.commit()
-        session.refresh(threshold)
+        await session.commit()
+        await session.refresh(threshold)
         
         return threshold
         
     except HTTPException:
         raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating performance threshold: {str(e)}")
 
 
 @config_router.delete("/performance-thresholds/{threshold_id}")
 async def delete_performance_threshold(
     threshold_id: int,
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -625,28 +664,26 @@ async def delete_performance_threshold(
     check_admin_permission(current_user)
     
     try:
-        threshold = session.query(PerformanceThresholds).filter(
-            PerformanceThresholds.id == threshold_id
-        ).first()
+        threshold = await session.get(PerformanceThresholds, threshold_id)
         
         if not threshold:
             raise HTTPException(status_code=404, detail="Performance threshold not found")
         
-        session.delete(threshold)
-        session.commit()
+        await session.delete(threshold)
+        await session.commit()
         
         return {"success": True, "message": f"Performance threshold for {threshold.metric_type} deleted successfully"}
         
     except HTTPException:
         raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting performance threshold: {str(e)}")
 
 
 @config_router.post("/performance-thresholds/reset-defaults")
 async def reset_default_performance_thresholds(
-    session: Session = Depends(init_session),
+    session: AsyncSession = Depends(init_session),
     current_user: Users = Depends(verify_token)
 ):
     """
@@ -657,7 +694,7 @@ async def reset_default_performance_thresholds(
     
     try:
         # Remover configurações existentes
-        session.query(PerformanceThresholds).delete()
+        await session.execute(delete(PerformanceThresholds))
         
         # Criar configurações padrão
         default_thresholds = [
@@ -670,10 +707,108 @@ async def reset_default_performance_thresholds(
         for threshold in default_thresholds:
             session.add(threshold)
         
-        session.commit()
+        await session.commit()
         
         return {"success": True, "message": "Default performance thresholds restored successfully"}
         
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Error resetting default thresholds: {str(e)}")
+
+
+# =============================================================================
+# ROTA DE DIAGNÓSTICO DO POOL DE CONEXÕES
+# =============================================================================
+
+@config_router.get("/database/pool")
+async def get_database_pool_status(
+    current_user: Users = Depends(verify_token)
+):
+    """
+    Retorna o estado do pool de conexões deste processo (conexões livres, em uso,
+    overflow e tempo de espera por conexão). Útil para dimensionar DB_POOL_SIZE e
+    DB_MAX_OVERFLOW considerando a quantidade de workers do uvicorn.
+    Requer permissão de administrador.
+    """
+    check_admin_permission(current_user)
+    return get_pool_status()
+
+
+@config_router.get("/cache")
+async def get_cache_status(
+    current_user: Users = Depends(verify_token)
+):
+    """
+    Retorna os contadores do cache de estatísticas deste processo (hits, misses e versões),
+    dos validadores ETag (respostas 304, marcas d'água em cache e consultadas) e da
+    coalescência de leituras (requisições deduplicadas e servidas do resultado recente/antigo,
+    e respostas transmitidas compartilhadas).
+    Requer permissão de administrador.
+    """
+    check_admin_permission(current_user)
+    return {
+        **stats_cache.snapshot(),
+        "etag": table_watermarks.snapshot(),
+        "single_flight": request_flight.snapshot(),
+        "stream_flight": stream_flight.snapshot(),
+    }
+
+
+@config_router.get("/rules/engine")
+async def get_rule_engine_status(
+    current_user: Users = Depends(verify_token)
+):
+    """
+    Retorna o estado do motor de regras de alerta deste processo (regras compiladas,
+    regras inválidas e tempos do último ciclo).
+    Requer permissão de administrador.
+    """
+    check_admin_permission(current_user)
+    return rule_engine.snapshot()
+
+
+@config_router.get("/alerts/archive")
+async def get_alert_archive_status(
+    session: AsyncSession = Depends(init_session),
+    current_user: Users = Depends(verify_token)
+):
+    """
+    Retorna o estado do arquivamento de alertas resolvidos deste processo (limite do
+    arquivo, alertas movidos e última execução) e o tamanho das tabelas alerts e alerts_archive.
+    Requer permissão de administrador.
+    """
+    check_admin_permission(current_user)
+    return {**alert_archiver.snapshot(), "table": await archive_status(session)}
+
+
+@config_router.get("/sla/engine")
+async def get_sla_engine_status(
+    current_user: Users = Depends(verify_token)
+):
+    """
+    Retorna o estado do motor de SLA deste processo (checkpoint das coletas, períodos
+    abertos em memória, linhas gravadas em sla_metrics e tempos do último ciclo).
+    Requer permissão de administrador.
+    """
+    check_admin_permission(current_user)
+    return sla_engine.snapshot()
+
+
+@config_router.get("/notifications")
+async def get_notification_status(
+    session: AsyncSession = Depends(init_session),
+    current_user: Users = Depends(verify_token)
+):
+    """
+    Retorna o estado do despachante de notificações deste processo (fila, entregas,
+    tentativas repetidas, falhas e descartes), do canal de email (resumos enviados,
+    logins SMTP e alertas pendentes na janela) e da outbox (vazão deste processo e
+    eventos pendentes, reivindicados e com falha no banco).
+    Requer permissão de administrador.
+    """
+    check_admin_permission(current_user)
+    return {
+        **notification_dispatcher.snapshot(),
+        "email": email_channel.snapshot(),
+        "outbox": {**outbox_relay.snapshot(), "table": await outbox_status(session)},
+    }
@@ -0,0 +1,464 @@
+import os
+import time
+import heapq
+import itertools
+import asyncio
+from typing import Any, Callable, List, Optional
+from sqlalchemy import Select, event, select
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+from api.models import db, get_pool_settings, register_sqlite_pragmas, EndPointsData
+
+
+
+# Tamanho dos lotes lidos por stream_all antes de devolver o controle ao event loop
+STREAM_CHUNK_SIZE = 500
+
+# Drivers assíncronos equivalentes aos drivers síncronos usados em models.py
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: Optional[URL] = None) -> URL:
+    """
+    Converte a URL do banco para o driver assíncrono equivalente.
+    Args:
+        url (URL): URL síncrona (padrão: a do engine de models.py).
+    Returns:
+        URL: URL usando asyncpg (PostgreSQL) ou aiosqlite (SQLite).
+    """
+    url = url or db.url
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+class PoolWaitStats:
+    """
+    Acumula o tempo que as requisições aguardam por uma conexão do pool.
+    Os valores são por processo (cada worker do uvicorn tem o seu pool).
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+def is_sqlite_file(url: URL) -> bool:
+    """Indica se a URL aponta para um arquivo SQLite (e não para um banco em memória)."""
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def get_readonly_sqlite_url(url: URL) -> URL:
+    """
+    Converte a URL de um arquivo SQLite para uma URL de conexão somente leitura (mode=ro).
+    Args:
+        url (URL): URL do arquivo SQLite.
+    Returns:
+        URL: URL no formato file:<caminho>?mode=ro&uri=true.
+    """
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+
+
+# Prioridades na fila do escritor: requisições passam à frente das tarefas em segundo plano
+WRITE_PRIORITY_REQUEST = 0
+WRITE_PRIORITY_BACKGROUND = 1
+
+
+class WriterBusyError(Exception):
+    """A fila do escritor está cheia ou a vez não chegou a tempo (respondido com 503)."""
+
+
+class WriterQueue:
+    """
+    Fila do escritor único do SQLite: cada sessão que vai escrever aguarda a vez aqui antes
+    de pegar a conexão de escrita, e a mantém até o fim da transação (commit, rollback ou close).
+    - A vez é concedida por prioridade (requisições antes das tarefas em segundo plano)
+      e, na mesma prioridade, por ordem de chegada.
+    - Backpressure: com SQLITE_WRITE_QUEUE_SIZE sessões já aguardando, uma nova escrita é
+      recusada na hora (WriterBusyError) em vez de esperar pelo timeout do pool.
+    Variáveis:
+        SQLITE_WRITE_QUEUE_SIZE (int): Sessões aguardando a vez (padrão 64).
+        SQLITE_WRITE_TIMEOUT (float): Segundos aguardando a vez antes de desistir (padrão 30).
+    """
+
+    def __init__(self, max_waiting: int, timeout: float):
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._busy = False
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._acquired_at = 0.0
+        self.counters = {"granted": 0, "waited": 0, "rejected": 0, "timeouts": 0}
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_hold = 0.0
+
+    def _waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int):
+        """
+        Aguarda a vez de escrever.
+        Args:
+            priority (int): WRITE_PRIORITY_REQUEST ou WRITE_PRIORITY_BACKGROUND.
+        Raises:
+            WriterBusyError: Se a fila está cheia ou a vez não chegou em SQLITE_WRITE_TIMEOUT segundos.
+        """
+        start = time.perf_counter()
+        if self._busy or self._waiting():
+            if self._waiting() >= self.max_waiting:
+                self.counters["rejected"] += 1
+                raise WriterBusyError("Banco de dados ocupado: fila de escrita cheia")
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, [priority, next(self._sequence), future])
+            self.counters["waited"] += 1
+            try:
+                # wait_for cancela o future no timeout; release() pula futures cancelados
+                await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self.counters["timeouts"] += 1
+                raise WriterBusyError("Banco de dados ocupado: tempo de espera pela escrita esgotado")
+            except BaseException:
+                # Cancelada logo depois de receber a vez: repassa a vez adiante
+                if future.done() and not future.cancelled():
+                    self.release()
+                raise
+        else:
+            self._busy = True
+        wait = time.perf_counter() - start
+        self.counters["granted"] += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._acquired_at = time.perf_counter()
+
+    def release(self):
+        """Passa a vez para a próxima sessão da fila (ou libera o escritor)."""
+        self.max_hold = max(self.max_hold, time.perf_counter() - self._acquired_at)
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(True)
+                return
+        self._busy = False
+
+    def snapshot(self) -> dict:
+        return {
+            "busy": self._busy,
+            "waiting": self._waiting(),
+            "max_waiting": self.max_waiting,
+            "timeout_seconds": self.timeout,
+            **self.counters,
+            "avg_wait_ms": round(self.total_wait / self.counters["granted"] * 1000, 3) if self.counters["granted"] else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "max_hold_ms": round(self.max_hold * 1000, 3),
+        }
+
+
+# Engines assíncronos usados pelas rotas da API:
+# - async_db: engine principal, recebe todas as escritas
+# - async_read_db: engine opcional só para leituras (None quando não existe)
+pool_settings = get_pool_settings()
+_async_url = get_async_database_url()
+
+if is_sqlite_file(_async_url):
+    # Perfil SQLite: um único escritor e um pool de leitura somente leitura.
+    # As sessões que escrevem entram na writer_queue antes de usar a única conexão de
+    # escrita: as escritas são serializadas no processo em vez de disputarem o lock do
+    # arquivo, e com WAL as leituras nunca esperam por elas.
+    async_db = create_async_engine(
+        _async_url, echo=False, **{**pool_settings, "pool_size": 1, "max_overflow": 0}
+    )
+    writer_queue: Optional[WriterQueue] = WriterQueue(
+        max_waiting=int(os.getenv("SQLITE_WRITE_QUEUE_SIZE", 64)),
+        timeout=float(os.getenv("SQLITE_WRITE_TIMEOUT", 30)),
+    )
+    async_read_db = create_async_engine(
+        get_readonly_sqlite_url(_async_url), echo=False,
+        **{**pool_settings, "pool_size": int(os.getenv("SQLITE_READ_POOL_SIZE", 4))}
+    )
+    register_sqlite_pragmas(async_db.sync_engine)
+    register_sqlite_pragmas(async_read_db.sync_engine, readonly=True)
+else:
+    async_db = create_async_engine(_async_url, echo=False, **pool_settings)
+    async_read_db = None
+    writer_queue = None
+
+
+class RoutingSession(Session):
+    """
+    Sessão que envia leituras para async_read_db (quando configurado) e escritas para async_db.
+    - Após o primeiro flush, comando DML ou SELECT ... FOR UPDATE a sessão passa a usar apenas
+      o engine principal, para que as leituras seguintes enxerguem as próprias alterações.
+    - Sessões que vão escrever (use_writer(), ex.: requisições POST/PUT/DELETE) usam o
+      engine principal desde a primeira leitura: ler e gravar acontecem na mesma conexão.
+    - No perfil SQLite, antes de usar o escritor a sessão aguarda a vez na writer_queue
+      com a prioridade write_priority.
+    """
+    _use_writer = False
+    write_priority = WRITE_PRIORITY_REQUEST
+
+    def use_writer(self):
+        """Envia todas as consultas seguintes, inclusive leituras, para o engine principal."""
+        self._use_writer = True
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if async_read_db is None:
+            return async_db.sync_engine
+        if self._use_writer or self._flushing or getattr(clause, "is_dml", False) \
+                or getattr(clause, "_for_update_arg", None) is not None:
+            self._use_writer = True
+            self._take_writer_turn()
+            return async_db.sync_engine
+        return async_read_db.sync_engine
+
+    def _take_writer_turn(self):
+        # get_bind é síncrono, mas roda no greenlet da AsyncSession: await_only aguarda a vez
+        if writer_queue is not None and not self.info.get("writer_turn") and in_greenlet():
+            await_only(writer_queue.acquire(self.write_priority))
+            self.info["writer_turn"] = True
+
+    def release_writer_turn(self):
+        if self.info.pop("writer_turn", False):
+            writer_queue.release()
+
+    def _close_impl(self, *args, **kwargs):
+        # close(), reset() e invalidate(): a vez nunca fica presa a uma sessão encerrada
+        try:
+            super()._close_impl(*args, **kwargs)
+        finally:
+            self.release_writer_turn()
+
+
+class BackgroundRoutingSession(RoutingSession):
+    """RoutingSession das tarefas em segundo plano: escrevem depois das requisições."""
+    write_priority = WRITE_PRIORITY_BACKGROUND
+
+
+@event.listens_for(RoutingSession, "after_transaction_end", propagate=True)
+def _release_writer_turn(session, transaction):
+    # A vez dura a transação inteira; a próxima transação da sessão volta para a fila
+    if transaction.parent is None:
+        session.release_writer_turn()
+
+
+AsyncSessionLocal = async_sessionmaker(
+    async_db, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
+)
+
+# Sessões das tarefas em segundo plano (outbox, motor de regras, arquivamento, SLA)
+BackgroundSessionLocal = async_sessionmaker(
+    async_db, class_=AsyncSession, sync_session_class=BackgroundRoutingSession, expire_on_commit=False
+)
+pool_wait_stats = PoolWaitStats()
+
+
+def create_replica_engine(read_url: Optional[str]) -> Optional[AsyncEngine]:
+    """
+    Cria o engine da réplica de leitura a partir de DATABASE_READ_URL.
+    Uma réplica SQLite (útil em testes locais) é aberta em modo somente leitura.
+    Args:
+        read_url (str): URL da réplica (ou None).
+    Returns:
+        AsyncEngine: Engine da réplica, ou None se não configurada.
+    """
+    if not read_url:
+        return None
+    url = get_async_database_url(make_url(read_url))
+    if is_sqlite_file(url):
+        engine = create_async_engine(get_readonly_sqlite_url(url), echo=False, **pool_settings)
+        register_sqlite_pragmas(engine.sync_engine, readonly=True)
+        return engine
+    return create_async_engine(url, echo=False, **pool_settings)
+
+
+# Réplica de leitura opcional para as rotas de relatório (SLA, histórico e estatísticas)
+async_replica_db = create_replica_engine(os.getenv("DATABASE_READ_URL"))
+ReplicaSessionLocal = (
+    async_sessionmaker(async_replica_db, class_=AsyncSession, expire_on_commit=False)
+    if async_replica_db is not None else None
+)
+
+
+class ReplicaLagGuard:
+    """
+    Decide se a réplica está atualizada o bastante para atender leituras.
+    O atraso é a diferença de last_updated entre o último EndPointsData (maior id) do
+    primário e o da réplica: funciona com qualquer banco e usa apenas a chave primária.
+    O resultado fica em cache por REPLICA_LAG_CHECK_INTERVAL segundos.
+    Variáveis:
+        REPLICA_MAX_LAG_SECONDS (float): Atraso máximo aceito antes de voltar ao primário (padrão 60).
+        REPLICA_LAG_CHECK_INTERVAL (float): Intervalo entre verificações de atraso (padrão 5).
+    """
+
+    def __init__(self, max_lag: float, check_interval: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_seconds: Optional[float] = None
+        self.healthy = False
+        self.checked_at = 0.0
+        self.fallbacks = 0
+        self.last_error: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    async def _last_collected_at(engine: AsyncEngine):
+        async with engine.connect() as conn:
+            return await conn.scalar(
+                select(EndPointsData.last_updated).order_by(EndPointsData.id.desc()).limit(1)
+            )
+
+    async def check(self):
+        """Mede o atraso atual da réplica em relação ao primário."""
+        try:
+            # No perfil SQLite o primário é lido pelo pool de leitura (a conexão de escrita é da writer_queue)
+            primary_last = await self._last_collected_at(async_read_db or async_db)
+            replica_last = await self._last_collected_at(async_replica_db)
+            if primary_last is None:
+                self.lag_seconds = 0.0
+            elif replica_last is None:
+                self.lag_seconds = float("inf")
+            else:
+                self.lag_seconds = max(0.0, (primary_last - replica_last).total_seconds())
+            self.healthy = self.lag_seconds <= self.max_lag
+            self.last_error = None
+        except Exception as e:
+            self.healthy = False
+            self.last_error = str(e)
+            print(f"⚠️ Réplica de leitura indisponível, usando o primário: {e}")
+        self.checked_at = time.monotonic()
+
+    async def replica_available(self) -> bool:
+        """
+        Indica se as leituras podem ir para a réplica, verificando o atraso quando o cache expirou.
+        Returns:
+            bool: True se a réplica está configurada e dentro do atraso máximo.
+        """
+        if async_replica_db is None:
+            return False
+        if time.monotonic() - self.checked_at >= self.check_interval:
+            async with self._lock:
+                if time.monotonic() - self.checked_at >= self.check_interval:
+                    await self.check()
+        if not self.healthy:
+            self.fallbacks += 1
+        return self.healthy
+
+    def snapshot(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag,
+            "fallbacks": self.fallbacks,
+            "last_error": self.last_error,
+        }
+
+
+replica_guard = ReplicaLagGuard(
+    max_lag=float(os.getenv("REPLICA_MAX_LAG_SECONDS", 60)),
+    check_interval=float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 5)),
+)
+
+
+async def init_database():
+    """
+    Abre a primeira conexão de escrita na inicialização da API.
+    No SQLite isso cria o arquivo e ativa o WAL antes que o pool somente leitura se conecte.
+    """
+    async with async_db.connect():
+        pass
+
+
+async def close_database():
+    """Fecha as conexões dos pools assíncronos."""
+    for engine in (async_db, async_read_db, async_replica_db):
+        if engine is not None:
+            await engine.dispose()
+
+
+async def checkout_connection(session: AsyncSession):
+    """
+    Obtém a conexão da sessão já no início da requisição, registrando o tempo de espera no pool.
+    Args:
+        session (AsyncSession): Sessão recém-criada.
+    """
+    start = time.perf_counter()
+    try:
+        await session.connection()
+    except PoolTimeoutError:
+        pool_wait_stats.timeouts += 1
+        raise
+    pool_wait_stats.record(time.perf_counter() - start)
+
+
+def _pool_status(engine: AsyncEngine) -> dict:
+    """Retorna o estado de um pool: tamanho e conexões livres, em uso e em overflow."""
+    pool = engine.pool
+    return {
+        "pool_class": type(pool).__name__,
+        "size": pool.size() if hasattr(pool, "size") else None,
+        "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+    }
+
+
+def get_pool_status() -> dict:
+    """
+    Retorna o estado atual dos pools de conexões assíncronos deste processo.
+    Returns:
+        dict: Configuração, conexões em uso/livres/overflow e tempos de espera.
+    """
+    return {
+        "pid": os.getpid(),
+        "settings": pool_settings,
+        "primary": _pool_status(async_db),
+        "read": _pool_status(async_read_db) if async_read_db is not None else None,
+        "replica": {**_pool_status(async_replica_db), **replica_guard.snapshot()}
+                   if async_replica_db is not None else None,
+        "wait": pool_wait_stats.snapshot(),
+        "writer_queue": writer_queue.snapshot() if writer_queue is not None else None,
+    }
+
+
+async def stream_all(session: AsyncSession, statement: Select, mapper: Callable[[Any], Any],
+                     chunk_size: int = STREAM_CHUNK_SIZE) -> List[Any]:
+    """
+    Executa uma consulta ORM em lotes (yield_per) e converte cada linha com `mapper`.
+    Entre os lotes o controle volta ao event loop, evitando que consultas grandes
+    bloqueiem requisições leves enquanto milhares de objetos são materializados.
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+        statement (Select): Consulta a ser executada.
+        mapper (Callable): Função aplicada a cada entidade retornada.
+        chunk_size (int): Quantidade de linhas por lote.
+    Returns:
+        list: Resultados já convertidos por `mapper`.
+    """
+    result = await session.stream_scalars(statement.execution_options(yield_per=chunk_size))
+    items = []
+    async for partition in result.partitions():
+        items.extend(mapper(row) for row in partition)
+    return items
@@ -1,35 +1,83 @@
-from fastapi import Depends, HTTPException
-from sqlalchemy.orm import sessionmaker, Session
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt, JWTError
-from typing import Generator
+from typing import AsyncGenerator
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from api.models import db, Users
+from api.models import Users
+from api.database import AsyncSessionLocal, ReplicaSessionLocal, checkout_connection, replica_guard
 from api.encryption import SECRET_KEY, ALGORITHM, oauth2_schema
 
 
 
 
 
-def init_session() -> Generator[Session, None, None]:
+# Métodos que não alteram dados: as demais requisições usam o escritor desde a primeira leitura
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+async def init_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """
-    Inicializa uma sessão do banco de dados e garante seu fechamento.
+    Inicializa uma sessão assíncrona do banco de dados e garante seu fechamento.
+    Em requisições que alteram dados (POST, PUT, DELETE...) a sessão usa o escritor desde
+    a primeira leitura, para que o que foi lido e o que é gravado venham da mesma conexão.
+    Args:
+        request (Request): Requisição atual.
     Yields:
-        Session: Sessão do SQLAlchemy.
+        AsyncSession: Sessão assíncrona do SQLAlchemy.
     """
-    SessionLocal = sessionmaker(bind=db)
-    session = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as session:
+        if request.method not in READ_METHODS:
+            session.sync_session.use_writer()
+        await checkout_connection(session)
+        yield session
+
+
+async def init_lookup_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Sessão para requisições POST que apenas consultam (ex.: login): lê do banco principal
+    como uma requisição GET, sem ocupar a vez do escritor.
+    Yields:
+        AsyncSession: Sessão assíncrona do SQLAlchemy.
+    """
+    async with AsyncSessionLocal() as session:
+        await checkout_connection(session)
+        yield session
+
+
+async def init_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Inicializa uma sessão para rotas somente leitura (relatórios, histórico e estatísticas).
+    Usa a réplica de DATABASE_READ_URL quando configurada e dentro do atraso máximo;
+    caso contrário usa o banco principal.
+    Yields:
+        AsyncSession: Sessão assíncrona do SQLAlchemy.
+    """
+    async with open_read_session() as session:
+        yield session
+
+
+@asynccontextmanager
+async def open_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Abre uma sessão de leitura (réplica ou banco principal, como init_read_session) fora
+    do ciclo de uma requisição, para cálculos compartilhados entre várias requisições.
+    Yields:
+        AsyncSession: Sessão assíncrona do SQLAlchemy.
+    """
+    factory = ReplicaSessionLocal if await replica_guard.replica_available() else AsyncSessionLocal
+    async with factory() as session:
+        await checkout_connection(session)
         yield session
-    finally:
-        session.close()
 
 
-def verify_token(token: str = Depends(oauth2_schema), session: Session = Depends(init_session)) -> Users:
+async def verify_token(token: str = Depends(oauth2_schema), session: AsyncSession = Depends(init_session)) -> Users:
     """
     Valida o token JWT e retorna o usuário correspondente.
     Args:
         token (str): Token JWT.
-        session (Session): Sessão do SQLAlchemy.
+        session (AsyncSession): Sessão assíncrona do SQLAlchemy.
     Raises:
         HTTPException: Se o token for inválido ou o usuário não existir.
     Returns:
@@ -41,6 +89,10 @@ def verify_token(token: str = Depends(oauth2_schema), session: Session = Depends
         exp = info.get('exp')
         if not id_user:
             raise HTTPException(status_code=401, detail="Token inválido: sub ausente")
+        try:
+            id_user = int(id_user)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=401, detail="Token inválido: campo sub malformado")
         if exp is not None:
             try:
                 exp_float = float(exp)
@@ -51,7 +103,20 @@ def verify_token(token: str = Depends(oauth2_schema), session: Session = Depends
                 raise HTTPException(status_code=401, detail="Token expirado. Faça login novamente.")
     except JWTError:
         raise HTTPException(status_code=401, detail="Acesso negado: token inválido")
-    user = session.query(Users).filter(Users.id == id_user).first()
+    user = await session.scalar(select(Users).where(Users.id == id_user))
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     return user
+
+
+async def verify_token_short_session(token: str = Depends(oauth2_schema)) -> Users:
+    """
+    Autentica com uma sessão própria, fechada antes da rota: a conexão não fica presa
+    enquanto a requisição aguarda um stream ou um cálculo compartilhado.
+    Args:
+        token (str): Token JWT.
+    Returns:
+        Users: Usuário autenticado.
+    """
+    async with AsyncSessionLocal() as session:
+        return await verify_token(token, session)
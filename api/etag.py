@@ -0,0 +1,203 @@
+import os
+import time
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from fastapi import Request, Response
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import TableVersions, VERSIONED_TABLES
+
+
+
+class TableWatermarks:
+    """
+    Validadores (ETag) para GETs condicionais, derivados das marcas d'água das tabelas
+    lidas por cada rota: a versão em table_versions (incrementada no commit de quem
+    escreve) para as tabelas de VERSIONED_TABLES e max(id) (chave primária) para as
+    tabelas só de inserção, como endpoints_data. Nenhuma das duas varre a tabela.
+    - As marcas ficam em cache por processo durante ETAG_WATERMARK_TTL segundos; uma
+      requisição com If-None-Match válido recebe 304 sem executar a consulta da rota.
+    - Commits feitos por este processo (ORM ou insert/update/delete pela sessão) mudam
+      a geração local da tabela: a ETag muda na hora. Escritas de outros workers
+      aparecem nas versões, e inserções do coletor em max(id), em até
+      ETAG_WATERMARK_TTL segundos.
+    Variáveis:
+        ETAG_WATERMARK_TTL (float): Validade das marcas em cache, em segundos (padrão 2).
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._generations: Dict[str, int] = {}
+        self._entries: Dict[str, Tuple[int, float, Tuple[Any, ...]]] = {}
+        self.counters = {"cached": 0, "queries": 0, "not_modified": 0, "modified": 0}
+
+    def touch(self, *tables: str):
+        """
+        Marca tabelas como alteradas por este processo.
+        Args:
+            *tables (str): Nomes das tabelas (ex.: "alerts").
+        """
+        for table in tables:
+            self._generations[table] = self._generations.get(table, 0) + 1
+
+    def _fresh(self, table: str) -> Optional[Tuple[Any, ...]]:
+        entry = self._entries.get(table)
+        if entry is None:
+            return None
+        generation, expires_at, marks = entry
+        if generation != self._generations.get(table, 0) or time.monotonic() >= expires_at:
+            return None
+        return marks
+
+    async def marks(self, session: AsyncSession, models: Sequence[Any]) -> List[Tuple[Any, ...]]:
+        """
+        Marcas d'água das tabelas, lendo do banco (em uma única consulta) apenas as vencidas.
+        Args:
+            session (AsyncSession): Sessão assíncrona.
+            models (Sequence): Modelos ORM lidos pela rota.
+        Returns:
+            list: Uma tupla de marcas por modelo, na ordem recebida.
+        """
+        tables = [model.__table__ for model in models]
+        stale = [table for table in tables if self._fresh(table.name) is None]
+        if stale:
+            columns = []
+            for table in stale:
+                if table.name in VERSIONED_TABLES:
+                    columns.append(
+                        select(TableVersions.version).where(TableVersions.name == table.name).scalar_subquery()
+                    )
+                else:
+                    columns.append(select(func.max(table.c.id)).scalar_subquery())
+            generations = {table.name: self._generations.get(table.name, 0) for table in stale}
+            row = (await session.execute(select(*columns))).one()
+            expires_at = time.monotonic() + self.ttl
+            for table, mark in zip(stale, row):
+                self._entries[table.name] = (generations[table.name], expires_at, (mark,))
+            self.counters["queries"] += 1
+        else:
+            self.counters["cached"] += 1
+        return [self._entries[table.name][2] for table in tables]
+
+    async def etag(self, session: AsyncSession, key: str, models: Sequence[Any], extra: Iterable[Any] = ()) -> str:
+        """
+        Calcula a ETag (fraca) de uma rota.
+        Args:
+            session (AsyncSession): Sessão assíncrona.
+            key (str): Identificador da rota (ex.: "monitor.status").
+            models (Sequence): Modelos ORM lidos pela rota.
+            extra (Iterable): Outros valores que mudam a resposta (ex.: a data de hoje).
+        Returns:
+            str: ETag no formato W/"...".
+        """
+        marks = await self.marks(session, models)
+        generations = [self._generations.get(model.__table__.name, 0) for model in models]
+        raw = repr((key, marks, generations, tuple(extra)))
+        return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:24]}"'
+
+    def snapshot(self) -> dict:
+        return {
+            "ttl_seconds": self.ttl,
+            "tables": len(self._entries),
+            "generations": dict(self._generations),
+            **self.counters,
+        }
+
+
+table_watermarks = TableWatermarks(ttl=float(os.getenv("ETAG_WATERMARK_TTL", 2)))
+
+
+def _matches(header: str, etag: str) -> bool:
+    """Comparação fraca de If-None-Match (ignora o prefixo W/)."""
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    session: AsyncSession,
+    key: str,
+    models: Sequence[Any],
+    extra: Iterable[Any] = ()
+) -> Optional[Response]:
+    """
+    Trata If-None-Match de uma rota de leitura.
+    Args:
+        request (Request): Requisição atual.
+        response (Response): Resposta da rota, que recebe os cabeçalhos ETag e Cache-Control.
+        session (AsyncSession): Sessão assíncrona.
+        key (str): Identificador da rota.
+        models (Sequence): Modelos ORM lidos pela rota.
+        extra (Iterable): Outros valores que mudam a resposta.
+    Returns:
+        Response: 304 quando o cliente já tem a versão atual; None quando a rota deve responder.
+    """
+    etag = await table_watermarks.etag(session, key, models, extra)
+    # no-cache: o navegador pode guardar a resposta, mas revalida a cada uso
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    header = request.headers.get("if-none-match")
+    if header and _matches(header, etag):
+        table_watermarks.counters["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    table_watermarks.counters["modified"] += 1
+    response.headers.update(headers)
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    tables = session.info.setdefault("etag_tables", set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        tables.add(instance.__table__.name)
+    # Linhas inseridas/alteradas de tabelas com change_version recebem a versão do commit
+    for instance in (*session.new, *session.dirty):
+        table = instance.__table__
+        if "change_version" in table.c:
+            session.info.setdefault("versioned_rows", {}).setdefault(table, set()).add(instance.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name != TableVersions.__tablename__:
+            orm_execute_state.session.info.setdefault("etag_tables", set()).add(table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions(session):
+    # O commit só descarrega pendências depois deste evento: o flush aqui garante que
+    # after_flush já registrou todas as tabelas antes do incremento
+    session.flush()
+    tables = sorted(VERSIONED_TABLES & session.info.get("etag_tables", set()))
+    if tables:
+        # Uma única instrução, na ordem da chave: escritores concorrentes travam as linhas na mesma ordem
+        session.execute(
+            update(TableVersions)
+            .where(TableVersions.name.in_(tables))
+            .values(version=TableVersions.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    # Carimbo feito com a linha de table_versions travada: commits concorrentes recebem
+    # versões na ordem em que são confirmados (cursor de GET /monitor/changes)
+    for table, ids in session.info.pop("versioned_rows", {}).items():
+        version = select(TableVersions.version).where(TableVersions.name == table.name).scalar_subquery()
+        session.execute(update(table).where(table.c.id.in_(ids)).values(change_version=version))
+
+
+@event.listens_for(Session, "after_commit")
+def _touch_committed(session):
+    tables = session.info.pop("etag_tables", None)
+    if tables:
+        table_watermarks.touch(*tables)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    # Rollback de savepoint mantém o que a transação externa já alterou
+    if previous_transaction.parent is None:
+        session.info.pop("etag_tables", None)
+        session.info.pop("versioned_rows", None)
@@ -0,0 +1,272 @@
+import os
+import json
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Set
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import Alerts, EndPoints, EndPointsData
+from api.notifications import alert_event
+
+
+
+class Subscription:
+    """
+    Cliente conectado ao stream: fila limitada de mensagens SSE já formatadas.
+    Um cliente que não consome a fila a tempo é desconectado (dropped) em vez de
+    fazer o publicador esperar ou acumular memória.
+    """
+
+    def __init__(self, topics: Optional[Set[str]], queue_size: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def wants(self, topic: str) -> bool:
+        """Tópicos são filtrados pelo prefixo antes do ponto ("alert" recebe "alert.created")."""
+        return self.topics is None or topic in self.topics or topic.split(".", 1)[0] in self.topics
+
+    async def get(self) -> Optional[str]:
+        """Próxima mensagem; None quando o cliente foi desconectado por lentidão."""
+        return await self.queue.get()
+
+
+class EventBroker:
+    """
+    Pub/sub em memória que alimenta GET /stream/events (Server-Sent Events).
+    - publish() não bloqueia: serializa o evento uma vez e o coloca na fila de cada
+      cliente interessado; fila cheia desconecta o cliente (o navegador reconecta e
+      recarrega o estado completo).
+    - Os eventos são deste processo: com vários workers, cada um publica as alterações
+      que ele mesmo gravou e o EndpointStatusWatcher de cada um publica as coletas.
+    Variáveis:
+        STREAM_QUEUE_SIZE (int): Mensagens pendentes por cliente (padrão 256).
+        STREAM_MAX_CLIENTS (int): Clientes simultâneos por processo (padrão 1000).
+    """
+
+    def __init__(self, queue_size: int, max_clients: int):
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self.subscriptions: Set[Subscription] = set()
+        self._sequence = 0
+        self.counters = {"published": 0, "delivered": 0, "dropped_clients": 0, "rejected_clients": 0}
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Optional[Subscription]:
+        """
+        Registra um cliente.
+        Args:
+            topics (Iterable[str]): Tópicos ou prefixos (ex.: "alert", "endpoint.status"); None = todos.
+        Returns:
+            Subscription: Assinatura criada, ou None se o limite de clientes foi atingido.
+        """
+        if len(self.subscriptions) >= self.max_clients:
+            self.counters["rejected_clients"] += 1
+            return None
+        subscription = Subscription(set(topics) if topics else None, self.queue_size)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def wants(self, topic: str) -> bool:
+        """Se algum cliente receberia o tópico (evita consultas quando ninguém está ouvindo)."""
+        return any(subscription.wants(topic) for subscription in self.subscriptions)
+
+    def publish(self, topic: str, data: Any) -> int:
+        """
+        Envia um evento aos clientes interessados.
+        Args:
+            topic (str): Nome do evento SSE (ex.: "alert.created").
+            data (Any): Conteúdo serializável em JSON.
+        Returns:
+            int: Clientes que receberam o evento.
+        """
+        targets = [subscription for subscription in self.subscriptions if subscription.wants(topic)]
+        if not targets:
+            return 0
+        self._sequence += 1
+        message = f"id: {self._sequence}\nevent: {topic}\ndata: {json.dumps(data, default=str)}\n\n"
+        self.counters["published"] += 1
+        delivered = 0
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+        self.counters["delivered"] += delivered
+        return delivered
+
+    def _drop(self, subscription: Subscription):
+        """Desconecta um cliente lento: descarta a fila e deixa apenas o aviso de encerramento."""
+        self.unsubscribe(subscription)
+        subscription.dropped = True
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+        self.counters["dropped_clients"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "clients": len(self.subscriptions),
+            "queue_size": self.queue_size,
+            "max_clients": self.max_clients,
+            "pending_messages": sum(subscription.queue.qsize() for subscription in self.subscriptions),
+            **self.counters,
+        }
+
+
+# Eventos das ações de alerta (POST /alerts/{id}/actions e /alerts/bulk-actions)
+ALERT_ACTION_EVENTS = {"acknowledge": "alert.acknowledged", "resolve": "alert.resolved", "assign": "alert.assigned"}
+
+# Eventos das ocorrências gravadas por record_alerts
+RECORDED_ALERT_EVENTS = {"created": "alert.created", "reopened": "alert.reopened", "repeated": "alert.updated"}
+
+
+async def publish_alert_events(session: AsyncSession, alert_ids: List[int], event: str):
+    """
+    Publica um evento por alerta (após o commit), com o mesmo conteúdo enviado aos webhooks.
+    Não consulta o banco quando nenhum cliente assina eventos de alerta.
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+        alert_ids (list): IDs dos alertas alterados.
+        event (str): Nome do evento (ex.: "alert.resolved").
+    """
+    if not alert_ids or not event_broker.wants(event):
+        return
+    try:
+        alerts = (await session.scalars(
+            select(Alerts).where(Alerts.id.in_(alert_ids)).order_by(Alerts.id)
+        )).all()
+    except Exception as e:
+        print(f"⚠️ Falha ao publicar eventos de alerta no stream: {e}")
+        return
+    for alert in alerts:
+        event_broker.publish(event, alert_event(event, alert))
+
+
+async def publish_recorded_alerts(session: AsyncSession, recorded: Dict[str, List[int]]):
+    """Publica os alertas criados, reabertos e repetidos retornados por record_alerts."""
+    for key, event in RECORDED_ALERT_EVENTS.items():
+        await publish_alert_events(session, recorded.get(key, []), event)
+
+
+class EndpointStatusWatcher:
+    """
+    Publica "endpoint.status" quando o status coletado de um endpoint ou seu campo active muda.
+    As coletas são gravadas fora da API, então a tarefa lê periodicamente apenas os
+    EndPointsData novos (id acima do último visto); sem clientes assinando, não consulta
+    o banco e, ao voltar a ter clientes, recarrega o estado sem publicar nada.
+    Variáveis:
+        STREAM_STATUS_INTERVAL (float): Intervalo entre leituras em segundos (padrão 2).
+    """
+
+    def __init__(self, broker: EventBroker, interval: float):
+        self.broker = broker
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._last_data_id = 0
+        self._status: Dict[int, Any] = {}
+        self._active: Dict[int, bool] = {}
+        self.polls = 0
+        self.last_error: Optional[str] = None
+
+    def start(self, session_factory):
+        """Inicia a leitura periódica (uma vez por processo)."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever(session_factory))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def poll(self, session: AsyncSession) -> int:
+        """
+        Lê as coletas novas e os campos active, publicando as mudanças.
+        Args:
+            session (AsyncSession): Sessão assíncrona.
+        Returns:
+            int: Eventos publicados.
+        """
+        endpoints = (await session.execute(select(EndPoints.id, EndPoints.ip, EndPoints.nickname, EndPoints.active))).all()
+        baseline = self._last_data_id == 0
+        if baseline:
+            # Estado atual: apenas a última coleta de cada endpoint
+            latest = select(func.max(EndPointsData.id)).group_by(EndPointsData.id_end_point)
+            query = select(EndPointsData.id, EndPointsData.id_end_point, EndPointsData.status,
+                           EndPointsData.last_updated).where(EndPointsData.id.in_(latest))
+        else:
+            query = select(EndPointsData.id, EndPointsData.id_end_point, EndPointsData.status,
+                           EndPointsData.last_updated).where(EndPointsData.id > self._last_data_id)
+        samples = (await session.execute(query.order_by(EndPointsData.id))).all()
+
+        info = {endpoint.id: endpoint for endpoint in endpoints}
+        published = 0
+        for sample in samples:
+            self._last_data_id = max(self._last_data_id, sample.id)
+            previous = self._status.get(sample.id_end_point)
+            self._status[sample.id_end_point] = sample.status
+            endpoint = info.get(sample.id_end_point)
+            if baseline or endpoint is None or previous == sample.status:
+                continue
+            self.broker.publish("endpoint.status", {
+                "id": endpoint.id, "ip": endpoint.ip, "nickname": endpoint.nickname,
+                "active": endpoint.active, "status": sample.status, "previous_status": previous,
+                "last_updated": sample.last_updated.isoformat() if sample.last_updated else None,
+            })
+            published += 1
+        for endpoint in endpoints:
+            previous = self._active.get(endpoint.id)
+            self._active[endpoint.id] = endpoint.active
+            if not baseline and previous is not None and previous != endpoint.active:
+                self.broker.publish("endpoint.active", {
+                    "id": endpoint.id, "ip": endpoint.ip, "nickname": endpoint.nickname,
+                    "active": endpoint.active, "status": self._status.get(endpoint.id),
+                })
+                published += 1
+        if baseline and not samples:
+            # Sem coletas ainda: as próximas são todas novas
+            self._last_data_id = -1
+        self.polls += 1
+        return published
+
+    def reset(self):
+        self._last_data_id = 0
+        self._status.clear()
+        self._active.clear()
+
+    async def _run_forever(self, session_factory):
+        while True:
+            if self.broker.wants("endpoint.status") or self.broker.wants("endpoint.active"):
+                try:
+                    async with session_factory() as session:
+                        await self.poll(session)
+                except Exception as e:
+                    self.last_error = str(e)
+                    print(f"⚠️ Falha ao ler mudanças de status para o stream: {e}")
+            elif self._last_data_id:
+                self.reset()
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval": self.interval,
+            "last_data_id": max(self._last_data_id, 0),
+            "endpoints": len(self._status),
+            "polls": self.polls,
+            "last_error": self.last_error,
+        }
+
+
+event_broker = EventBroker(
+    queue_size=int(os.getenv("STREAM_QUEUE_SIZE", 256)),
+    max_clients=int(os.getenv("STREAM_MAX_CLIENTS", 1000)),
+)
+
+status_watcher = EndpointStatusWatcher(event_broker, interval=float(os.getenv("STREAM_STATUS_INTERVAL", 2)))
@@ -1,5 +1,7 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Text, DateTime, ForeignKey, Float
+import hashlib
+from datetime import datetime
+from sqlalchemy import create_engine, event, text, DDL, CheckConstraint, Index, Column, Integer, String, Boolean, Text, DateTime, ForeignKey, Float
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -76,8 +78,84 @@ def get_database_url():
     print(f"📄 Usando SQLite padrão: {filename}")
     return f'sqlite:///{filename}'
 
+def _env_flag(name, default):
+    """Lê uma variável de ambiente booleana (1/true/yes/on)."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_pool_settings():
+    """
+    Retorna os parâmetros do pool de conexões a partir das variáveis de ambiente.
+    Os mesmos valores valem para o engine síncrono e o assíncrono; com vários workers
+    do uvicorn cada processo mantém o seu próprio pool (até pool_size + max_overflow conexões).
+    Variáveis:
+        DB_POOL_SIZE (int): Conexões mantidas abertas no pool (padrão 5).
+        DB_MAX_OVERFLOW (int): Conexões extras permitidas em picos (padrão 10).
+        DB_POOL_TIMEOUT (int): Segundos aguardando uma conexão livre antes de falhar (padrão 30).
+        DB_POOL_RECYCLE (int): Segundos até reciclar uma conexão; -1 desativa (padrão 1800).
+        DB_POOL_PRE_PING (bool): Testa a conexão antes de usá-la (padrão true).
+    Returns:
+        dict: Argumentos para create_engine/create_async_engine.
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", True),
+    }
+
+
+def get_sqlite_pragmas(readonly=False):
+    """
+    PRAGMAs do perfil de produção do SQLite aplicados a cada nova conexão.
+    WAL permite leituras concorrentes com uma escrita e synchronous=NORMAL evita um fsync
+    por commit (no WAL continua seguro contra corrupção). O journal_mode é persistente no
+    arquivo, por isso só é definido pelas conexões de escrita.
+    Variáveis:
+        SQLITE_MMAP_SIZE (int): Bytes mapeados em memória (padrão 256 MB).
+        SQLITE_CACHE_SIZE (int): Cache de páginas; negativo = KiB (padrão -65536, 64 MB).
+        SQLITE_BUSY_TIMEOUT (int): Milissegundos aguardando um lock antes de falhar (padrão 5000).
+    Args:
+        readonly (bool): Se a conexão é somente leitura.
+    Returns:
+        list: Comandos PRAGMA.
+    """
+    pragmas = [
+        f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))}",
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', 268435456))}",
+        f"PRAGMA cache_size={int(os.getenv('SQLITE_CACHE_SIZE', -65536))}",
+    ]
+    if not readonly:
+        pragmas = ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"] + pragmas
+    return pragmas
+
+
+def register_sqlite_pragmas(engine, readonly=False):
+    """
+    Registra os PRAGMAs de get_sqlite_pragmas no evento de conexão de um engine SQLite.
+    Args:
+        engine (Engine): Engine síncrono (para engines assíncronos use engine.sync_engine).
+        readonly (bool): Se o engine abre conexões somente leitura.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = get_sqlite_pragmas(readonly)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
 # criar a conexao no banco
-db = create_engine(get_database_url(), echo=False)
+db = create_engine(get_database_url(), echo=False, **get_pool_settings())
+register_sqlite_pragmas(db)
 
 
 # criar a base do banco de dados
@@ -153,10 +231,16 @@ class EndPoints(Base):
     authKey = Column("authKey", String)
     privKey = Column("privKey", String)
     id_user = Column("id_usuario", Integer, ForeignKey('users.id'))
+    id_oid_profile = Column("id_oid_profile", Integer, ForeignKey('oid_profiles.id'), nullable=True)
+    updated_at = Column("updated_at", DateTime, default=datetime.now, onupdate=datetime.now)
+    # Versão de table_versions no commit que inseriu/alterou a linha (ordem de commit):
+    # cursor de GET /monitor/changes
+    change_version = Column("change_version", Integer, nullable=False, default=0, server_default="0", index=True)
     end_points_data = relationship("EndPointsData", cascade="all, delete")
-    end_points_oids = relationship("EndPointOIDs", cascade="all, delete")
+    oid_overrides = relationship("EndPointOIDOverrides", cascade="all, delete", uselist=False)
+    oid_profile = relationship("OIDProfiles", backref="endpoints")
 
-    def __init__(self, ip, nickname, interval, version, community, port, user, active, authKey, privKey, id_user):
+    def __init__(self, ip, nickname, interval, version, community, port, user, active, authKey, privKey, id_user, id_oid_profile=None):
         """
         Inicializa um novo endpoint monitorado.
         Args:
@@ -171,6 +255,7 @@ class EndPoints(Base):
             authKey (str): Chave de autenticação SNMPv3.
             privKey (str): Chave privada SNMPv3.
             id_user (int): ID do usuário proprietário.
+            id_oid_profile (int): ID do perfil de OIDs usado na coleta.
         """
         self.ip = ip
         self.nickname = nickname
@@ -183,6 +268,7 @@ class EndPoints(Base):
         self.authKey = authKey
         self.privKey = privKey
         self.id_user = id_user
+        self.id_oid_profile = id_oid_profile
 
 
 class EndPointsData(Base):
@@ -191,6 +277,10 @@ class EndPointsData(Base):
     Armazena informações de status e métricas coletadas.
     """
     __tablename__ = 'endpoints_data'
+    __table_args__ = (
+        # Última coleta de cada endpoint (max(id) agrupado por id_end_point)
+        Index("ix_endpoints_data_id_end_point_id", "id_end_point", "id"),
+    )
 
     id = Column("id", Integer, primary_key=True, autoincrement=True)
     id_end_point = Column("id_end_point", Integer, ForeignKey('endpoints.id'))
@@ -251,15 +341,16 @@ class EndPointsData(Base):
         self.last_updated = last_updated
 
 
-class EndPointOIDs(Base):
+class OIDProfiles(Base):
     """
-    Modelo ORM para os OIDs monitorados de cada endpoint.
-    Armazena os identificadores SNMP de interesse para cada endpoint.
+    Modelo ORM para perfis reutilizáveis de OIDs SNMP (ex.: linux-net-snmp, cisco-ios).
+    Vários endpoints referenciam o mesmo perfil; diferenças ficam em EndPointOIDOverrides.
     """
-    __tablename__ = 'endpoints_oids'
+    __tablename__ = 'oid_profiles'
 
     id = Column("id", Integer, primary_key=True, autoincrement=True)
-    id_end_point = Column("id_end_point", Integer, ForeignKey('endpoints.id'))
+    name = Column("name", String(100), nullable=False, unique=True)
+    description = Column("description", Text, nullable=True)
     sysDescr = Column("sysDescr", Text)
     sysName = Column("sysName", String)
     sysUpTime = Column("sysUpTime", String)
@@ -272,38 +363,84 @@ class EndPointOIDs(Base):
     ifOperStatus = Column("ifOperStatus", String)
     ifInOctets = Column("ifInOctets", String)
     ifOutOctets = Column("ifOutOctets", String)
+    created_at = Column("created_at", DateTime, default=func.now())
+    updated_at = Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now())
 
-    def __init__(self, id_end_point, sysDescr, sysName, sysUpTime, hrProcessorLoad, memTotalReal, memAvailReal, hrStorageSize, hrStorageUsed, hrStorageDescr, ifOperStatus, ifInOctets, ifOutOctets):
+    def __init__(self, name, description=None, **oids):
         """
-        Inicializa um novo conjunto de OIDs para um endpoint.
+        Inicializa um novo perfil de OIDs.
+        Args:
+            name (str): Nome único do perfil.
+            description (str): Descrição do perfil.
+            **oids (str): OIDs do perfil, indexados pelo nome da métrica (sysDescr, sysName, ...).
+        """
+        self.name = name
+        self.description = description
+        for field, value in oids.items():
+            setattr(self, field, value)
+
+
+class EndPointOIDOverrides(Base):
+    """
+    Modelo ORM para os OIDs em que um endpoint difere do seu perfil (OIDProfiles).
+    Só existe linha para endpoints com alguma diferença; colunas nulas herdam o perfil.
+    O coletor externo lê a view endpoints_oids (perfil + overrides resolvidos), então
+    alterar um perfil vale para todos os endpoints que o usam.
+    """
+    __tablename__ = 'endpoint_oid_overrides'
+
+    id = Column("id", Integer, primary_key=True, autoincrement=True)
+    id_end_point = Column("id_end_point", Integer, ForeignKey('endpoints.id'), nullable=False, unique=True)
+    sysDescr = Column("sysDescr", Text)
+    sysName = Column("sysName", String)
+    sysUpTime = Column("sysUpTime", String)
+    hrProcessorLoad = Column("hrProcessorLoad", String)
+    memTotalReal = Column("memTotalReal", String)
+    memAvailReal = Column("memAvailReal", String)
+    hrStorageSize = Column("hrStorageSize", String)
+    hrStorageUsed = Column("hrStorageUsed", String)
+    hrStorageDescr = Column("hrStorageDescr", String)
+    ifOperStatus = Column("ifOperStatus", String)
+    ifInOctets = Column("ifInOctets", String)
+    ifOutOctets = Column("ifOutOctets", String)
+
+    def __init__(self, id_end_point, **oids):
+        """
+        Inicializa os overrides de OIDs de um endpoint.
         Args:
             id_end_point (int): ID do endpoint.
-            sysDescr (str): Descrição do sistema.
-            sysName (str): Nome do sistema.
-            sysUpTime (str): Tempo de atividade.
-            hrProcessorLoad (str): Carga do processador.
-            memTotalReal (str): Memória total.
-            memAvailReal (str): Memória disponível.
-            hrStorageSize (str): Tamanho do armazenamento.
-            hrStorageUsed (str): Armazenamento usado.
-            hrStorageDescr (str): Descrição do armazenamento.
-            ifOperStatus (str): Status operacional das interfaces.
-            ifInOctets (str): Tráfego recebido das interfaces.
-            ifOutOctets (str): Tráfego transmitido das interfaces.
+            **oids (str): OIDs que sobrescrevem o perfil, indexados pelo nome da métrica.
         """
         self.id_end_point = id_end_point
-        self.sysDescr = sysDescr
-        self.sysName = sysName
-        self.sysUpTime = sysUpTime
-        self.hrProcessorLoad = hrProcessorLoad
-        self.memTotalReal = memTotalReal
-        self.memAvailReal = memAvailReal
-        self.hrStorageSize = hrStorageSize
-        self.hrStorageUsed = hrStorageUsed
-        self.hrStorageDescr = hrStorageDescr
-        self.ifOperStatus = ifOperStatus
-        self.ifInOctets = ifInOctets
-        self.ifOutOctets = ifOutOctets
+        for field, value in oids.items():
+            setattr(self, field, value)
+
+
+# OIDs efetivos de cada endpoint (perfil com os overrides por cima), com as mesmas colunas
+# da antiga tabela endpoints_oids que o coletor externo lê. Criada junto com a tabela de
+# overrides (create_all) e pela migração.
+ENDPOINT_OIDS_VIEW_DDL = """CREATE VIEW endpoints_oids AS
+    SELECT e.id AS id, e.id AS id_end_point,
+        COALESCE(o."sysDescr", p."sysDescr") AS "sysDescr",
+        COALESCE(o."sysName", p."sysName") AS "sysName",
+        COALESCE(o."sysUpTime", p."sysUpTime") AS "sysUpTime",
+        COALESCE(o."hrProcessorLoad", p."hrProcessorLoad") AS "hrProcessorLoad",
+        COALESCE(o."memTotalReal", p."memTotalReal") AS "memTotalReal",
+        COALESCE(o."memAvailReal", p."memAvailReal") AS "memAvailReal",
+        COALESCE(o."hrStorageSize", p."hrStorageSize") AS "hrStorageSize",
+        COALESCE(o."hrStorageUsed", p."hrStorageUsed") AS "hrStorageUsed",
+        COALESCE(o."hrStorageDescr", p."hrStorageDescr") AS "hrStorageDescr",
+        COALESCE(o."ifOperStatus", p."ifOperStatus") AS "ifOperStatus",
+        COALESCE(o."ifInOctets", p."ifInOctets") AS "ifInOctets",
+        COALESCE(o."ifOutOctets", p."ifOutOctets") AS "ifOutOctets"
+    FROM endpoints e
+    LEFT JOIN oid_profiles p ON p.id = e.id_oid_profile
+    LEFT JOIN endpoint_oid_overrides o ON o.id_end_point = e.id
+    WHERE p.id IS NOT NULL OR o.id IS NOT NULL"""
+
+event.listen(EndPointOIDOverrides.__table__, "after_create", DDL(ENDPOINT_OIDS_VIEW_DDL))
+# A view depende de endpoints e oid_profiles, removidas depois desta tabela
+event.listen(EndPointOIDOverrides.__table__, "before_drop", DDL("DROP VIEW IF EXISTS endpoints_oids"))
 
 
 class AlertSeverity(str, Enum):
@@ -328,12 +465,105 @@ class AlertImpact(str, Enum):
     MEDIUM = "medium"
     LOW = "low"
 
+
+# Enums das colunas de Alerts com valores restritos
+ALERT_ENUMS = {"severity": AlertSeverity, "status": AlertStatus, "category": AlertCategory, "impact": AlertImpact}
+
+# Sinônimos aceitos na gravação e nos filtros (português e valores legados), em minúsculas
+ALERT_VALUE_ALIASES = {
+    "severity": {"critico": "critical", "crítico": "critical", "alto": "high", "alta": "high",
+                 "medio": "medium", "médio": "medium", "media": "medium", "média": "medium",
+                 "baixo": "low", "baixa": "low"},
+    "status": {"ativo": "active", "aberto": "active", "open": "active",
+               "reconhecido": "acknowledged", "em_progresso": "acknowledged", "em progresso": "acknowledged",
+               "in_progress": "acknowledged", "resolvido": "resolved", "fechado": "resolved", "closed": "resolved"},
+    "category": {"infraestrutura": "infrastructure", "sistema": "infrastructure", "system": "infrastructure",
+                 "aplicacao": "infrastructure", "aplicação": "infrastructure", "application": "infrastructure",
+                 "monitoramento": "infrastructure", "monitoring": "infrastructure",
+                 "seguranca": "security", "segurança": "security", "desempenho": "performance", "rede": "network"},
+    "impact": {"alto": "high", "medio": "medium", "médio": "medium", "baixo": "low"},
+}
+for _field, _enum in ALERT_ENUMS.items():
+    ALERT_VALUE_ALIASES[_field].update({member.value: member.value for member in _enum})
+
+# Valor gravado quando o informado não corresponde a nenhum valor nem sinônimo
+ALERT_VALUE_DEFAULTS = {"severity": "medium", "status": "active", "category": "infrastructure", "impact": "medium"}
+
+
+def normalize_alert_values(values: dict) -> dict:
+    """
+    Converte severity, status, category e impact para os valores dos enums antes da gravação
+    (as restrições CHECK da tabela alerts rejeitam qualquer outro valor).
+    Args:
+        values (dict): Valores das colunas de Alerts (as colunas ausentes são mantidas ausentes).
+    Returns:
+        dict: Cópia de values com os campos normalizados.
+    """
+    normalized = dict(values)
+    for field, aliases in ALERT_VALUE_ALIASES.items():
+        if field in normalized:
+            value = normalized[field]
+            value = value.value if isinstance(value, Enum) else value
+            normalized[field] = aliases.get(str(value or "").strip().lower(), ALERT_VALUE_DEFAULTS[field])
+    return normalized
+
+
+def _alert_enum_check(field: str) -> CheckConstraint:
+    values = ", ".join(f"'{member.value}'" for member in ALERT_ENUMS[field])
+    return CheckConstraint(f"{field} IN ({values})", name=f"ck_alerts_{field}")
+
+
+# Predicado do índice único parcial de fingerprint (alertas ainda não resolvidos)
+OPEN_ALERT_PREDICATE = "status <> 'resolved'"
+
+
+def alert_fingerprint(id_endpoint, category: str, title: str) -> str:
+    """
+    Identifica alertas repetidos: mesmo endpoint, categoria e título (nome da regra).
+    Args:
+        id_endpoint (int): ID do endpoint (ou None).
+        category (str): Categoria do alerta.
+        title (str): Título do alerta.
+    Returns:
+        str: SHA-1 hexadecimal (40 caracteres).
+    """
+    key = f"{id_endpoint or ''}|{category}|{title}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def alert_duration(created_at, resolved_at) -> str:
+    """Duração do alerta (criação até a resolução, ou até agora se estiver aberto), ex.: "2h 5min"."""
+    from datetime import datetime
+    if resolved_at:
+        delta = resolved_at - created_at
+    else:
+        delta = datetime.utcnow() - created_at
+
+    hours = int(delta.total_seconds() // 3600)
+    minutes = int((delta.total_seconds() % 3600) // 60)
+
+    if hours > 0:
+        return f"{hours}h {minutes}min"
+    return f"{minutes}min"
+
+
 class Alerts(Base):
     """
     Modelo ORM para a tabela de alertas do sistema.
     Representa alertas gerados pelo sistema de monitoramento.
     """
     __tablename__ = 'alerts'
+    __table_args__ = (
+        # Chave da paginação por cursor na ordenação padrão (created_at, id)
+        Index("ix_alerts_created_at_id", "created_at", "id"),
+        # Um único alerta aberto por fingerprint; alvo do INSERT ... ON CONFLICT
+        Index("ux_alerts_fingerprint_open", "fingerprint", unique=True,
+              postgresql_where=text(OPEN_ALERT_PREDICATE), sqlite_where=text(OPEN_ALERT_PREDICATE)),
+        # Busca de alertas resolvidos recentemente (reabertura dentro da janela de histerese)
+        Index("ix_alerts_fingerprint_resolved_at", "fingerprint", "resolved_at"),
+        # Apenas valores dos enums (normalize_alert_values na gravação)
+        *(_alert_enum_check(field) for field in ALERT_ENUMS),
+    )
 
     id = Column("id", Integer, primary_key=True, autoincrement=True)
     title = Column("title", String(255), nullable=False)
@@ -344,6 +574,9 @@ class Alerts(Base):
     impact = Column("impact", String(50), nullable=False, default="medium")  # high, medium, low
     system = Column("system", String(255), nullable=False)  # Sistema/endpoint que gerou o alerta
     assignee = Column("assignee", String(255), nullable=True)  # Responsável pelo alerta
+    fingerprint = Column("fingerprint", String(40), nullable=True)  # alert_fingerprint(id_endpoint, category, title)
+    occurrences = Column("occurrences", Integer, nullable=False, default=1, server_default="1")  # Ocorrências repetidas
+    last_seen = Column("last_seen", DateTime, nullable=True)  # Última ocorrência
     
     # Relacionamentos
     id_endpoint = Column("id_endpoint", Integer, ForeignKey('endpoints.id'), nullable=True)
@@ -375,26 +608,67 @@ class Alerts(Base):
         self.id_user_created = id_user_created
         self.assignee = assignee
         self.status = "active"  # Define status padrão
+        self.fingerprint = alert_fingerprint(id_endpoint, category, title)
+        self.occurrences = 1
         # Inicializar timestamps explicitamente com datetime atual
         now = datetime.now()
         self.created_at = now
         self.updated_at = now
+        self.last_seen = now
 
     @property
     def duration(self):
         """Calcula a duração do alerta desde a criação"""
-        from datetime import datetime
-        if self.resolved_at:
-            delta = self.resolved_at - self.created_at
-        else:
-            delta = datetime.utcnow() - self.created_at
-        
-        hours = int(delta.total_seconds() // 3600)
-        minutes = int((delta.total_seconds() % 3600) // 60)
-        
-        if hours > 0:
-            return f"{hours}h {minutes}min"
-        return f"{minutes}min"
+        return alert_duration(self.created_at, self.resolved_at)
+
+
+# Índices de busca textual dos alertas, criados junto com a tabela (create_all) e pela migração.
+# PostgreSQL: coluna tsvector gerada + GIN; trigramas para os filtros de system/assignee.
+# SQLite: tabela FTS5 de conteúdo externo mantida por triggers.
+ALERT_SEARCH_DDL = {
+    "postgresql": [
+        """ALTER TABLE alerts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(system, '') || ' ' || coalesce(assignee, '')), 'C')
+        ) STORED""",
+        "CREATE INDEX ix_alerts_search_vector ON alerts USING GIN (search_vector)",
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX ix_alerts_system_trgm ON alerts USING GIN (system gin_trgm_ops)",
+        "CREATE INDEX ix_alerts_assignee_trgm ON alerts USING GIN (assignee gin_trgm_ops)",
+    ],
+    "sqlite": [
+        """CREATE VIRTUAL TABLE alerts_fts USING fts5(
+            title, description, system, assignee,
+            content='alerts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+    ],
+}
+
+# Triggers que mantêm alerts_fts sincronizada (recriar após batch_alter_table no SQLite)
+SQLITE_ALERT_FTS_TRIGGERS = [
+    """CREATE TRIGGER alerts_fts_ai AFTER INSERT ON alerts BEGIN
+        INSERT INTO alerts_fts(rowid, title, description, system, assignee)
+        VALUES (new.id, new.title, new.description, new.system, new.assignee);
+    END""",
+    """CREATE TRIGGER alerts_fts_ad AFTER DELETE ON alerts BEGIN
+        INSERT INTO alerts_fts(alerts_fts, rowid, title, description, system, assignee)
+        VALUES ('delete', old.id, old.title, old.description, old.system, old.assignee);
+    END""",
+    """CREATE TRIGGER alerts_fts_au AFTER UPDATE OF title, description, system, assignee ON alerts BEGIN
+        INSERT INTO alerts_fts(alerts_fts, rowid, title, description, system, assignee)
+        VALUES ('delete', old.id, old.title, old.description, old.system, old.assignee);
+        INSERT INTO alerts_fts(rowid, title, description, system, assignee)
+        VALUES (new.id, new.title, new.description, new.system, new.assignee);
+    END""",
+]
+ALERT_SEARCH_DDL["sqlite"] += SQLITE_ALERT_FTS_TRIGGERS
+
+for _dialect, _statements in ALERT_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Alerts.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(Alerts.__table__, "after_drop", DDL("DROP TABLE IF EXISTS alerts_fts").execute_if(dialect="sqlite"))
 
 
 class AlertLogs(Base):
@@ -420,6 +694,98 @@ class AlertLogs(Base):
         self.comment = comment
 
 
+class AlertsArchive(Base):
+    """
+    Modelo ORM para alertas resolvidos arquivados (tabela alerts_archive).
+    Mesmas colunas e IDs de Alerts; as linhas são movidas pelo AlertArchiver
+    (api/alert_archive.py) e lidas apenas quando a consulta alcança o arquivo.
+    Sem chaves estrangeiras: remover um endpoint ou usuário não esbarra no histórico.
+    """
+    __tablename__ = 'alerts_archive'
+    __table_args__ = (
+        Index("ix_alerts_archive_created_at_id", "created_at", "id"),
+    )
+
+    id = Column("id", Integer, primary_key=True, autoincrement=False)
+    title = Column("title", String(255), nullable=False)
+    description = Column("description", Text, nullable=True)
+    severity = Column("severity", String(50), nullable=False)
+    status = Column("status", String(50), nullable=False)
+    category = Column("category", String(50), nullable=False)
+    impact = Column("impact", String(50), nullable=False)
+    system = Column("system", String(255), nullable=False)
+    assignee = Column("assignee", String(255), nullable=True)
+    fingerprint = Column("fingerprint", String(40), nullable=True)
+    occurrences = Column("occurrences", Integer, nullable=False, default=1)
+    last_seen = Column("last_seen", DateTime, nullable=True)
+    id_endpoint = Column("id_endpoint", Integer, nullable=True)
+    id_user_created = Column("id_user_created", Integer, nullable=False)
+    id_user_assigned = Column("id_user_assigned", Integer, nullable=True)
+    created_at = Column("created_at", DateTime, nullable=False)
+    updated_at = Column("updated_at", DateTime, nullable=False)
+    acknowledged_at = Column("acknowledged_at", DateTime, nullable=True)
+    resolved_at = Column("resolved_at", DateTime, nullable=True)
+    archived_at = Column("archived_at", DateTime, default=func.now(), nullable=False)
+
+    # Relacionamentos ORM (somente leitura)
+    endpoint = relationship("EndPoints", primaryjoin="foreign(AlertsArchive.id_endpoint) == EndPoints.id", viewonly=True)
+    user_created = relationship("Users", primaryjoin="foreign(AlertsArchive.id_user_created) == Users.id", viewonly=True)
+    user_assigned = relationship("Users", primaryjoin="foreign(AlertsArchive.id_user_assigned) == Users.id", viewonly=True)
+    alert_logs = relationship(
+        "AlertLogsArchive", primaryjoin="AlertsArchive.id == foreign(AlertLogsArchive.id_alert)",
+        order_by="AlertLogsArchive.id", viewonly=True
+    )
+
+    @property
+    def duration(self):
+        """Calcula a duração do alerta (criação até a resolução)"""
+        return alert_duration(self.created_at, self.resolved_at)
+
+
+class AlertLogsArchive(Base):
+    """
+    Modelo ORM para os logs dos alertas arquivados (tabela alert_logs_archive).
+    """
+    __tablename__ = 'alert_logs_archive'
+
+    id = Column("id", Integer, primary_key=True, autoincrement=False)
+    id_alert = Column("id_alert", Integer, nullable=False, index=True)
+    id_user = Column("id_user", Integer, nullable=False)
+    action = Column("action", String(100), nullable=False)
+    comment = Column("comment", Text, nullable=True)
+    created_at = Column("created_at", DateTime, nullable=False)
+
+    # Relacionamentos ORM (somente leitura)
+    user = relationship("Users", primaryjoin="foreign(AlertLogsArchive.id_user) == Users.id", viewonly=True)
+
+
+class NotificationOutbox(Base):
+    """
+    Modelo ORM para a fila transacional de notificações (outbox).
+    Cada linha é um evento de alerta gravado na mesma transação do alerta (record_alerts)
+    e removida pelo OutboxRelay depois de entregue.
+    """
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        # Reivindicação em lote pela ordem de chegada (status, id)
+        Index("ix_notification_outbox_status_id", "status", "id"),
+    )
+
+    id = Column("id", Integer, primary_key=True, autoincrement=True)
+    event = Column("event", String(50), nullable=False)  # alert.created, alert.reopened
+    id_alert = Column("id_alert", Integer, ForeignKey('alerts.id', ondelete="CASCADE"), nullable=False)
+    status = Column("status", String(20), nullable=False, default="pending", server_default="pending")  # pending, claimed, failed
+    attempts = Column("attempts", Integer, nullable=False, default=0, server_default="0")  # Reivindicações
+    claimed_by = Column("claimed_by", String(100), nullable=True)  # Processo que reivindicou a linha
+    claimed_at = Column("claimed_at", DateTime, nullable=True)
+    last_error = Column("last_error", Text, nullable=True)
+    created_at = Column("created_at", DateTime, default=func.now(), nullable=False)
+
+    def __init__(self, event, id_alert):
+        self.event = event
+        self.id_alert = id_alert
+
+
 class AlertRules(Base):
     """
     Modelo ORM para regras de geração automática de alertas.
@@ -461,20 +827,36 @@ class WebHookConfig(Base):
     active = Column("active", Boolean, default=True)
     timeout = Column("timeout", Integer, default=30)
     access_token = Column("access_token", String, nullable=True)
+    batch_size = Column("batch_size", Integer, nullable=False, default=1, server_default="1")  # Alertas por POST (1 = sem lote)
+    batch_wait_ms = Column("batch_wait_ms", Integer, nullable=False, default=1000, server_default="1000")  # Espera máxima do lote
+    max_concurrency = Column("max_concurrency", Integer, nullable=True)  # Requisições simultâneas (None = sem limite)
+    rate_limit = Column("rate_limit", Float, nullable=True)  # Requisições por segundo (None = sem limite)
+    rate_burst = Column("rate_burst", Integer, nullable=True)  # Rajada permitida pelo token bucket
     created_at = Column("created_at", DateTime, default=func.now())
     updated_at = Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now())
 
-    def __init__(self, url, active=True, timeout=30, access_token=None):
+    def __init__(self, url, active=True, timeout=30, access_token=None, batch_size=1, batch_wait_ms=1000,
+                 max_concurrency=None, rate_limit=None, rate_burst=None):
         """
         Inicializa uma nova configuração de webhook.
         Args:
             url (str): URL do webhook.
             active (bool): Se o webhook está ativo.
+            batch_size (int): Alertas agrupados em um único POST (array JSON); 1 desativa o lote.
+            batch_wait_ms (int): Tempo máximo que um alerta aguarda o lote completar.
+            max_concurrency (int): Requisições simultâneas para o webhook.
+            rate_limit (float): Requisições por segundo para o webhook.
+            rate_burst (int): Requisições em rajada acima da taxa.
         """
         self.url = url
         self.active = active
         self.timeout = timeout
         self.access_token = access_token
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
 
 
 class EmailConfig(Base):
@@ -573,6 +955,10 @@ class SLAMetrics(Base):
     Armazena dados de disponibilidade, MTTR, MTBF e compliance de SLA por endpoint.
     """
     __tablename__ = 'sla_metrics'
+    __table_args__ = (
+        # Uma linha por endpoint e período (upsert do motor de SLA)
+        Index("ux_sla_metrics_endpoint_period", "endpoint_id", "timestamp", "measurement_period_hours", unique=True),
+    )
     
     id = Column("id", Integer, primary_key=True, autoincrement=True)
     endpoint_id = Column("endpoint_id", Integer, ForeignKey("endpoints.id"), nullable=False)
@@ -760,6 +1146,36 @@ class PerformanceMetrics(Base):
         self.measurement_period_minutes = measurement_period_minutes
 
 
+# Tabelas cuja versão é incrementada a cada commit que as altera (ETags das rotas de leitura)
+VERSIONED_TABLES = frozenset({
+    "alerts",
+    "endpoints",
+    "webhook_config",
+    "email_config",
+    "failure_threshold_config",
+    "performance_thresholds",
+})
+
+
+class TableVersions(Base):
+    """
+    Modelo ORM para o contador de versões por tabela.
+    Cada commit que insere, altera ou exclui linhas de uma tabela de VERSIONED_TABLES
+    incrementa a versão dela na mesma transação (api/etag.py); a leitura é uma busca
+    pela chave primária, sem varrer a tabela versionada. Tabelas com a coluna
+    change_version (endpoints) têm as linhas alteradas carimbadas com essa versão.
+    """
+    __tablename__ = 'table_versions'
+
+    name = Column("name", String(100), primary_key=True)
+    version = Column("version", Integer, nullable=False, default=0, server_default="0")
+
+
+@event.listens_for(TableVersions.__table__, "after_create")
+def _seed_table_versions(target, connection, **kw):
+    connection.execute(target.insert(), [{"name": name, "version": 0} for name in VERSIONED_TABLES])
+
+
 # executar a criacao dos metadados do banco de dados
 # alembic init alembic
 
@@ -1,15 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
-from api.dependencies import init_session, verify_token
-from sqlalchemy.orm import Session
-from api.models import Users, EndPoints, EndPointsData, EndPointOIDs
-from api.schemas import EndPointsDataSchemas, AddEndPointRequest
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from api.dependencies import init_session, init_read_session, verify_token
+from api.pagination import encode_cursor, decode_cursor
+from api.etag import conditional_get
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import Users, EndPoints, EndPointsData, EndPointOIDOverrides, OIDProfiles, TableVersions
+from api.schemas import (EndPointsDataSchemas, AddEndPointRequest, OIDProfileSchemas, OIDProfileResponse,
+                         OIDRequestPlanResponse)
 from api.utils_api import valid_end_point
-from typing import Dict, Any, Optional
+from api.oid_profiles import OID_FIELDS, get_or_create_profile, diff_overrides, load_request_plans
+from typing import Dict, Any, Optional, List
+import os
+import time
 
 
 
 monitor_router = APIRouter(prefix="/monitor", tags=["monitor"], dependencies=[Depends(verify_token)])
 
+# GET /monitor/changes: tempo máximo de uma transação do coletor em andamento coberto pela
+# releitura, e quantas coletas abaixo do cursor são verificadas em busca de lacunas
+CHANGES_SAFETY_WINDOW = float(os.getenv("MONITOR_CHANGES_SAFETY_WINDOW", 60))
+CHANGES_GAP_SCAN = int(os.getenv("MONITOR_CHANGES_GAP_SCAN", 1000))
+
 
 def _check_admin(user: Users):
     if user.access_level != "ADMIN":
@@ -19,8 +32,69 @@ def _check_monitor_or_admin(user: Users):
     if user.access_level not in ["ADMIN", "MONITOR"]:
         raise HTTPException(status_code=403, detail="Operação não permitida: requer nível ADMIN ou MONITOR")
 
-def _get_endpoint_by_ip(ip: str, session: Session) -> Optional[EndPoints]:
-    return session.query(EndPoints).filter(EndPoints.ip == ip).one_or_none()
+async def _get_endpoint_by_ip(ip: str, session: AsyncSession) -> Optional[EndPoints]:
+    return (await session.scalars(select(EndPoints).where(EndPoints.ip == ip))).one_or_none()
+
+async def _get_last_data(id_end_point: int, session: AsyncSession) -> Optional[EndPointsData]:
+    return await session.scalar(
+        select(EndPointsData)
+        .where(EndPointsData.id_end_point == id_end_point)
+        .order_by(EndPointsData.id.desc())
+        .limit(1)
+    )
+
+async def _get_latest_data(session: AsyncSession, endpoint_ids: Optional[List[int]] = None) -> Dict[int, EndPointsData]:
+    """
+    Última coleta de cada endpoint em uma única consulta (em vez de uma por endpoint).
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+        endpoint_ids (list): Restringe aos endpoints informados; None = todos.
+    Returns:
+        dict: Última coleta indexada pelo ID do endpoint.
+    """
+    latest = select(func.max(EndPointsData.id)).group_by(EndPointsData.id_end_point)
+    if endpoint_ids is not None:
+        if not endpoint_ids:
+            return {}
+        latest = latest.where(EndPointsData.id_end_point.in_(endpoint_ids))
+    rows = (await session.scalars(select(EndPointsData).where(EndPointsData.id.in_(latest)))).all()
+    return {row.id_end_point: row for row in rows}
+
+def _serialize_last_data(last_data: Optional[EndPointsData], active: bool) -> Optional[EndPointsDataSchemas]:
+    if last_data is None:
+        return None
+    # Cria um dicionário com os dados do EndPointsData e adiciona o campo active do endpoint
+    return EndPointsDataSchemas.model_validate({
+        'id_end_point': last_data.id_end_point,
+        'status': last_data.status,
+        'active': active,  # Campo do endpoint
+        'sysDescr': last_data.sysDescr,
+        'sysName': last_data.sysName,
+        'sysUpTime': last_data.sysUpTime,
+        'hrProcessorLoad': last_data.hrProcessorLoad,
+        'memTotalReal': last_data.memTotalReal,
+        'memAvailReal': last_data.memAvailReal,
+        'hrStorageSize': last_data.hrStorageSize,
+        'hrStorageUsed': last_data.hrStorageUsed,
+        'hrStorageDescr': last_data.hrStorageDescr,
+        'ifOperStatus': last_data.ifOperStatus,
+        'ifInOctets': last_data.ifInOctets,
+        'ifOutOctets': last_data.ifOutOctets,
+        'ping_rtt': last_data.ping_rtt,
+        'snmp_rtt': last_data.snmp_rtt,
+        'last_updated': last_data.last_updated
+    })
+
+async def _resolve_oid_profile(id_oid_profile: Optional[int], session: AsyncSession) -> OIDProfiles:
+    if id_oid_profile is None:
+        return await session.run_sync(get_or_create_profile)
+    profile = await session.get(OIDProfiles, id_oid_profile)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Perfil de OIDs não encontrado")
+    return profile
+
+def _requested_oids(end_point: AddEndPointRequest) -> Dict[str, Optional[str]]:
+    return {field: getattr(end_point, field) for field in OID_FIELDS}
 
 
 
@@ -28,7 +102,7 @@ def _get_endpoint_by_ip(ip: str, session: Session) -> Optional[EndPoints]:
 async def add_ip(
     end_point: AddEndPointRequest,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)) -> dict:
+    session: AsyncSession = Depends(init_session)) -> dict:
     """
     Adiciona um endereço IP/Domínio à lista de monitoramento.
     """
@@ -36,9 +110,11 @@ async def add_ip(
     if not valid_end_point(end_point):
         raise HTTPException(status_code=400, detail="Endpoint inválido")
 
-    if _get_endpoint_by_ip(end_point.ip, session):
+    if await _get_endpoint_by_ip(end_point.ip, session):
         raise HTTPException(status_code=400, detail="IP/Domínio já cadastrado")
 
+    profile = await _resolve_oid_profile(end_point.id_oid_profile, session)
+
     new_endpoint = EndPoints(
         end_point.ip,
         end_point.nickname,
@@ -50,45 +126,32 @@ async def add_ip(
         end_point.active,
         end_point.authKey,
         end_point.privKey,
-        logged_user.id
+        logged_user.id,
+        profile.id
     )
     session.add(new_endpoint)
-    session.commit()
-
-    if (not end_point.sysDescr and not end_point.sysName and not end_point.sysUpTime and
-        not end_point.hrProcessorLoad and not end_point.memTotalReal and not end_point.memAvailReal and
-        not end_point.hrStorageSize and not end_point.hrStorageUsed and not end_point.hrStorageDescr and 
-        not end_point.ifOperStatus and not end_point.ifInOctets and not end_point.ifOutOctets):
-        new_endpoint_oids = EndPointOIDs(
-            new_endpoint.id,
-            end_point.sysDescr or "1.3.6.1.2.1.1.1.0",
-            end_point.sysName or "1.3.6.1.2.1.1.5.0",
-            end_point.sysUpTime or "1.3.6.1.2.1.1.3.0",
-            end_point.hrProcessorLoad or "1.3.6.1.2.1.25.3.3.1.2",
-            end_point.memTotalReal or "1.3.6.1.4.1.2021.4.5.0",
-            end_point.memAvailReal or "1.3.6.1.4.1.2021.4.6.0",
-            end_point.hrStorageSize or "1.3.6.1.2.1.25.2.3.1.5",
-            end_point.hrStorageUsed or "1.3.6.1.2.1.25.2.3.1.6",
-            end_point.hrStorageDescr or "1.3.6.1.2.1.25.2.3.1.3",
-            end_point.ifOperStatus or "1.3.6.1.2.1.2.2.1.8",
-            end_point.ifInOctets or "1.3.6.1.2.1.2.2.1.10",
-            end_point.ifOutOctets or "1.3.6.1.2.1.2.2.1.16"
-        )
-        session.add(new_endpoint_oids)
-        session.commit()
+    await session.flush()
+
+    # Grava apenas os OIDs que diferem do perfil compartilhado
+    overrides = diff_overrides(profile, _requested_oids(end_point))
+    if overrides:
+        session.add(EndPointOIDOverrides(new_endpoint.id, **overrides))
+    await session.commit()
     return {"success": True, "message": f"Endereço IP {end_point.ip} adicionado à lista de monitoramento."}
 
 
 
 @monitor_router.get("/history", response_model=Dict[str, Any])
-async def get_history(session: Session = Depends(init_session)) -> dict:
+async def get_history(session: AsyncSession = Depends(init_read_session)) -> dict:
     """
     Obtém o histórico de todos os dispositivos monitorados.
     """
     list_data = []
-    all_data = session.query(EndPoints).all()
+    all_data = (await session.scalars(select(EndPoints))).all()
     for data in all_data:
-        endpoint_data = session.query(EndPointsData).filter(EndPointsData.id_end_point == data.id).all()
+        endpoint_data = (await session.scalars(
+            select(EndPointsData).where(EndPointsData.id_end_point == data.id)
+        )).all()
         endpoint_data_serialized = []
         for d in endpoint_data:
             # Cria um dicionário com os dados do EndPointsData e adiciona o campo active do endpoint
@@ -120,46 +183,27 @@ async def get_history(session: Session = Depends(init_session)) -> dict:
 
 
 @monitor_router.get("/status", response_model=Dict[str, Any])
-async def get_status(session: Session = Depends(init_session)) -> dict:
+async def get_status(
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(init_session)) -> dict:
     """
     Obtém o status de todos os dispositivos monitorados.
+    Com If-None-Match igual à ETag atual responde 304 sem consultar as coletas.
     """
+    not_modified = await conditional_get(request, response, session, "monitor.status", (EndPoints, EndPointsData))
+    if not_modified:
+        return not_modified
     list_data = []
-    all_data = session.query(EndPoints).all()
+    all_data = (await session.scalars(select(EndPoints))).all()
+    latest = await _get_latest_data(session)
     for data in all_data:
-        last_data = (session.query(EndPointsData)
-                     .filter(EndPointsData.id_end_point == data.id)
-                     .order_by(EndPointsData.id.desc()).first())
-        
-        last_data_serialize = None
-        if last_data:
-            # Cria um dicionário com os dados do EndPointsData e adiciona o campo active do endpoint
-            data_dict = {
-                'id_end_point': last_data.id_end_point,
-                'status': last_data.status,
-                'active': data.active,  # Campo do endpoint
-                'sysDescr': last_data.sysDescr,
-                'sysName': last_data.sysName,
-                'sysUpTime': last_data.sysUpTime,
-                'hrProcessorLoad': last_data.hrProcessorLoad,
-                'memTotalReal': last_data.memTotalReal,
-                'memAvailReal': last_data.memAvailReal,
-                'hrStorageSize': last_data.hrStorageSize,
-                'hrStorageUsed': last_data.hrStorageUsed,
-                'hrStorageDescr': last_data.hrStorageDescr,
-                'ifOperStatus': last_data.ifOperStatus,
-                'ifInOctets': last_data.ifInOctets,
-                'ifOutOctets': last_data.ifOutOctets,
-                'ping_rtt': last_data.ping_rtt,
-                'snmp_rtt': last_data.snmp_rtt,
-                'last_updated': last_data.last_updated
-            }
-            last_data_serialize = EndPointsDataSchemas.model_validate(data_dict)
-        
-        snmp = None
-        if last_data:
-            snmp = session.query(EndPointOIDs).filter(EndPointOIDs.id_end_point == last_data.id)
-        list_data.append({"endpoint": data.ip, "snmp": True if snmp else False, "data": last_data_serialize})
+        last_data = latest.get(data.id)
+        list_data.append({
+            "endpoint": data.ip,
+            "snmp": last_data is not None,
+            "data": _serialize_last_data(last_data, data.active)
+        })
 
     def total_depravado(data:EndPointsDataSchemas):
         return (data and data.status 
@@ -184,50 +228,150 @@ async def get_status(session: Session = Depends(init_session)) -> dict:
     }
 
 
+
+@monitor_router.get("/changes")
+async def get_changes(
+    since: Optional[str] = Query(None, description="Cursor retornado pela chamada anterior; ausente = estado completo"),
+    session: AsyncSession = Depends(init_read_session)) -> JSONResponse:
+    """
+    Sincronização incremental do painel: retorna apenas os endpoints com coleta nova
+    (EndPointsData.id acima do cursor) ou alterados (cadastro/campo active, por
+    change_version) desde o cursor informado, no mesmo formato de /monitor/status,
+    e o novo cursor.
+    - Sem since, retorna todos os endpoints (carga inicial).
+    - change_version segue a ordem de commit (api/etag.py). Os ids das coletas, gravadas
+      pelo coletor, não: um id abaixo do cursor pode ficar visível depois. O cursor guarda
+      essas lacunas por até MONITOR_CHANGES_SAFETY_WINDOW segundos e a chamada seguinte
+      as relê.
+    - Aplicar as mudanças é idempotente: um endpoint pode vir repetido em chamadas seguidas.
+    - Endpoints removidos não aparecem; quando total diverge da quantidade que o cliente
+      conhece, ele deve recarregar sem since.
+    """
+    # O novo cursor é lido antes das mudanças e limita a consulta: o que for gravado
+    # entre as duas consultas volta na próxima chamada em vez de se perder ou repetir
+    now = time.time()
+    data_cursor = await session.scalar(select(func.max(EndPointsData.id))) or 0
+    endpoint_cursor = await session.scalar(
+        select(TableVersions.version).where(TableVersions.name == EndPoints.__tablename__)
+    ) or 0
+    total = await session.scalar(select(func.count()).select_from(EndPoints))
+
+    query = select(EndPoints).order_by(EndPoints.id)
+    gaps = []
+    if since:
+        since_data, since_gaps, since_endpoint = decode_cursor(since, 3)
+        try:
+            if not isinstance(since_data, int) or not isinstance(since_endpoint, int):
+                raise ValueError
+            since_gaps = [(int(gap), float(noticed)) for gap, noticed in since_gaps]
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        gap_ids = [gap for gap, _ in since_gaps]
+        new_data = select(EndPointsData.id_end_point).where(or_(
+            and_(EndPointsData.id > since_data, EndPointsData.id <= data_cursor),
+            EndPointsData.id.in_(gap_ids)
+        )).distinct()
+        query = query.where(or_(
+            EndPoints.id.in_(new_data),
+            and_(EndPoints.change_version > since_endpoint, EndPoints.change_version <= endpoint_cursor)
+        ))
+
+        # Lacunas: ids abaixo do novo cursor que ainda não existem (transação do coletor em
+        # andamento); descartadas depois da janela (rollback ou salto da sequência)
+        scan_from = max(since_data, data_cursor - CHANGES_GAP_SCAN)
+        found = set((await session.scalars(select(EndPointsData.id).where(or_(
+            and_(EndPointsData.id > scan_from, EndPointsData.id <= data_cursor),
+            EndPointsData.id.in_(gap_ids)
+        )))).all())
+        gaps = [[gap, noticed] for gap, noticed in since_gaps if gap not in found and now - noticed < CHANGES_SAFETY_WINDOW]
+        gaps += [[gap, now] for gap in range(scan_from + 1, data_cursor + 1) if gap not in found]
+    endpoints = (await session.scalars(query)).all()
+    latest = await _get_latest_data(session, [endpoint.id for endpoint in endpoints])
+
+    monitors = []
+    for endpoint in endpoints:
+        last_data = _serialize_last_data(latest.get(endpoint.id), endpoint.active)
+        monitors.append({
+            "id": endpoint.id,
+            "endpoint": endpoint.ip,
+            "active": endpoint.active,
+            "snmp": last_data is not None,
+            "data": last_data.model_dump(mode="json") if last_data else None,
+        })
+    return JSONResponse({
+        "cursor": encode_cursor([data_cursor, gaps, endpoint_cursor]),
+        "full": not since,
+        "monitors": monitors,
+        "total": total,
+    })
+
+
+
+@monitor_router.get("/oid-profiles", response_model=List[OIDProfileResponse])
+async def list_oid_profiles(session: AsyncSession = Depends(init_session)) -> List[OIDProfileResponse]:
+    """
+    Lista os perfis de OIDs disponíveis para os endpoints.
+    """
+    return (await session.scalars(select(OIDProfiles).order_by(OIDProfiles.name))).all()
+
+
+
+@monitor_router.get("/oid-plans", response_model=List[OIDRequestPlanResponse])
+async def list_oid_plans(
+    ids: Optional[List[int]] = Query(None, description="IDs dos endpoints (padrão: todos os ativos)"),
+    logged_user: Users = Depends(verify_token),
+    session: AsyncSession = Depends(init_read_session)) -> List[OIDRequestPlanResponse]:
+    """
+    Retorna o plano de requisições SNMP (GET e WALK) de cada endpoint ativo.
+    Os planos são compilados uma vez por perfil + overrides e compartilhados entre os
+    endpoints com a mesma combinação.
+    """
+    _check_monitor_or_admin(logged_user)
+    plans = await session.run_sync(load_request_plans, ids)
+    return [
+        OIDRequestPlanResponse(
+            endpoint_id=endpoint_id, profile_id=plan.profile_id,
+            get_oids=dict(plan.get_oids), walk_oids=dict(plan.walk_oids)
+        )
+        for endpoint_id, plan in sorted(plans.items())
+    ]
+
+
+
+@monitor_router.post("/oid-profiles", response_model=OIDProfileResponse)
+async def create_oid_profile(
+    profile_data: OIDProfileSchemas,
+    logged_user: Users = Depends(verify_token),
+    session: AsyncSession = Depends(init_session)) -> OIDProfileResponse:
+    """
+    Cria um perfil de OIDs reutilizável.
+    """
+    _check_admin(logged_user)
+    if await session.scalar(select(OIDProfiles).where(OIDProfiles.name == profile_data.name)):
+        raise HTTPException(status_code=400, detail="Perfil de OIDs já cadastrado")
+
+    profile = OIDProfiles(**profile_data.model_dump())
+    session.add(profile)
+    await session.commit()
+    await session.refresh(profile)
+    return profile
+
+
  
 @monitor_router.get("/{ip}", response_model=Optional[EndPointsDataSchemas])
 async def get_ip_info(
     ip: str,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)) -> Optional[EndPointsDataSchemas]:
+    session: AsyncSession = Depends(init_session)) -> Optional[EndPointsDataSchemas]:
     """
     Obtém informações sobre um endereço IP específico.
     """
     _check_monitor_or_admin(logged_user)
-    endpoint = _get_endpoint_by_ip(ip, session)
+    endpoint = await _get_endpoint_by_ip(ip, session)
     if not endpoint:
         raise HTTPException(status_code=404, detail="IP/Domínio não encontrado")
-    last_data = (
-        session.query(EndPointsData)
-        .filter(EndPointsData.id_end_point == endpoint.id)
-        .order_by(EndPointsData.id.desc())
-        .first()
-    )
-    # Converte o objeto SQLAlchemy para schema Pydantic se existir
-    if last_data:
-        # Cria um dicionário com os dados do EndPointsData e adiciona o campo active do endpoint
-        data_dict = {
-            'id_end_point': last_data.id_end_point,
-            'status': last_data.status,
-            'active': endpoint.active,  # Campo do endpoint, não do data
-            'sysDescr': last_data.sysDescr,
-            'sysName': last_data.sysName,
-            'sysUpTime': last_data.sysUpTime,
-            'hrProcessorLoad': last_data.hrProcessorLoad,
-            'memTotalReal': last_data.memTotalReal,
-            'memAvailReal': last_data.memAvailReal,
-            'hrStorageSize': last_data.hrStorageSize,
-            'hrStorageUsed': last_data.hrStorageUsed,
-            'hrStorageDescr': last_data.hrStorageDescr,
-            'ifOperStatus': last_data.ifOperStatus,
-            'ifInOctets': last_data.ifInOctets,
-            'ifOutOctets': last_data.ifOutOctets,
-            'ping_rtt': last_data.ping_rtt,
-            'snmp_rtt': last_data.snmp_rtt,
-            'last_updated': last_data.last_updated
-        }
-        return EndPointsDataSchemas.model_validate(data_dict)
-    return None
+    last_data = await _get_last_data(endpoint.id, session)
+    return _serialize_last_data(last_data, endpoint.active)
 
 
 
@@ -235,7 +379,7 @@ async def get_ip_info(
 async def update_ip_info(
     end_point: AddEndPointRequest,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)) -> dict:
+    session: AsyncSession = Depends(init_session)) -> dict:
     """
     Atualiza as informações de um endereço IP específico.
     """
@@ -243,13 +387,12 @@ async def update_ip_info(
     if not valid_end_point(end_point):
         raise HTTPException(status_code=400, detail="Endpoint inválido")
 
-    endpoint = _get_endpoint_by_ip(end_point.ip, session)
+    endpoint = await _get_endpoint_by_ip(end_point.ip, session)
     if not endpoint:
         raise HTTPException(status_code=404, detail="IP/Domínio não existente")
 
-    oids = session.query(EndPointOIDs).filter(EndPointOIDs.id_end_point == endpoint.id).one_or_none()
-    if not oids:
-        raise HTTPException(status_code=404, detail="IP/Domínio não existente")
+    profile = await _resolve_oid_profile(end_point.id_oid_profile or endpoint.id_oid_profile, session)
+    oids = await session.scalar(select(EndPointOIDOverrides).where(EndPointOIDOverrides.id_end_point == endpoint.id))
 
     endpoint.ip = end_point.ip
     endpoint.interval = end_point.interval
@@ -260,18 +403,19 @@ async def update_ip_info(
     endpoint.active = end_point.active
     endpoint.authKey = end_point.authKey
     endpoint.privKey = end_point.privKey
-
-    oids.sysDescr = end_point.sysDescr
-    oids.sysName = end_point.sysName
-    oids.sysUpTime = end_point.sysUpTime
-    oids.hrProcessorLoad = end_point.hrProcessorLoad
-    oids.memTotalReal = end_point.memTotalReal
-    oids.memAvailReal = end_point.memAvailReal
-    oids.hrStorageSize = end_point.hrStorageSize
-    oids.hrStorageUsed = end_point.hrStorageUsed
-    oids.hrStorageDescr = end_point.hrStorageDescr
-
-    session.commit()
+    endpoint.id_oid_profile = profile.id
+
+    overrides = diff_overrides(profile, _requested_oids(end_point))
+    if overrides:
+        if not oids:
+            oids = EndPointOIDOverrides(endpoint.id)
+            session.add(oids)
+        for field in OID_FIELDS:
+            setattr(oids, field, overrides.get(field))
+    elif oids:
+        await session.delete(oids)
+
+    await session.commit()
     return {"success": True, "message": f"Endereço IP {endpoint.ip} atualizado na lista de monitoramento."}
 
 
@@ -280,16 +424,16 @@ async def update_ip_info(
 async def delete_ip(
     ip: str,
     logged_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)) -> dict:
+    session: AsyncSession = Depends(init_session)) -> dict:
     """
     Remove um endereço IP da lista de monitoramento.
     """
     _check_admin(logged_user)
-    endpoint = _get_endpoint_by_ip(ip, session)
+    endpoint = await _get_endpoint_by_ip(ip, session)
     if not endpoint:
         raise HTTPException(status_code=404, detail="IP/Domínio não encontrado")
-    session.delete(endpoint)
-    session.commit()
+    await session.delete(endpoint)
+    await session.commit()
     return {"success": True, "message": f"Endereço IP {ip} removido da lista de monitoramento."}
 
 
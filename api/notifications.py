@@ -0,0 +1,739 @@
+import os
+import ssl
+import time
+import random
+import asyncio
+import smtplib
+from collections import deque
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional, Tuple
+import aiohttp
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import Alerts, EmailConfig, Users, WebHookConfig
+from api.cache import stats_cache
+
+
+
+# Alertas carregados por consulta ao montar as notificações
+NOTIFY_LOAD_CHUNK_SIZE = 500
+
+
+class WebhookTarget:
+    """Dados de um webhook ativo necessários para a entrega (sem depender da sessão)."""
+
+    def __init__(self, id: int, url: str, timeout: Optional[int], access_token: Optional[str],
+                 batch_size: int = 1, batch_wait_ms: int = 1000, max_concurrency: Optional[int] = None,
+                 rate_limit: Optional[float] = None, rate_burst: Optional[int] = None):
+        self.id = id
+        self.url = url
+        self.timeout = timeout or 30
+        self.access_token = access_token
+        self.batch_size = batch_size or 1
+        self.batch_wait_ms = batch_wait_ms if batch_wait_ms is not None else 1000
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst or max(1, int(rate_limit or 1))
+
+
+class TokenBucket:
+    """Limitador de taxa: rate fichas por segundo, acumulando no máximo burst."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consome uma ficha. Returns: 0 se havia ficha, senão os segundos até a próxima."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class DeliveryError(Exception):
+    """Falha na entrega; retryable indica se vale tentar novamente e retry_after (s), quando informar."""
+
+    def __init__(self, message: str, retryable: bool, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class WebhookDelivery:
+    """
+    Uma notificação a ser entregue a um webhook, com o número de tentativas já feitas.
+    done (opcional) é resolvido ao final: None se entregue, DeliveryError caso contrário.
+    """
+
+    def __init__(self, target: WebhookTarget, payload: Any, done: Optional[asyncio.Future] = None):
+        self.target = target
+        self.payload = payload
+        self.done = done
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+
+    def finish(self, error: Optional[DeliveryError] = None):
+        if self.done is not None and not self.done.done():
+            self.done.set_result(error)
+
+
+class Destination:
+    """Estado de um webhook no despachante: lote em formação, requisições em andamento e taxa."""
+
+    def __init__(self, target: WebhookTarget):
+        self.buffer: List[Tuple[Any, Optional[asyncio.Future]]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.in_flight = 0
+        self.parked: deque = deque()
+        self.bucket: Optional[TokenBucket] = None
+        self.configure(target)
+
+    def configure(self, target: WebhookTarget):
+        """Atualiza os parâmetros (o webhook pode ter sido alterado em /config/webhook)."""
+        self.target = target
+        if not target.rate_limit:
+            self.bucket = None
+        elif self.bucket is None or (self.bucket.rate, self.bucket.burst) != (target.rate_limit, target.rate_burst):
+            self.bucket = TokenBucket(target.rate_limit, target.rate_burst)
+
+
+def _retry_after(headers) -> Optional[float]:
+    """Segundos do cabeçalho Retry-After (429/503), limitados a 5 minutos."""
+    try:
+        return min(300.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+class NotificationDispatcher:
+    """
+    Entrega notificações a webhooks fora do caminho das requisições.
+    - Fila asyncio limitada consumida por NOTIFY_WORKERS tarefas.
+    - Uma única aiohttp.ClientSession compartilhada (conexões keep-alive reutilizadas).
+    - Timeout por webhook (WebHookConfig.timeout) em cada tentativa.
+    - Falhas de rede, timeouts, 408, 429 e 5xx são repetidas com backoff exponencial
+      e jitter completo (espera aleatória entre 0 e min(max, base * 2^tentativa)).
+    - Por webhook (WebHookConfig): lote opcional (até batch_size alertas ou batch_wait_ms,
+      enviados como um array JSON em um único POST), limite de requisições simultâneas
+      (max_concurrency) e token bucket (rate_limit/rate_burst). Entregas acima do limite
+      aguardam fora dos workers, sem consumir tentativas. Os limites valem por processo.
+    Variáveis:
+        NOTIFY_WORKERS (int): Tarefas de entrega (padrão 8).
+        NOTIFY_QUEUE_SIZE (int): Capacidade da fila; notificações além disso são descartadas (padrão 10000).
+        NOTIFY_MAX_ATTEMPTS (int): Tentativas por entrega (padrão 5).
+        NOTIFY_BACKOFF_BASE (float): Base do backoff em segundos (padrão 0.5).
+        NOTIFY_BACKOFF_MAX (float): Espera máxima entre tentativas em segundos (padrão 30).
+        NOTIFY_MAX_CONNECTIONS (int): Conexões simultâneas do pool HTTP (padrão 100).
+    """
+
+    def __init__(self, workers: int, queue_size: int, max_attempts: int,
+                 backoff_base: float, backoff_max: float, max_connections: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_connections = max_connections
+        self.queue: Optional[asyncio.Queue] = None
+        self.client: Optional[aiohttp.ClientSession] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retry_handles: Dict[asyncio.TimerHandle, WebhookDelivery] = {}
+        self._destinations: Dict[int, Destination] = {}
+        self.counters = {
+            "enqueued": 0, "delivered": 0, "retried": 0, "failed": 0, "dropped": 0,
+            "batches": 0, "batched_items": 0, "rate_limited": 0, "concurrency_limited": 0,
+        }
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        """Cria a sessão HTTP compartilhada e inicia as tarefas de entrega."""
+        if self._tasks:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.client = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """
+        Encerra as tarefas de entrega, aguardando até drain_timeout segundos pela fila.
+        Args:
+            drain_timeout (float): Tempo máximo de espera pelas entregas pendentes.
+        """
+        if not self._tasks:
+            return
+        for destination in self._destinations.values():
+            self._flush_batch(destination)
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {self.queue.qsize()} notificações pendentes descartadas no encerramento")
+        shutdown = DeliveryError("Despachante encerrado", True)
+        for handle, delivery in self._retry_handles.items():
+            handle.cancel()
+            delivery.finish(shutdown)
+        self._retry_handles.clear()
+        while not self.queue.empty():
+            self.queue.get_nowait().finish(shutdown)
+            self.queue.task_done()
+        for destination in self._destinations.values():
+            while destination.parked:
+                destination.parked.popleft().finish(shutdown)
+        self._destinations.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.client.close()
+        self.client = None
+
+    def _put(self, delivery: WebhookDelivery) -> bool:
+        try:
+            self.queue.put_nowait(delivery)
+            return True
+        except asyncio.QueueFull:
+            self.counters["dropped"] += 1
+            delivery.finish(DeliveryError("Fila de notificações cheia", True))
+            return False
+
+    def enqueue(self, targets: List[WebhookTarget], payload: Any) -> int:
+        """
+        Enfileira um payload para cada webhook, sem aguardar a entrega.
+        Args:
+            targets (list): Webhooks de destino.
+            payload (Any): Corpo JSON da notificação.
+        Returns:
+            int: Quantidade de entregas enfileiradas.
+        """
+        if self.queue is None:
+            return 0
+        return sum(self._submit(target, payload, None) for target in targets)
+
+    def submit(self, targets: List[WebhookTarget], payload: Any) -> List[asyncio.Future]:
+        """
+        Como enqueue, mas retorna um futuro por webhook, resolvido ao fim da entrega
+        (None se entregue, DeliveryError se descartada).
+        Args:
+            targets (list): Webhooks de destino.
+            payload (Any): Corpo JSON da notificação.
+        Returns:
+            list: Futuros das entregas.
+        """
+        if self.queue is None:
+            return []
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in targets]
+        for target, future in zip(targets, futures):
+            self._submit(target, payload, future)
+        return futures
+
+    def _destination(self, target: WebhookTarget) -> Destination:
+        destination = self._destinations.get(target.id)
+        if destination is None:
+            destination = self._destinations[target.id] = Destination(target)
+        elif destination.target is not target:
+            destination.configure(target)
+        return destination
+
+    def _submit(self, target: WebhookTarget, payload: Any, done: Optional[asyncio.Future]) -> bool:
+        destination = self._destination(target)
+        if target.batch_size <= 1:
+            accepted = self._put(WebhookDelivery(target, payload, done))
+            self.counters["enqueued"] += accepted
+            return accepted
+        destination.buffer.append((payload, done))
+        if len(destination.buffer) >= target.batch_size:
+            self._flush_batch(destination)
+        elif destination.flush_handle is None:
+            destination.flush_handle = asyncio.get_running_loop().call_later(
+                target.batch_wait_ms / 1000, self._flush_batch, destination
+            )
+        return True
+
+    def _flush_batch(self, destination: Destination):
+        """Envia o lote em formação de um webhook como um único POST com um array JSON."""
+        if destination.flush_handle is not None:
+            destination.flush_handle.cancel()
+            destination.flush_handle = None
+        items, destination.buffer = destination.buffer, []
+        if not items:
+            return
+        waiters = [done for _, done in items if done is not None]
+        done = None
+        if waiters:
+            done = asyncio.get_running_loop().create_future()
+
+            def resolve(future: asyncio.Future):
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(future.result())
+
+            done.add_done_callback(resolve)
+        self.counters["batches"] += 1
+        self.counters["batched_items"] += len(items)
+        self.counters["enqueued"] += self._put(
+            WebhookDelivery(destination.target, [payload for payload, _ in items], done)
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes da próxima tentativa (jitter completo)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _send(self, delivery: WebhookDelivery):
+        target = delivery.target
+        headers = {"Authorization": f"Bearer {target.access_token}"} if target.access_token else None
+        try:
+            async with self.client.post(
+                target.url, json=delivery.payload, headers=headers,
+                timeout=aiohttp.ClientTimeout(total=target.timeout)
+            ) as response:
+                await response.read()
+                if response.status < 300:
+                    return
+                retryable = response.status in (408, 429) or response.status >= 500
+                raise DeliveryError(f"HTTP {response.status}", retryable, _retry_after(response.headers))
+        except asyncio.TimeoutError:
+            raise DeliveryError(f"Timeout após {target.timeout}s", True)
+        except aiohttp.ClientError as e:
+            raise DeliveryError(str(e) or type(e).__name__, True)
+
+    def _schedule_retry(self, delivery: WebhookDelivery, delay: float):
+        def requeue():
+            self._retry_handles.pop(handle, None)
+            self._put(delivery)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retry_handles[handle] = delivery
+
+    def _admit(self, delivery: WebhookDelivery) -> bool:
+        """Aplica os limites do webhook; entregas barradas aguardam fora da fila."""
+        destination = self._destinations.get(delivery.target.id)
+        if destination is None:
+            return True
+        limit = destination.target.max_concurrency
+        if limit and destination.in_flight >= limit:
+            # Volta para a fila quando uma requisição do mesmo webhook terminar
+            self.counters["concurrency_limited"] += 1
+            destination.parked.append(delivery)
+            return False
+        if destination.bucket is not None:
+            wait = destination.bucket.take()
+            if wait > 0:
+                self.counters["rate_limited"] += 1
+                self._schedule_retry(delivery, wait)
+                return False
+        destination.in_flight += 1
+        return True
+
+    def _release(self, delivery: WebhookDelivery):
+        destination = self._destinations.get(delivery.target.id)
+        if destination is None:
+            return
+        destination.in_flight -= 1
+        if destination.parked:
+            self._put(destination.parked.popleft())
+
+    async def _worker(self):
+        while True:
+            delivery = await self.queue.get()
+            if not self._admit(delivery):
+                self.queue.task_done()
+                continue
+            try:
+                delivery.attempts += 1
+                await self._send(delivery)
+                self.counters["delivered"] += 1
+                delivery.finish()
+            except DeliveryError as e:
+                self.last_error = f"{delivery.target.url}: {e}"
+                if e.retryable and delivery.attempts < self.max_attempts:
+                    self.counters["retried"] += 1
+                    self._schedule_retry(delivery, max(self.backoff(delivery.attempts), e.retry_after or 0))
+                else:
+                    self.counters["failed"] += 1
+                    print(f"⚠️ Notificação para {delivery.target.url} descartada após {delivery.attempts} tentativa(s): {e}")
+                    delivery.finish(DeliveryError(f"{delivery.target.url}: {e}", False))
+            except Exception as e:
+                # Erro inesperado (ex.: payload não serializável): não derruba a tarefa de entrega
+                self.counters["failed"] += 1
+                self.last_error = f"{delivery.target.url}: {e}"
+                print(f"⚠️ Notificação para {delivery.target.url} descartada: {e}")
+                delivery.finish(DeliveryError(f"{delivery.target.url}: {e}", False))
+            finally:
+                self._release(delivery)
+                self.queue.task_done()
+
+    def snapshot(self) -> dict:
+        return {
+            "running": bool(self._tasks),
+            "workers": self.workers,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "waiting_retry": len(self._retry_handles),
+            **self.counters,
+            "destinations": {
+                destination.target.id: {
+                    "buffered": len(destination.buffer),
+                    "in_flight": destination.in_flight,
+                    "waiting_concurrency": len(destination.parked),
+                    "tokens": round(destination.bucket.tokens, 2) if destination.bucket else None,
+                }
+                for destination in self._destinations.values()
+                if destination.target.batch_size > 1 or destination.target.max_concurrency or destination.bucket
+            },
+            "last_error": self.last_error,
+        }
+
+
+class SMTPSettings:
+    """Configuração SMTP ativa (EmailConfig) necessária para o envio."""
+
+    def __init__(self, server: str, port: int, email: str, password: Optional[str]):
+        self.server = server
+        self.port = port
+        self.email = email
+        self.password = password
+
+    @property
+    def key(self) -> Tuple:
+        return (self.server, self.port, self.email, self.password)
+
+
+def _smtp_retryable(error: Exception) -> bool:
+    """Falhas temporárias do SMTP: conexão, timeout e respostas 4xx."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, OSError))
+
+
+class EmailDigestChannel:
+    """
+    Envia alertas por email reaproveitando uma conexão SMTP autenticada.
+    - Alertas de uma janela de EMAIL_DIGEST_WINDOW segundos são agrupados: cada
+      destinatário recebe um único email (resumo) com todos os alertas da janela, ou
+      o email do alerta quando houver apenas um.
+    - Todos os emails de uma janela são enviados em sequência na mesma conexão, sem
+      novo login; a conexão é mantida entre janelas e testada (NOOP) quando ficou
+      ociosa por mais de SMTP_IDLE_TIMEOUT segundos, reconectando se o servidor a fechou.
+    - O smtplib é bloqueante: o envio roda em uma thread, um lote por vez.
+    - Cada evento tem o seu resultado, com as falhas dos emails que o incluíam; falhas de
+      conexão e respostas 4xx são temporárias (o evento volta para a fila), as demais não.
+    Variáveis:
+        EMAIL_DIGEST_WINDOW (float): Janela de agrupamento em segundos (padrão 30).
+        SMTP_IDLE_TIMEOUT (float): Ociosidade após a qual a conexão é testada (padrão 60).
+        SMTP_TIMEOUT (float): Timeout das operações SMTP em segundos (padrão 30).
+    """
+
+    def __init__(self, window: float, idle_timeout: float, timeout: float):
+        self.window = window
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.pending: Dict[str, List[Tuple[dict, asyncio.Future]]] = {}
+        self._waiters: set = set()
+        self._settings: Optional[SMTPSettings] = None
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_key: Optional[Tuple] = None
+        self._last_used = 0.0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flushing: set = set()
+        self._send_lock = asyncio.Lock()
+        self.running = False
+        self.counters = {"alerts": 0, "emails": 0, "digests": 0, "logins": 0, "failed": 0}
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        self.running = True
+
+    async def stop(self):
+        """Envia o que estiver pendente e fecha a conexão SMTP."""
+        self.running = False
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        await self.flush()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+        async with self._send_lock:
+            await asyncio.to_thread(self._close)
+
+    def add(self, settings: SMTPSettings, recipients: List[str], events: List[dict]) -> List[asyncio.Future]:
+        """
+        Acumula alertas para os destinatários; o envio ocorre ao fim da janela.
+        Args:
+            settings (SMTPSettings): Configuração SMTP ativa.
+            recipients (list): Emails dos destinatários.
+            events (list): Eventos de alerta (alert_event).
+        Returns:
+            list: Um futuro por evento, resolvido após o envio da janela (None, ou
+                DeliveryError se algum email com o evento falhou).
+        """
+        if not self.running or not recipients or not events:
+            return []
+        self._settings = settings
+        loop = asyncio.get_running_loop()
+        waiters = [loop.create_future() for _ in events]
+        for recipient in recipients:
+            self.pending.setdefault(recipient, []).extend(zip(events, waiters))
+        self.counters["alerts"] += len(events)
+        self._waiters.update(waiters)
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._schedule_flush)
+        return waiters
+
+    def is_waiting(self, future: asyncio.Future) -> bool:
+        """Se o futuro (retornado por add) aguarda o fim da janela atual."""
+        return future in self._waiters
+
+    def _schedule_flush(self):
+        self._flush_handle = None
+        task = asyncio.create_task(self.flush())
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def flush(self):
+        """Monta um email por destinatário com os alertas pendentes e envia todos."""
+        if not self.pending or self._settings is None:
+            return
+        pending, self.pending = self.pending, {}
+        waiters, self._waiters = self._waiters, set()
+        messages = [
+            (self._build_message(self._settings.email, recipient, [event for event, _ in entries]), len(entries) > 1)
+            for recipient, entries in pending.items()
+        ]
+        # Cada evento recebe apenas as falhas dos emails em que foi incluído
+        errors: Dict[asyncio.Future, List[DeliveryError]] = {waiter: [] for waiter in waiters}
+        try:
+            async with self._send_lock:
+                results = await asyncio.to_thread(self._send_all, self._settings, messages)
+            for entries, error in zip(pending.values(), results):
+                if error is not None:
+                    for _, waiter in entries:
+                        errors[waiter].append(error)
+        except Exception as e:
+            for waiter_errors in errors.values():
+                waiter_errors.append(DeliveryError(str(e), False))
+            raise
+        finally:
+            for waiter, waiter_errors in errors.items():
+                if not waiter.done():
+                    waiter.set_result(DeliveryError(
+                        "; ".join(str(error) for error in waiter_errors),
+                        all(error.retryable for error in waiter_errors)
+                    ) if waiter_errors else None)
+
+    @staticmethod
+    def _build_message(sender: str, recipient: str, events: List[dict]) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = sender
+        message["To"] = recipient
+        alerts = [event["alert"] for event in events]
+        if len(alerts) == 1:
+            alert = alerts[0]
+            message["Subject"] = f"[InfraWatch] Alerta {alert['severity']}: {alert['title']} ({alert['system']})"
+        else:
+            message["Subject"] = f"[InfraWatch] {len(alerts)} novos alertas"
+        lines = [
+            f"- [{alert['severity']}] {alert['title']} | {alert['system']} | {alert['created_at']}"
+            + (f"\n  {alert['description']}" if alert.get("description") else "")
+            for alert in alerts
+        ]
+        message.set_content("Alertas registrados pelo InfraWatch:\n\n" + "\n".join(lines) + "\n")
+        return message
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._smtp = None
+        self._smtp_key = None
+
+    def _connection(self, settings: SMTPSettings) -> smtplib.SMTP:
+        """Retorna a conexão autenticada, reabrindo-a se a configuração mudou ou caiu por ociosidade."""
+        if self._smtp is not None and self._smtp_key == settings.key:
+            if time.monotonic() - self._last_used < self.idle_timeout:
+                return self._smtp
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._close()
+
+        if settings.port == 465:
+            smtp = smtplib.SMTP_SSL(settings.server, settings.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(settings.server, settings.port, timeout=self.timeout)
+            smtp.ehlo()
+            if smtp.has_extn("starttls"):
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+        if settings.password and smtp.has_extn("auth"):
+            smtp.login(settings.email, settings.password)
+            self.counters["logins"] += 1
+        self._smtp = smtp
+        self._smtp_key = settings.key
+        return smtp
+
+    def _send_all(self, settings: SMTPSettings, messages: List[Tuple[EmailMessage, bool]]) -> List[Optional[DeliveryError]]:
+        """Envia os emails na conexão compartilhada. Returns: erro de cada email (None se enviado)."""
+        results = []
+        for message, is_digest in messages:
+            error = None
+            for attempt in (1, 2):
+                try:
+                    self._connection(settings).send_message(message)
+                    self._last_used = time.monotonic()
+                    self.counters["emails"] += 1
+                    if is_digest:
+                        self.counters["digests"] += 1
+                    break
+                except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                    # Servidor fechou a conexão ociosa: reconecta uma vez
+                    self._close()
+                    if attempt == 2:
+                        error = self._record_failure(message, e)
+                except (smtplib.SMTPException, OSError) as e:
+                    self._close()
+                    error = self._record_failure(message, e)
+                    break
+            results.append(error)
+        return results
+
+    def _record_failure(self, message: EmailMessage, error: Exception) -> DeliveryError:
+        self.counters["failed"] += 1
+        self.last_error = f"{message['To']}: {error}"
+        print(f"⚠️ Falha ao enviar email de alerta para {message['To']}: {error}")
+        return DeliveryError(self.last_error, _smtp_retryable(error))
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self.running,
+            "window_seconds": self.window,
+            "pending_recipients": len(self.pending),
+            "connected": self._smtp is not None,
+            **self.counters,
+            "last_error": self.last_error,
+        }
+
+
+async def get_active_webhooks(session: AsyncSession) -> List[WebhookTarget]:
+    """
+    Webhooks ativos, em cache até a próxima alteração em /config/webhook.
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+    Returns:
+        list: Webhooks de destino.
+    """
+    async def load():
+        webhooks = (await session.scalars(select(WebHookConfig).where(WebHookConfig.active.is_(True)))).all()
+        return [
+            WebhookTarget(w.id, w.url, w.timeout, w.access_token, w.batch_size, w.batch_wait_ms,
+                          w.max_concurrency, w.rate_limit, w.rate_burst)
+            for w in webhooks
+        ]
+
+    return await stats_cache.get_or_compute("webhooks", "active", load)
+
+
+async def get_email_settings(session: AsyncSession) -> Optional[SMTPSettings]:
+    """Configuração de email ativa mais recente, em cache até a próxima alteração em /config/email."""
+    async def load():
+        config = await session.scalar(
+            select(EmailConfig).where(EmailConfig.active.is_(True)).order_by(EmailConfig.id.desc()).limit(1)
+        )
+        return SMTPSettings(config.server, config.port, config.email, config.password) if config else None
+
+    return await stats_cache.get_or_compute("email", "active", load)
+
+
+async def get_alert_recipients(session: AsyncSession) -> List[str]:
+    """Emails dos usuários ativos que optaram por receber alertas (Users.alert)."""
+    async def load():
+        return list((await session.scalars(
+            select(Users.email).where(Users.state.is_(True), Users.alert.is_(True), Users.email.isnot(None))
+        )).all())
+
+    return await stats_cache.get_or_compute("users", "alert_recipients", load)
+
+
+def alert_event(event: str, alert: Alerts) -> dict:
+    """Payload enviado aos webhooks para um evento de alerta."""
+    return {
+        "event": event,
+        "sent_at": datetime.now().isoformat(),
+        "alert": {
+            "id": alert.id,
+            "title": alert.title,
+            "description": alert.description,
+            "severity": alert.severity,
+            "status": alert.status,
+            "category": alert.category,
+            "impact": alert.impact,
+            "system": alert.system,
+            "id_endpoint": alert.id_endpoint,
+            "occurrences": alert.occurrences,
+            "created_at": alert.created_at.isoformat() if alert.created_at else None,
+        },
+    }
+
+
+async def dispatch_alert_events(session: AsyncSession, events: List[Tuple[Any, int, str]]) -> Dict[Any, List[asyncio.Future]]:
+    """
+    Entrega eventos de alerta aos webhooks ativos e ao canal de email.
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+        events (list): Tuplas (chave, id do alerta, evento), ex.: linhas da notification_outbox.
+    Returns:
+        dict: Futuros das entregas por chave (None = entregue, DeliveryError = falha).
+            Chaves sem destino ou de alertas removidos ficam com a lista vazia.
+    """
+    futures: Dict[Any, List[asyncio.Future]] = {key: [] for key, _, _ in events}
+    targets = await get_active_webhooks(session) if notification_dispatcher.queue is not None else []
+    settings = await get_email_settings(session) if email_channel.running else None
+    recipients = await get_alert_recipients(session) if settings else []
+    if not targets and not recipients:
+        return futures
+
+    for offset in range(0, len(events), NOTIFY_LOAD_CHUNK_SIZE):
+        chunk = events[offset:offset + NOTIFY_LOAD_CHUNK_SIZE]
+        alerts = {
+            alert.id: alert
+            for alert in (await session.scalars(
+                select(Alerts).where(Alerts.id.in_({alert_id for _, alert_id, _ in chunk}))
+            )).all()
+        }
+        payloads = [(key, alert_event(event, alerts[alert_id])) for key, alert_id, event in chunk if alert_id in alerts]
+        for key, payload in payloads:
+            futures[key] += notification_dispatcher.submit(targets, payload)
+        if recipients and payloads:
+            waiters = email_channel.add(settings, recipients, [payload for _, payload in payloads])
+            for (key, _), waiter in zip(payloads, waiters):
+                futures[key].append(waiter)
+    return futures
+
+
+notification_dispatcher = NotificationDispatcher(
+    workers=int(os.getenv("NOTIFY_WORKERS", 8)),
+    queue_size=int(os.getenv("NOTIFY_QUEUE_SIZE", 10000)),
+    max_attempts=int(os.getenv("NOTIFY_MAX_ATTEMPTS", 5)),
+    backoff_base=float(os.getenv("NOTIFY_BACKOFF_BASE", 0.5)),
+    backoff_max=float(os.getenv("NOTIFY_BACKOFF_MAX", 30)),
+    max_connections=int(os.getenv("NOTIFY_MAX_CONNECTIONS", 100)),
+)
+
+email_channel = EmailDigestChannel(
+    window=float(os.getenv("EMAIL_DIGEST_WINDOW", 30)),
+    idle_timeout=float(os.getenv("SMTP_IDLE_TIMEOUT", 60)),
+    timeout=float(os.getenv("SMTP_TIMEOUT", 30)),
+)
@@ -0,0 +1,206 @@
+from dataclasses import dataclass, field as dataclass_field
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy.orm import Session
+from api.models import EndPoints, EndPointOIDOverrides, OIDProfiles
+
+
+
+# Ordem canônica das métricas coletadas via SNMP
+OID_FIELDS = (
+    "sysDescr", "sysName", "sysUpTime", "hrProcessorLoad",
+    "memTotalReal", "memAvailReal", "hrStorageSize", "hrStorageUsed",
+    "hrStorageDescr", "ifOperStatus", "ifInOctets", "ifOutOctets"
+)
+
+DEFAULT_OID_PROFILE = "linux-net-snmp"
+
+DEFAULT_OID_PROFILES = {
+    "linux-net-snmp": {
+        "description": "Servidores Linux com net-snmp (HOST-RESOURCES-MIB e UCD-SNMP-MIB)",
+        "sysDescr": "1.3.6.1.2.1.1.1.0",
+        "sysName": "1.3.6.1.2.1.1.5.0",
+        "sysUpTime": "1.3.6.1.2.1.1.3.0",
+        "hrProcessorLoad": "1.3.6.1.2.1.25.3.3.1.2",
+        "memTotalReal": "1.3.6.1.4.1.2021.4.5.0",
+        "memAvailReal": "1.3.6.1.4.1.2021.4.6.0",
+        "hrStorageSize": "1.3.6.1.2.1.25.2.3.1.5",
+        "hrStorageUsed": "1.3.6.1.2.1.25.2.3.1.6",
+        "hrStorageDescr": "1.3.6.1.2.1.25.2.3.1.3",
+        "ifOperStatus": "1.3.6.1.2.1.2.2.1.8",
+        "ifInOctets": "1.3.6.1.2.1.2.2.1.10",
+        "ifOutOctets": "1.3.6.1.2.1.2.2.1.16",
+    },
+    "cisco-ios": {
+        "description": "Roteadores e switches Cisco IOS (CISCO-PROCESS-MIB e IF-MIB)",
+        "sysDescr": "1.3.6.1.2.1.1.1.0",
+        "sysName": "1.3.6.1.2.1.1.5.0",
+        "sysUpTime": "1.3.6.1.2.1.1.3.0",
+        "hrProcessorLoad": "1.3.6.1.4.1.9.9.109.1.1.1.1.8",
+        "memTotalReal": None,
+        "memAvailReal": None,
+        "hrStorageSize": None,
+        "hrStorageUsed": None,
+        "hrStorageDescr": None,
+        "ifOperStatus": "1.3.6.1.2.1.2.2.1.8",
+        "ifInOctets": "1.3.6.1.2.1.31.1.1.1.6",
+        "ifOutOctets": "1.3.6.1.2.1.31.1.1.1.10",
+    },
+}
+
+
+@dataclass(frozen=True)
+class OIDRequestPlan:
+    """
+    Plano de requisições SNMP compilado a partir de um perfil e de seus overrides.
+    Instâncias são imutáveis e compartilhadas entre todos os endpoints com a mesma combinação.
+    """
+    profile_id: int
+    get_oids: Tuple[Tuple[str, str], ...]   # OIDs escalares (terminados em .0) -> GET
+    walk_oids: Tuple[Tuple[str, str], ...]  # OIDs de tabela -> WALK/BULKWALK
+    fields_by_oid: Dict[str, str] = dataclass_field(default_factory=dict, compare=False, hash=False)
+
+
+def profile_oids(profile: OIDProfiles) -> Tuple[Optional[str], ...]:
+    """Extrai os OIDs de um perfil na ordem de OID_FIELDS."""
+    return tuple(getattr(profile, field) for field in OID_FIELDS)
+
+
+def override_oids(overrides: Optional[EndPointOIDOverrides]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Extrai apenas os OIDs definidos em um registro de overrides.
+    Args:
+        overrides (EndPointOIDOverrides): Overrides do endpoint (ou None).
+    Returns:
+        tuple: Pares (métrica, OID) não nulos, em ordem canônica.
+    """
+    if overrides is None:
+        return ()
+    return tuple(
+        (field, getattr(overrides, field))
+        for field in OID_FIELDS
+        if getattr(overrides, field)
+    )
+
+
+@lru_cache(maxsize=1024)
+def compile_request_plan(profile_id: int, oids: Tuple[Optional[str], ...],
+                         overrides: Tuple[Tuple[str, str], ...] = ()) -> OIDRequestPlan:
+    """
+    Compila (uma única vez por combinação) o plano de requisições de um perfil.
+    Os OIDs do perfil fazem parte da chave do cache, então editar o perfil gera um
+    novo plano sem precisar invalidar nada manualmente.
+    Args:
+        profile_id (int): ID do perfil.
+        oids (tuple): OIDs do perfil na ordem de OID_FIELDS.
+        overrides (tuple): Pares (métrica, OID) que sobrescrevem o perfil.
+    Returns:
+        OIDRequestPlan: Plano compartilhado entre os endpoints.
+    """
+    resolved = dict(zip(OID_FIELDS, oids))
+    resolved.update(overrides)
+
+    get_oids = []
+    walk_oids = []
+    for field in OID_FIELDS:
+        oid = resolved.get(field)
+        if not oid:
+            continue
+        if oid.endswith(".0"):
+            get_oids.append((field, oid))
+        else:
+            walk_oids.append((field, oid))
+
+    return OIDRequestPlan(
+        profile_id=profile_id,
+        get_oids=tuple(get_oids),
+        walk_oids=tuple(walk_oids),
+        fields_by_oid={oid: field for field, oid in get_oids + walk_oids}
+    )
+
+
+def build_request_plan(profile: OIDProfiles, overrides: Optional[EndPointOIDOverrides] = None) -> OIDRequestPlan:
+    """
+    Retorna o plano de requisições de um endpoint a partir do seu perfil e overrides.
+    Args:
+        profile (OIDProfiles): Perfil referenciado pelo endpoint.
+        overrides (EndPointOIDOverrides): Overrides do endpoint (opcional).
+    Returns:
+        OIDRequestPlan: Plano compilado (em cache).
+    """
+    return compile_request_plan(profile.id, profile_oids(profile), override_oids(overrides))
+
+
+def load_request_plans(session: Session, endpoint_ids: Optional[Iterable[int]] = None) -> Dict[int, OIDRequestPlan]:
+    """
+    Carrega os planos de requisição dos endpoints ativos.
+    Faz apenas três consultas (endpoints, perfis e overrides), independente da quantidade de dispositivos.
+    Args:
+        session (Session): Sessão do SQLAlchemy.
+        endpoint_ids (Iterable[int]): Restringe a consulta a esses endpoints (opcional).
+    Returns:
+        dict: Plano de requisições indexado pelo ID do endpoint.
+    """
+    query = session.query(EndPoints.id, EndPoints.id_oid_profile).filter(
+        EndPoints.active.isnot(False),
+        EndPoints.id_oid_profile.isnot(None)
+    )
+    if endpoint_ids is not None:
+        query = query.filter(EndPoints.id.in_(list(endpoint_ids)))
+    endpoints = query.all()
+    if not endpoints:
+        return {}
+
+    profiles = {
+        profile.id: profile
+        for profile in session.query(OIDProfiles).filter(
+            OIDProfiles.id.in_({ep.id_oid_profile for ep in endpoints})
+        )
+    }
+    overrides = {
+        row.id_end_point: row
+        for row in session.query(EndPointOIDOverrides).filter(
+            EndPointOIDOverrides.id_end_point.in_([ep.id for ep in endpoints])
+        )
+    }
+
+    return {
+        ep.id: build_request_plan(profiles[ep.id_oid_profile], overrides.get(ep.id))
+        for ep in endpoints
+        if ep.id_oid_profile in profiles
+    }
+
+
+def get_or_create_profile(session: Session, name: str = DEFAULT_OID_PROFILE) -> Optional[OIDProfiles]:
+    """
+    Obtém um perfil pelo nome, criando-o a partir de DEFAULT_OID_PROFILES se necessário.
+    Args:
+        session (Session): Sessão do SQLAlchemy.
+        name (str): Nome do perfil.
+    Returns:
+        OIDProfiles: Perfil encontrado/criado, ou None se não existir e não for um perfil padrão.
+    """
+    profile = session.query(OIDProfiles).filter(OIDProfiles.name == name).one_or_none()
+    if profile or name not in DEFAULT_OID_PROFILES:
+        return profile
+
+    profile = OIDProfiles(name=name, **DEFAULT_OID_PROFILES[name])
+    session.add(profile)
+    session.flush()
+    return profile
+
+
+def diff_overrides(profile: OIDProfiles, requested: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """
+    Calcula quais OIDs informados diferem do perfil e precisam ser gravados como override.
+    Args:
+        profile (OIDProfiles): Perfil do endpoint.
+        requested (dict): OIDs informados na requisição, indexados pela métrica.
+    Returns:
+        dict: Apenas os OIDs que diferem do perfil.
+    """
+    return {
+        field: value
+        for field, value in requested.items()
+        if field in OID_FIELDS and value and value != getattr(profile, field)
+    }
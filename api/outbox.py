@@ -0,0 +1,307 @@
+import os
+import time
+import socket
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import NotificationOutbox
+from api.notifications import dispatch_alert_events, email_channel
+
+
+
+# Janela (segundos) usada no cálculo da vazão recente
+THROUGHPUT_WINDOW = 60
+
+
+class OutboxRelay:
+    """
+    Entrega os eventos da tabela notification_outbox com garantia at-least-once.
+    - record_alerts grava os eventos na mesma transação dos alertas; quem faz o commit
+      chama wake() e o relay reivindica os eventos em lotes de OUTBOX_BATCH_SIZE.
+    - Reivindicação: UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) no
+      PostgreSQL, de modo que vários workers e processos drenam a fila sem disputar as
+      mesmas linhas; no SQLite (um escritor por vez) o mesmo UPDATE é atômico e as colunas
+      status/claimed_by marcam o dono do lote.
+    - A linha só é removida quando todas as entregas do evento terminaram. Se o processo
+      cair antes, a reivindicação expira após OUTBOX_CLAIM_TIMEOUT segundos e o evento é
+      entregue de novo (pode haver duplicatas, nunca perda).
+    - Entregas que esgotaram as tentativas deixam a linha com status failed; entregas não
+      tentadas (fila cheia, encerramento) devolvem a linha para pending.
+    Variáveis:
+        OUTBOX_WORKERS (int): Tarefas de reivindicação por processo (padrão 2).
+        OUTBOX_BATCH_SIZE (int): Eventos por lote (padrão 200).
+        OUTBOX_MAX_INFLIGHT (int): Lotes em entrega simultaneamente por processo (padrão 8).
+        OUTBOX_POLL_INTERVAL (float): Espera máxima entre consultas sem wake() (padrão 2).
+        OUTBOX_CLAIM_TIMEOUT (float): Validade de uma reivindicação em segundos (padrão 300).
+    """
+
+    def __init__(self, workers: int, batch_size: int, max_inflight: int,
+                 poll_interval: float, claim_timeout: float):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_inflight = max_inflight
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.session_factory = None
+        self._wake: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self._inflight: set = set()
+        self._completed = deque()
+        self.counters = {"batches": 0, "claimed": 0, "reclaimed": 0, "delivered": 0, "failed": 0, "released": 0}
+        self.last_error: Optional[str] = None
+
+    def start(self, session_factory):
+        """Inicia as tarefas de reivindicação (uma vez por processo)."""
+        if self._tasks:
+            return
+        self.session_factory = session_factory
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self.wake()
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """
+        Para de reivindicar, aguarda os lotes em entrega até drain_timeout segundos e
+        devolve para pending as linhas ainda reivindicadas por este processo.
+        Args:
+            drain_timeout (float): Tempo máximo de espera pelos lotes em entrega.
+        """
+        if not self._tasks:
+            return
+        # Os workers saem entre um lote e outro; cancelar no meio de um comando
+        # pode deixar a conexão (a única de escrita, no SQLite) presa
+        self._stopping = True
+        self.wake()
+        _, pending = await asyncio.wait(self._tasks, timeout=drain_timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Emails aguardando a janela de resumo são enviados agora
+        await email_channel.flush()
+        if self._inflight:
+            _, pending = await asyncio.wait(self._inflight, timeout=drain_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        try:
+            async with self.session_factory() as session:
+                await self._release(session, NotificationOutbox.claimed_by == self.owner)
+                await session.commit()
+        except Exception as e:
+            print(f"⚠️ Falha ao liberar eventos da outbox no encerramento: {e}")
+
+    def wake(self):
+        """Avisa que há eventos novos (chamado após o commit que os gravou)."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def claim(self, session: AsyncSession, limit: int) -> list:
+        """
+        Reivindica até limit eventos pendentes (ou com reivindicação expirada) e faz commit.
+        Args:
+            session (AsyncSession): Sessão assíncrona.
+            limit (int): Máximo de eventos.
+        Returns:
+            list: Linhas (id, id_alert, event, attempts) reivindicadas.
+        """
+        now = datetime.now()
+        candidates = (
+            select(NotificationOutbox.id)
+            .where(or_(
+                NotificationOutbox.status == "pending",
+                and_(NotificationOutbox.status == "claimed",
+                     NotificationOutbox.claimed_at < now - timedelta(seconds=self.claim_timeout)),
+            ))
+            .order_by(NotificationOutbox.id)
+            .limit(limit)
+            # PostgreSQL: linhas travadas por outro worker são puladas (ignorado no SQLite)
+            .with_for_update(skip_locked=True)
+        )
+        rows = (await session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(candidates))
+            .values(status="claimed", claimed_by=self.owner, claimed_at=now,
+                    attempts=NotificationOutbox.attempts + 1)
+            .returning(NotificationOutbox.id, NotificationOutbox.id_alert,
+                       NotificationOutbox.event, NotificationOutbox.attempts),
+            execution_options={"synchronize_session": False}
+        )).all()
+        await session.commit()
+        return sorted(rows, key=lambda row: row.id)
+
+    async def _release(self, session: AsyncSession, condition, error: Optional[str] = None):
+        await session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.status == "claimed", condition)
+            .values(status="pending", claimed_by=None, claimed_at=None, last_error=error),
+            execution_options={"synchronize_session": False}
+        )
+
+    async def _release_rows(self, row_ids: List[int], error: str):
+        try:
+            async with self.session_factory() as session:
+                await self._release(session, NotificationOutbox.id.in_(row_ids), error[:2000])
+                await session.commit()
+        except Exception as e:
+            # Continuam reivindicadas até a reivindicação expirar
+            print(f"⚠️ Falha ao devolver eventos da outbox: {e}")
+
+    async def _worker(self):
+        while not self._stopping:
+            await self._slots.acquire()
+            if self._stopping:
+                self._slots.release()
+                break
+            rows = []
+            try:
+                async with self.session_factory() as session:
+                    rows = await self.claim(session, self.batch_size)
+                if rows:
+                    # Sessão nova: a leitura dos alertas não prende a conexão de escrita
+                    async with self.session_factory() as session:
+                        futures = await dispatch_alert_events(
+                            session, [(row.id, row.id_alert, row.event) for row in rows]
+                        )
+            except asyncio.CancelledError:
+                self._slots.release()
+                raise
+            except Exception as e:
+                self._slots.release()
+                self.last_error = str(e)
+                print(f"⚠️ Falha ao entregar eventos da outbox: {e}")
+                if rows:
+                    await self._release_rows([row.id for row in rows], str(e))
+                if not self._stopping:
+                    await asyncio.sleep(self.poll_interval)
+                continue
+
+            if not rows:
+                self._slots.release()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                if not self._stopping:
+                    self._wake.clear()
+                continue
+
+            self.counters["batches"] += 1
+            self.counters["claimed"] += len(rows)
+            self.counters["reclaimed"] += sum(1 for row in rows if row.attempts > 1)
+            task = asyncio.create_task(self._complete(futures))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _complete(self, futures: Dict[int, List[asyncio.Future]]):
+        """Aguarda as entregas de um lote e remove, marca como failed ou devolve cada linha."""
+        holding_slot = True
+        try:
+            # O lote libera a vaga quando os webhooks terminam; aguardar a janela de resumo
+            # do email com a vaga presa limitaria a vazão a OUTBOX_MAX_INFLIGHT lotes por janela
+            webhooks = [
+                future for row_futures in futures.values() for future in row_futures
+                if not email_channel.is_waiting(future)
+            ]
+            await asyncio.gather(*webhooks)
+            self._slots.release()
+            holding_slot = False
+
+            delivered, failed, released = [], {}, {}
+            for row_id, row_futures in futures.items():
+                errors = [error for error in await asyncio.gather(*row_futures) if error is not None]
+                if not errors:
+                    delivered.append(row_id)
+                elif any(not error.retryable for error in errors):
+                    failed[row_id] = "; ".join(str(error) for error in errors)
+                else:
+                    released[row_id] = "; ".join(str(error) for error in errors)
+
+            async with self.session_factory() as session:
+                if delivered:
+                    await session.execute(
+                        delete(NotificationOutbox).where(NotificationOutbox.id.in_(delivered)),
+                        execution_options={"synchronize_session": False}
+                    )
+                for row_id, error in failed.items():
+                    await session.execute(
+                        update(NotificationOutbox).where(NotificationOutbox.id == row_id)
+                        .values(status="failed", last_error=error[:2000]),
+                        execution_options={"synchronize_session": False}
+                    )
+                for row_id, error in released.items():
+                    await self._release(session, NotificationOutbox.id == row_id, error[:2000])
+                await session.commit()
+
+            self.counters["delivered"] += len(delivered)
+            self.counters["failed"] += len(failed)
+            self.counters["released"] += len(released)
+            self._completed.append((time.monotonic(), len(delivered)))
+            if failed or released:
+                self.last_error = next(iter({**failed, **released}.values()))
+        except Exception as e:
+            # As linhas continuam reivindicadas e voltam a ser entregues quando a reivindicação expirar
+            self.last_error = str(e)
+            print(f"⚠️ Falha ao concluir lote da outbox: {e}")
+        finally:
+            if holding_slot:
+                self._slots.release()
+
+    def throughput(self) -> float:
+        """Eventos entregues por segundo nos últimos THROUGHPUT_WINDOW segundos."""
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW
+        while self._completed and self._completed[0][0] < cutoff:
+            self._completed.popleft()
+        return round(sum(count for _, count in self._completed) / THROUGHPUT_WINDOW, 2)
+
+    def snapshot(self) -> dict:
+        return {
+            "running": bool(self._tasks),
+            "owner": self.owner,
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "inflight_batches": len(self._inflight),
+            "delivered_per_second": self.throughput(),
+            **self.counters,
+            "last_error": self.last_error,
+        }
+
+
+async def outbox_status(session: AsyncSession) -> dict:
+    """
+    Situação da notification_outbox no banco (todos os processos).
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+    Returns:
+        dict: Linhas por status e idade (segundos) do evento pendente mais antigo.
+    """
+    counts = dict((await session.execute(
+        select(NotificationOutbox.status, func.count()).group_by(NotificationOutbox.status)
+    )).all())
+    oldest = await session.scalar(
+        select(func.min(NotificationOutbox.created_at)).where(NotificationOutbox.status != "failed")
+    )
+    return {
+        "pending": counts.get("pending", 0),
+        "claimed": counts.get("claimed", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_age_seconds": round((datetime.now() - oldest).total_seconds(), 1) if oldest else None,
+    }
+
+
+outbox_relay = OutboxRelay(
+    workers=int(os.getenv("OUTBOX_WORKERS", 2)),
+    batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", 200)),
+    max_inflight=int(os.getenv("OUTBOX_MAX_INFLIGHT", 8)),
+    poll_interval=float(os.getenv("OUTBOX_POLL_INTERVAL", 2)),
+    claim_timeout=float(os.getenv("OUTBOX_CLAIM_TIMEOUT", 300)),
+)
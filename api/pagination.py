@@ -0,0 +1,149 @@
+import json
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Select, func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.cache import stats_cache
+
+
+
+# Modos de contagem aceitos pelas listagens paginadas
+COUNT_MODES = ("exact", "estimated", "none")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Codifica os valores da chave de ordenação da última linha em um cursor opaco.
+    Args:
+        values (Sequence): Valores de (coluna de ordenação, id).
+    Returns:
+        str: Cursor em base64 url-safe.
+    """
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: Optional[int]) -> List[Any]:
+    """
+    Decodifica um cursor gerado por encode_cursor.
+    Args:
+        cursor (str): Cursor recebido na requisição.
+        size (int): Quantidade de valores esperada (None = qualquer quantidade).
+    Raises:
+        HTTPException: Se o cursor for inválido.
+    Returns:
+        list: Valores da chave de ordenação.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if size is not None and len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+
+def _keyset_name(columns: Tuple) -> str:
+    """Nome da chave de ordenação gravado no cursor (ex.: "created_at,id")."""
+    return ",".join(column.key for column in columns)
+
+
+def apply_keyset(query: Select, columns: Tuple, descending: bool, cursor: Optional[str]) -> Select:
+    """
+    Ordena a consulta pela chave (coluna de ordenação, id) e, se houver cursor,
+    retorna apenas as linhas posteriores a ele. As colunas da chave não podem ser nulas.
+    Args:
+        query (Select): Consulta com os filtros já aplicados.
+        columns (tuple): Colunas da chave, terminando pelo id (desempate).
+        descending (bool): Ordem decrescente.
+        cursor (str): Cursor da página anterior (opcional).
+    Raises:
+        HTTPException: Se o cursor for inválido ou de outra chave de ordenação.
+    Returns:
+        Select: Consulta ordenada e filtrada pelo cursor.
+    """
+    if cursor:
+        *values, name = decode_cursor(cursor, None) or [None]
+        # Valores de outra chave teriam outro tipo (texto x data) e quebrariam a comparação
+        if name != _keyset_name(columns):
+            raise HTTPException(status_code=400, detail="Cursor gerado para outra ordenação")
+        if len(values) != len(columns):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        key = tuple_(*columns)
+        query = query.where(key < tuple_(*values) if descending else key > tuple_(*values))
+    return query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+
+
+def next_cursor(rows: Sequence[Any], columns: Tuple, size: int) -> Optional[str]:
+    """
+    Gera o cursor da próxima página, com os valores e o nome da chave de ordenação.
+    A consulta deve ter buscado size + 1 linhas: a linha extra indica que existe uma
+    próxima página.
+    Args:
+        rows (Sequence): Linhas retornadas (até size + 1).
+        columns (tuple): Colunas da chave usadas em apply_keyset.
+        size (int): Tamanho da página.
+    Returns:
+        str: Cursor da próxima página, ou None se esta for a última.
+    """
+    if len(rows) <= size:
+        return None
+    last = rows[size - 1]
+    return encode_cursor([*(getattr(last, column.key) for column in columns), _keyset_name(columns)])
+
+
+async def count_rows(session: AsyncSession, query: Select, mode: str, namespace: str,
+                     cache_key: Any, filtered: bool) -> Tuple[Optional[int], bool]:
+    """
+    Conta o total de linhas de uma listagem conforme o modo pedido.
+    - exact: COUNT(*) da consulta filtrada.
+    - estimated: no PostgreSQL sem filtros usa pg_class.reltuples (instantâneo); nos
+      demais casos usa a contagem exata em cache, invalidada pelas rotas de escrita.
+    - none: não conta.
+    Args:
+        session (AsyncSession): Sessão assíncrona.
+        query (Select): Consulta filtrada (sem ordenação/paginação).
+        mode (str): "exact", "estimated" ou "none".
+        namespace (str): Namespace do stats_cache invalidado pelas escritas dessa tabela.
+        cache_key (Any): Chave da contagem em cache (ex.: filtros normalizados).
+        filtered (bool): Se a consulta possui filtros.
+    Raises:
+        HTTPException: Se o modo for inválido.
+    Returns:
+        tuple: (total ou None, se o total é uma estimativa).
+    """
+    if mode not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo de contagem inválido. Use: {', '.join(COUNT_MODES)}")
+    if mode == "none":
+        return None, False
+
+    count_query = select(func.count()).select_from(query.subquery())
+    if mode == "exact":
+        return await session.scalar(count_query), False
+
+    connection = await session.connection()
+    if connection.dialect.name == "postgresql" and not filtered:
+        table = query.get_final_froms()[0]
+        estimate = await session.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": table.name}
+        )
+        # reltuples é -1 em tabelas que ainda não foram analisadas
+        if estimate is not None and estimate >= 0:
+            return int(estimate), True
+
+    total = await stats_cache.get_or_compute(
+        namespace, ("count", cache_key), lambda: session.scalar(count_query)
+    )
+    return total, True
@@ -0,0 +1,394 @@
+import os
+import json
+import time
+import asyncio
+import operator
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import AlertRules, EndPoints, EndPointsData
+from api.alert_dedup import record_alerts
+from api.outbox import outbox_relay
+from api.cache import stats_cache
+from api.events import publish_recorded_alerts
+
+
+
+# Colunas de EndPointsData lidas pelo motor, na ordem usada para montar a matriz
+SAMPLE_COLUMNS = (
+    EndPointsData.status, EndPointsData.hrProcessorLoad, EndPointsData.memTotalReal,
+    EndPointsData.memAvailReal, EndPointsData.hrStorageSize, EndPointsData.hrStorageUsed,
+    EndPointsData.ifOperStatus, EndPointsData.ping_rtt, EndPointsData.snmp_rtt,
+    EndPointsData.last_updated,
+)
+_RAW = {column.key: index for index, column in enumerate(SAMPLE_COLUMNS)}
+
+# Métricas disponíveis nas condições das regras
+METRICS = ("status", "cpu", "memory", "storage", "if_oper_status", "ping_rtt", "snmp_rtt", "age_seconds")
+
+# Operadores de comparação aceitos em {"metric": ..., "operator": ..., "value": ...}
+OPERATORS: Dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Impacto dos alertas gerados conforme a severidade da regra
+SEVERITY_IMPACT = {"critical": "high", "high": "high", "medium": "medium", "low": "low"}
+
+Predicate = Callable[["MetricsBatch"], np.ndarray]
+
+
+class RuleCompileError(ValueError):
+    """Condição de regra inválida."""
+
+
+def _to_float(value: Any) -> float:
+    """Converte um valor coletado (texto, bool ou None) em float; inválidos viram NaN."""
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class MetricsBatch:
+    """
+    Últimas métricas de todos os endpoints ativos, uma posição por endpoint.
+    Cada métrica é um vetor float64; valores ausentes ou inválidos são NaN e nunca
+    satisfazem uma comparação.
+    """
+
+    def __init__(self, endpoint_ids: np.ndarray, systems: List[str], raw: np.ndarray, now: float):
+        self.endpoint_ids = endpoint_ids
+        self.systems = systems
+        self.size = len(endpoint_ids)
+
+        def column(name: str) -> np.ndarray:
+            return raw[:, _RAW[name]]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.metrics: Dict[str, np.ndarray] = {
+                "status": column("status"),
+                "cpu": column("hrProcessorLoad"),
+                "memory": (1 - column("memAvailReal") / column("memTotalReal")) * 100,
+                "storage": column("hrStorageUsed") / column("hrStorageSize") * 100,
+                "if_oper_status": column("ifOperStatus"),
+                "ping_rtt": column("ping_rtt"),
+                "snmp_rtt": column("snmp_rtt"),
+                "age_seconds": now - column("last_updated"),
+            }
+        for name, values in self.metrics.items():
+            values[~np.isfinite(values)] = np.nan
+        self.valid = {name: ~np.isnan(values) for name, values in self.metrics.items()}
+
+
+def _compile_node(node: Any, metrics: Set[str]) -> Predicate:
+    """Compila recursivamente um nó da condição em um predicado vetorizado."""
+    if not isinstance(node, dict):
+        raise RuleCompileError("Cada condição deve ser um objeto JSON")
+
+    for key, combine in (("all", np.logical_and), ("any", np.logical_or)):
+        if key in node:
+            children = node[key]
+            if not isinstance(children, list) or not children:
+                raise RuleCompileError(f"'{key}' deve ser uma lista não vazia de condições")
+            predicates = [_compile_node(child, metrics) for child in children]
+            if len(predicates) == 1:
+                return predicates[0]
+            return lambda batch, predicates=predicates, combine=combine: combine.reduce(
+                [predicate(batch) for predicate in predicates]
+            )
+
+    if "not" in node:
+        predicate = _compile_node(node["not"], metrics)
+        return lambda batch: ~predicate(batch)
+
+    metric = node.get("metric")
+    if metric not in METRICS:
+        raise RuleCompileError(f"Métrica inválida: {metric}. Use: {', '.join(METRICS)}")
+    compare = OPERATORS.get(node.get("operator"))
+    if compare is None:
+        raise RuleCompileError(f"Operador inválido: {node.get('operator')}. Use: {', '.join(OPERATORS)}")
+    value = node.get("value")
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RuleCompileError(f"Valor da métrica {metric} deve ser numérico")
+
+    metrics.add(metric)
+    threshold = float(value)
+    return lambda batch: compare(batch.metrics[metric], threshold) & batch.valid[metric]
+
+
+class CompiledRule:
+    """
+    Regra ativa com a condição já compilada.
+    Formato da condição (AlertRules.condition):
+        {"metric": "cpu", "operator": ">=", "value": 90}
+        {"all": [cond, ...]}, {"any": [cond, ...]}, {"not": cond}
+    Métricas: status (1 = up), cpu, memory e storage (%), if_oper_status,
+    ping_rtt e snmp_rtt (ms), age_seconds (tempo desde a última coleta).
+    """
+
+    def __init__(self, rule: AlertRules):
+        self.id = rule.id
+        self.name = rule.name
+        self.description = rule.description
+        self.severity = rule.severity
+        self.category = rule.category
+        self.id_user_created = rule.id_user_created
+        self.updated_at = rule.updated_at
+        try:
+            condition = json.loads(rule.condition)
+        except (TypeError, ValueError) as e:
+            raise RuleCompileError(f"JSON inválido: {e}")
+        self.metrics: Set[str] = set()
+        self.predicate = _compile_node(condition, self.metrics)
+
+
+class AlertRuleEngine:
+    """
+    Avalia periodicamente as regras ativas (AlertRules) sobre a última coleta de cada
+    endpoint e cria alertas para as violações novas.
+    - As regras são compiladas uma vez e recompiladas apenas quando updated_at muda.
+    - As últimas amostras ficam em memória: a cada ciclo são lidos apenas os
+      EndPointsData com id acima do último já processado.
+    - Cada regra é avaliada de uma vez sobre todos os endpoints (vetores NumPy).
+    - Só as violações novas (ausentes no ciclo anterior) são registradas, como
+      ocorrências deduplicadas por fingerprint (api/alert_dedup.py): com um alerta
+      aberto para o mesmo endpoint/categoria/regra, apenas o contador é incrementado.
+    Variáveis:
+        RULE_ENGINE_INTERVAL (float): Intervalo entre ciclos em segundos (padrão 0 = desativado).
+    """
+
+    def __init__(self):
+        self.rules: Dict[int, CompiledRule] = {}
+        self.errors: Dict[int, str] = {}
+        self._error_versions: Dict[int, Any] = {}
+        self._samples: Dict[int, Tuple[float, ...]] = {}
+        self._last_data_id = 0
+        self._violating: Dict[int, np.ndarray] = {}
+        self.cycles = 0
+        self.alerts_created = 0
+        self.last_cycle: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def sync_rules(self, session: AsyncSession):
+        """Recompila apenas as regras novas ou alteradas e descarta as removidas/inativas."""
+        versions = dict((await session.execute(
+            select(AlertRules.id, AlertRules.updated_at).where(AlertRules.is_active.is_(True))
+        )).all())
+
+        for rule_id in set(self.rules) - set(versions):
+            del self.rules[rule_id]
+            self._violating.pop(rule_id, None)
+        for rule_id in set(self.errors) - set(versions):
+            del self.errors[rule_id]
+            del self._error_versions[rule_id]
+
+        changed = [
+            rule_id for rule_id, updated_at in versions.items()
+            if (rule_id not in self.rules or self.rules[rule_id].updated_at != updated_at)
+            and self._error_versions.get(rule_id, object()) != updated_at
+        ]
+        if not changed:
+            return
+        for rule in (await session.scalars(select(AlertRules).where(AlertRules.id.in_(changed)))).all():
+            self._violating.pop(rule.id, None)
+            try:
+                self.rules[rule.id] = CompiledRule(rule)
+                self.errors.pop(rule.id, None)
+                self._error_versions.pop(rule.id, None)
+            except RuleCompileError as e:
+                self.rules.pop(rule.id, None)
+                self.errors[rule.id] = str(e)
+                self._error_versions[rule.id] = rule.updated_at
+                print(f"⚠️ Regra de alerta {rule.id} ({rule.name}) ignorada: {e}")
+
+    async def load_batch(self, session: AsyncSession) -> MetricsBatch:
+        """Atualiza as amostras em memória e monta o lote com os endpoints ativos."""
+        if self._last_data_id == 0:
+            # Primeira carga: apenas a última coleta de cada endpoint
+            latest = select(func.max(EndPointsData.id)).group_by(EndPointsData.id_end_point)
+            query = select(EndPointsData.id, EndPointsData.id_end_point, *SAMPLE_COLUMNS).where(
+                EndPointsData.id.in_(latest)
+            )
+        else:
+            query = select(EndPointsData.id, EndPointsData.id_end_point, *SAMPLE_COLUMNS).where(
+                EndPointsData.id > self._last_data_id
+            )
+
+        for row in (await session.execute(query.order_by(EndPointsData.id))).all():
+            data_id, endpoint_id, *values = row
+            last_updated = values[-1]
+            values[-1] = last_updated.timestamp() if last_updated else None
+            self._samples[endpoint_id] = tuple(_to_float(value) for value in values)
+            self._last_data_id = max(self._last_data_id, data_id)
+
+        endpoints = (await session.execute(
+            select(EndPoints.id, EndPoints.nickname, EndPoints.ip)
+            .where(EndPoints.active.is_(True))
+            .order_by(EndPoints.id)
+        )).all()
+        endpoints = [endpoint for endpoint in endpoints if endpoint.id in self._samples]
+        raw = np.array([self._samples[endpoint.id] for endpoint in endpoints], dtype=np.float64)
+        return MetricsBatch(
+            np.array([endpoint.id for endpoint in endpoints], dtype=np.int64),
+            [endpoint.nickname or endpoint.ip for endpoint in endpoints],
+            raw.reshape(len(endpoints), len(SAMPLE_COLUMNS)),
+            time.time()
+        )
+
+    def evaluate(self, batch: MetricsBatch) -> List[Tuple[CompiledRule, np.ndarray]]:
+        """
+        Avalia todas as regras compiladas sobre o lote.
+        Args:
+            batch (MetricsBatch): Últimas métricas dos endpoints.
+        Returns:
+            list: (regra, índices dos endpoints em violação) para as regras violadas.
+        """
+        violations = []
+        if not batch.size:
+            return violations
+        for rule in self.rules.values():
+            indexes = np.flatnonzero(rule.predicate(batch))
+            if indexes.size:
+                violations.append((rule, indexes))
+        return violations
+
+    def new_violations(self, batch: MetricsBatch,
+                       violations: List[Tuple[CompiledRule, np.ndarray]]) -> List[Tuple[CompiledRule, np.ndarray]]:
+        """
+        Mantém apenas as violações que não existiam no ciclo anterior.
+        Args:
+            batch (MetricsBatch): Lote avaliado (endpoint_ids em ordem crescente).
+            violations (list): Resultado de evaluate.
+        Returns:
+            list: (regra, índices dos endpoints com violação nova).
+        """
+        new = []
+        for rule, indexes in violations:
+            previous = self._violating.get(rule.id)
+            if previous is None:
+                new.append((rule, indexes))
+                continue
+            started = np.setdiff1d(batch.endpoint_ids[indexes], previous, assume_unique=True)
+            if started.size:
+                new.append((rule, np.searchsorted(batch.endpoint_ids, started)))
+        return new
+
+    async def create_alerts(self, session: AsyncSession, batch: MetricsBatch,
+                            violations: List[Tuple[CompiledRule, np.ndarray]]) -> Dict[str, int]:
+        """
+        Registra as violações como ocorrências de alerta (deduplicadas por fingerprint).
+        Returns:
+            dict: Quantidade de alertas criados, reabertos e repetidos.
+        """
+        rows = []
+        for rule, indexes in violations:
+            for index in indexes:
+                measured = ", ".join(
+                    f"{metric}={batch.metrics[metric][index]:.1f}" for metric in sorted(rule.metrics)
+                )
+                rows.append({
+                    "title": rule.name,
+                    "description": f"{rule.description or f'Regra {rule.name} violada'} ({measured})",
+                    "severity": rule.severity,
+                    "category": rule.category,
+                    "impact": SEVERITY_IMPACT.get(rule.severity, "medium"),
+                    "system": batch.systems[index],
+                    "id_endpoint": int(batch.endpoint_ids[index]),
+                    "id_user_created": rule.id_user_created,
+                })
+        if not rows:
+            return {"created": 0, "reopened": 0, "repeated": 0}
+
+        recorded = await record_alerts(session, rows)
+        await session.commit()
+        stats_cache.invalidate("alerts")
+        outbox_relay.wake()
+        await publish_recorded_alerts(session, recorded)
+        return {key: len(ids) for key, ids in recorded.items()}
+
+    async def run_cycle(self, session: AsyncSession) -> dict:
+        """
+        Executa um ciclo completo: sincroniza regras, lê amostras novas, avalia e cria alertas.
+        Returns:
+            dict: Tempos (ms) e contagens do ciclo.
+        """
+        start = time.perf_counter()
+        await self.sync_rules(session)
+        synced = time.perf_counter()
+        batch = await self.load_batch(session)
+        loaded = time.perf_counter()
+        violations = self.evaluate(batch)
+        evaluated = time.perf_counter()
+        recorded = await self.create_alerts(session, batch, self.new_violations(batch, violations))
+        finished = time.perf_counter()
+        self._violating = {rule.id: batch.endpoint_ids[indexes] for rule, indexes in violations}
+
+        self.cycles += 1
+        self.alerts_created += recorded["created"]
+        self.last_cycle = {
+            "at": datetime.now().isoformat(),
+            "rules": len(self.rules),
+            "endpoints": batch.size,
+            "violations": sum(len(indexes) for _, indexes in violations),
+            "alerts_created": recorded["created"],
+            "alerts_reopened": recorded["reopened"],
+            "alerts_repeated": recorded["repeated"],
+            "sync_ms": round((synced - start) * 1000, 2),
+            "load_ms": round((loaded - synced) * 1000, 2),
+            "evaluate_ms": round((evaluated - loaded) * 1000, 2),
+            "write_ms": round((finished - evaluated) * 1000, 2),
+        }
+        return self.last_cycle
+
+    async def _run_forever(self, session_factory, interval: float):
+        while True:
+            try:
+                async with session_factory() as session:
+                    await self.run_cycle(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Falha no ciclo do motor de regras de alerta: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, session_factory, interval: float):
+        """Inicia o ciclo periódico em segundo plano (uma vez por processo)."""
+        if interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever(session_factory, interval))
+
+    async def stop(self):
+        """Interrompe o ciclo periódico."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "rules": len(self.rules),
+            "invalid_rules": dict(self.errors),
+            "endpoints_cached": len(self._samples),
+            "last_data_id": self._last_data_id,
+            "cycles": self.cycles,
+            "alerts_created": self.alerts_created,
+            "last_cycle": self.last_cycle,
+        }
+
+
+# Intervalo do ciclo periódico (0 desativa; com vários workers, ative em apenas um processo)
+RULE_ENGINE_INTERVAL = float(os.getenv("RULE_ENGINE_INTERVAL", 0))
+
+rule_engine = AlertRuleEngine()
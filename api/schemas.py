@@ -113,6 +113,48 @@ class EndPointOIDsSchemas(BaseModel):
         from_attributes = True
 
 
+class OIDProfileSchemas(BaseModel):
+    """
+    Schema para criação de um perfil reutilizável de OIDs SNMP.
+    """
+    name: str
+    description: Optional[str] = None
+    sysDescr: Optional[str] = None
+    sysName: Optional[str] = None
+    sysUpTime: Optional[str] = None
+    hrProcessorLoad: Optional[str] = None
+    memTotalReal: Optional[str] = None
+    memAvailReal: Optional[str] = None
+    hrStorageSize: Optional[str] = None
+    hrStorageUsed: Optional[str] = None
+    hrStorageDescr: Optional[str] = None
+    ifOperStatus: Optional[str] = None
+    ifInOctets: Optional[str] = None
+    ifOutOctets: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class OIDProfileResponse(OIDProfileSchemas):
+    """
+    Schema de resposta para perfil de OIDs.
+    """
+    id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class OIDRequestPlanResponse(BaseModel):
+    """
+    Schema de resposta para o plano de requisições SNMP de um endpoint.
+    """
+    endpoint_id: int
+    profile_id: int
+    get_oids: Dict[str, str]   # métrica -> OID escalar (GET)
+    walk_oids: Dict[str, str]  # métrica -> OID de tabela (WALK/BULKWALK)
+
+
 class AddEndPointRequest(BaseModel):
     """
     Schema para requisição de adição de endpoint.
@@ -139,6 +181,7 @@ class AddEndPointRequest(BaseModel):
     ifOperStatus: Optional[str]
     ifInOctets: Optional[str]
     ifOutOctets: Optional[str]
+    id_oid_profile: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -249,10 +292,12 @@ class UserListResponse(BaseModel):
     Schema para resposta paginada de usuários.
     """
     users: List[UserResponseSchemas]
-    total: int
+    total: Optional[int] = None  # None quando a contagem é desativada (count=none)
     page: int
-    pages: int
+    pages: Optional[int] = None
     stats: UserStatsSchemas
+    total_is_estimate: bool = False
+    next_cursor: Optional[str] = None  # Cursor da próxima página (None na última)
 
     class Config:
         from_attributes = True
@@ -321,6 +366,8 @@ class AlertResponseSchema(AlertBaseSchema):
     updated_at: Optional[datetime] = None
     acknowledged_at: Optional[datetime] = None
     resolved_at: Optional[datetime] = None
+    occurrences: int = 1
+    last_seen: Optional[datetime] = None
     duration: str
     
     @field_validator('updated_at', mode='before')
@@ -335,6 +382,34 @@ class AlertResponseSchema(AlertBaseSchema):
         from_attributes = True
 
 
+class AlertEndpointSchema(BaseModel):
+    """Endpoint resumido incluído na listagem de alertas com expand=endpoint"""
+    id: int
+    ip: str
+    nickname: Optional[str] = None
+    active: Optional[bool] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AlertUserSchema(BaseModel):
+    """Usuário resumido incluído na listagem de alertas com expand=user_created/user_assigned"""
+    id: int
+    name: str
+    email: str
+
+    class Config:
+        from_attributes = True
+
+
+class AlertExpandedSchema(AlertResponseSchema):
+    """Schema de alerta com os relacionamentos pedidos em expand"""
+    endpoint: Optional[AlertEndpointSchema] = None
+    user_created: Optional[AlertUserSchema] = None
+    user_assigned: Optional[AlertUserSchema] = None
+
+
 class AlertLogSchema(BaseModel):
     """Schema para logs de alertas"""
     id: int
@@ -369,8 +444,10 @@ class PaginationSchema(BaseModel):
     """Schema para paginação"""
     page: int = 1
     size: int = 10
-    total: int
-    pages: int
+    total: Optional[int] = None  # None quando a contagem é desativada (count=none)
+    pages: Optional[int] = None
+    total_is_estimate: bool = False
+    next_cursor: Optional[str] = None  # Cursor da próxima página (None na última)
 
 
 class AlertListResponseSchema(BaseModel):
@@ -403,12 +480,35 @@ class AlertActionSchema(BaseModel):
 
 
 # Schemas para Configurações
-class WebHookConfigSchema(BaseModel):
+class WebHookDeliveryLimits(BaseModel):
+    """Validação dos parâmetros de lote e limites de envio de um webhook."""
+
+    @field_validator('batch_size', 'max_concurrency', 'rate_limit', 'rate_burst', check_fields=False)
+    @classmethod
+    def validate_positive(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("must be greater than zero")
+        return v
+
+    @field_validator('batch_wait_ms', check_fields=False)
+    @classmethod
+    def validate_batch_wait(cls, v):
+        if v is not None and not 0 <= v <= 60000:
+            raise ValueError("must be between 0 and 60000")
+        return v
+
+
+class WebHookConfigSchema(WebHookDeliveryLimits):
     """Schema para configuração de webhook."""
     url: str
     active: Optional[bool] = True
     timeout: Optional[int] = 30
     access_token: Optional[str] = None
+    batch_size: int = 1
+    batch_wait_ms: int = 1000
+    max_concurrency: Optional[int] = None
+    rate_limit: Optional[float] = None
+    rate_burst: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -419,6 +519,11 @@ class WebHookConfigResponse(BaseModel):
     id: int
     url: str
     active: bool
+    batch_size: int = 1
+    batch_wait_ms: int = 1000
+    max_concurrency: Optional[int] = None
+    rate_limit: Optional[float] = None
+    rate_burst: Optional[int] = None
     created_at: datetime
     updated_at: datetime
 
@@ -426,10 +531,15 @@ class WebHookConfigResponse(BaseModel):
         from_attributes = True
 
 
-class WebHookConfigUpdate(BaseModel):
-    """Schema para atualização de configuração de webhook."""
+class WebHookConfigUpdate(WebHookDeliveryLimits):
+    """Schema para atualização de configuração de webhook (limites enviados como null são removidos)."""
     url: Optional[str] = None
     active: Optional[bool] = None
+    batch_size: Optional[int] = None
+    batch_wait_ms: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    rate_limit: Optional[float] = None
+    rate_burst: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,87 @@
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import Select, column, func, literal_column, table
+from sqlalchemy.sql.elements import ColumnElement
+from api.models import Alerts
+
+
+
+# Tabela FTS5 (SQLite) com as colunas indexadas dos alertas
+alerts_fts = table("alerts_fts", column("rowid"), column("alerts_fts"))
+
+# Coluna tsvector gerada (PostgreSQL); não é mapeada no modelo por não existir no SQLite
+alerts_search_vector = literal_column("alerts.search_vector")
+
+
+def search_terms(text: Optional[str]) -> List[str]:
+    """
+    Quebra o texto digitado em termos de busca (apenas letras, números e _).
+    Descartar a pontuação evita que o usuário injete operadores de tsquery/FTS5.
+    Args:
+        text (str): Texto da busca.
+    Returns:
+        list: Termos em minúsculas.
+    """
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def like_pattern(text: str) -> str:
+    """
+    Padrão de substring para ILIKE, com % e _ digitados tratados como literais.
+    Usar com escape="\\" (ex.: coluna.ilike(like_pattern(texto), escape="\\")).
+    Args:
+        text (str): Texto digitado.
+    Returns:
+        str: Padrão %texto% escapado.
+    """
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def apply_alert_search(query: Select, dialect: str, search: Optional[str] = None,
+                       system: Optional[str] = None, assignee: Optional[str] = None, table=Alerts
+                       ) -> Tuple[Select, Optional[ColumnElement]]:
+    """
+    Aplica a busca textual e os filtros de system/assignee usando os índices de busca.
+    - PostgreSQL: `search` consulta a coluna tsvector (GIN) com prefixo em cada termo.
+    - SQLite: `search` é uma consulta MATCH na tabela FTS5, com prefixo em cada termo.
+    - alerts_archive (sem índices de busca) e outros bancos: `search` é substring com ILIKE.
+    - system/assignee são sempre substring com ILIKE ("rv-0" encontra "srv-01"); no
+      PostgreSQL os índices de trigramas atendem esses filtros.
+    Args:
+        query (Select): Consulta de alertas.
+        dialect (str): Nome do dialeto da conexão.
+        search (str): Texto livre (título, descrição, sistema e responsável).
+        system (str): Filtro por sistema.
+        assignee (str): Filtro por responsável.
+        table: Modelo consultado (Alerts ou AlertsArchive).
+    Returns:
+        tuple: (consulta filtrada, expressão de ordenação por relevância ou None).
+    """
+    terms = search_terms(search)
+    rank_order = None
+
+    if terms and table is Alerts and dialect == "postgresql":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        query = query.where(alerts_search_vector.op("@@")(tsquery))
+        rank_order = func.ts_rank(alerts_search_vector, tsquery).desc()
+    elif terms and table is Alerts and dialect == "sqlite":
+        match = " AND ".join(f'"{term}"*' for term in terms)
+        query = query.join(alerts_fts, alerts_fts.c.rowid == Alerts.id).where(
+            alerts_fts.c.alerts_fts.op("MATCH")(match)
+        )
+        # bm25 com pesos por coluna (título > descrição > sistema/responsável); menor = mais relevante
+        rank_order = func.bm25(alerts_fts.c.alerts_fts, 10.0, 5.0, 1.0, 1.0).asc()
+    elif terms:
+        # Outros bancos e o arquivo: busca por substring, sem índice
+        search_term = like_pattern(search.lower())
+        query = query.where(
+            table.title.ilike(search_term, escape="\\") | table.description.ilike(search_term, escape="\\") |
+            table.system.ilike(search_term, escape="\\") | table.assignee.ilike(search_term, escape="\\")
+        )
+
+    if system:
+        query = query.where(table.system.ilike(like_pattern(system), escape="\\"))
+    if assignee:
+        query = query.where(table.assignee.ilike(like_pattern(assignee), escape="\\"))
+    return query, rank_order
@@ -0,0 +1,447 @@
+import os
+import time
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.models import EndPointsData, SLAMetrics
+from api.database import STREAM_CHUNK_SIZE
+
+
+
+# Linhas por INSERT ... ON CONFLICT
+UPSERT_CHUNK_SIZE = 500
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Colunas de EndPointsData consumidas pelo motor
+SAMPLE_COLUMNS = (
+    EndPointsData.id, EndPointsData.id_end_point, EndPointsData.status,
+    EndPointsData.ping_rtt, EndPointsData.last_updated,
+)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Converte o tempo de resposta coletado (texto) em float; inválidos viram None."""
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class PeriodAggregate:
+    """Acumuladores de um endpoint em um período de medição."""
+
+    __slots__ = ("up", "down", "incidents", "recoveries", "recovery_seconds",
+                 "rt_sum", "rt_count", "rt_min", "rt_max", "last_status")
+
+    def __init__(self):
+        self.up = 0.0
+        self.down = 0.0
+        self.incidents = 0
+        self.recoveries = 0
+        self.recovery_seconds = 0.0
+        self.rt_sum = 0.0
+        self.rt_count = 0
+        self.rt_min: Optional[float] = None
+        self.rt_max: Optional[float] = None
+        self.last_status = True
+
+    def add_response_time(self, value: float):
+        self.rt_sum += value
+        self.rt_count += 1
+        self.rt_min = value if self.rt_min is None else min(self.rt_min, value)
+        self.rt_max = value if self.rt_max is None else max(self.rt_max, value)
+
+    def row(self, endpoint_id: int, period_start: datetime, period_hours: int, target: float) -> dict:
+        """Valores da linha de SLAMetrics do período."""
+        observed = self.up + self.down
+        if observed:
+            availability = self.up / observed * 100
+        else:
+            # Uma única coleta no período: vale o status dela
+            availability = 100.0 if self.last_status else 0.0
+        return {
+            "endpoint_id": endpoint_id,
+            "timestamp": period_start,
+            "measurement_period_hours": period_hours,
+            "availability_percentage": round(availability, 4),
+            "uptime_seconds": int(self.up),
+            "downtime_seconds": int(self.down),
+            "mttr_minutes": round(self.recovery_seconds / self.recoveries / 60, 2) if self.recoveries else None,
+            "mtbf_hours": round(self.up / 3600 / self.incidents, 2) if self.incidents else None,
+            "incidents_count": self.incidents,
+            "sla_target": target,
+            "sla_compliance": availability >= target,
+            "sla_breach_minutes": round(max(0.0, self.down - (1 - target / 100) * observed) / 60, 2),
+            "avg_response_time": round(self.rt_sum / self.rt_count, 2) if self.rt_count else None,
+            "max_response_time": self.rt_max,
+            "min_response_time": self.rt_min,
+        }
+
+
+class EndpointState:
+    """Última coleta consumida de um endpoint (status vigente e início da queda atual)."""
+
+    __slots__ = ("at", "status", "down_since")
+
+    def __init__(self, at: datetime, status: bool, down_since: Optional[datetime]):
+        self.at = at
+        self.status = status
+        self.down_since = down_since
+
+
+class SLAEngine:
+    """
+    Calcula SLAMetrics de forma incremental a partir das coletas (EndPointsData).
+    - A cada ciclo lê apenas as coletas com id acima do checkpoint (a última já consumida)
+      e atualiza, em memória, os acumuladores de cada endpoint por período de medição:
+      tempo online/offline, quedas (MTTR/MTBF) e tempos de resposta (ping_rtt).
+    - O coletor não grava os ids em ordem de commit: um id abaixo do checkpoint pode ficar
+      visível depois. Como em /monitor/changes, os ids que faltam entre os últimos
+      SLA_GAP_SCAN lidos são guardados e relidos nos ciclos seguintes por até
+      SLA_SAFETY_WINDOW segundos (contadores gap_recovered e gap_expired).
+    - O tempo entre duas coletas conta com o status da anterior, até SLA_MAX_GAP_SECONDS;
+      lacunas maiores (sem coleta) não contam como online nem offline.
+    - Os períodos alterados são gravados com upsert em sla_metrics (uma linha por endpoint
+      e período, timestamp = início do período); os relatórios de /sla leem esses valores.
+    - Ao iniciar, o processo recalcula desde o último período gravado (ou os últimos
+      SLA_BACKFILL_DAYS dias), incluindo sempre o período anterior ao atual, e sobrescreve
+      as linhas parciais de antes do reinício. Períodos mais antigos ficam fechados:
+      coletas que cheguem atrasadas para eles são ignoradas (contador late_samples).
+    - Desativado por padrão: cada processo com o motor ativo recalcula e grava os mesmos
+      períodos, então com vários workers ele deve ser ativado em apenas um processo.
+    Variáveis:
+        SLA_ENGINE_INTERVAL (float): Intervalo entre ciclos em segundos (padrão 0 = desativado).
+        SLA_PERIOD_HOURS (int): Duração do período de medição, divisor de 24 (padrão 24).
+        SLA_TARGET (float): Meta de disponibilidade em % (padrão 99.9).
+        SLA_MAX_GAP_SECONDS (float): Maior intervalo entre coletas contabilizado (padrão 300).
+        SLA_BACKFILL_DAYS (float): Histórico calculado quando sla_metrics está vazia (padrão 30).
+        SLA_SAFETY_WINDOW (float): Segundos em que um id ausente é relido (padrão 60).
+        SLA_GAP_SCAN (int): Ids mais recentes verificados a cada ciclo (padrão 1000).
+    """
+
+    def __init__(self, interval: float, period_hours: int, target: float, max_gap: float, backfill_days: float,
+                 safety_window: float, gap_scan: int):
+        if period_hours < 1 or 24 % period_hours:
+            print(f"⚠️ SLA_PERIOD_HOURS={period_hours} não divide o dia; usando 24")
+            period_hours = 24
+        self.interval = interval
+        self.period_hours = period_hours
+        self.period = timedelta(hours=period_hours)
+        self.target = target
+        self.max_gap = timedelta(seconds=max_gap)
+        self.backfill_days = backfill_days
+        self.safety_window = safety_window
+        self.gap_scan = gap_scan
+        self._last_data_id = 0
+        self._gaps: Dict[int, float] = {}
+        self._rebuilding = True
+        self._floor: Optional[datetime] = None
+        self._states: Dict[int, EndpointState] = {}
+        self._aggregates: Dict[Tuple[int, datetime], PeriodAggregate] = {}
+        self._dirty: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.counters = {"cycles": 0, "samples": 0, "late_samples": 0, "gap_recovered": 0, "gap_expired": 0,
+                         "rows_written": 0}
+        self.last_cycle: Optional[dict] = None
+        self.last_error: Optional[str] = None
+
+    def period_start(self, moment: datetime) -> datetime:
+        """Início do período de medição que contém moment (alinhado à meia-noite)."""
+        return moment.replace(hour=moment.hour - moment.hour % self.period_hours, minute=0, second=0, microsecond=0)
+
+    def horizon(self, now: datetime) -> datetime:
+        """Períodos iniciados antes disso estão fechados (o período anterior ainda aceita atrasos)."""
+        return self.period_start(now) - self.period
+
+    def _aggregate(self, endpoint_id: int, period_start: datetime, horizon: datetime) -> Optional[PeriodAggregate]:
+        if period_start < horizon and not self._rebuilding:
+            return None
+        key = (endpoint_id, period_start)
+        aggregate = self._aggregates.get(key)
+        if aggregate is None:
+            aggregate = self._aggregates[key] = PeriodAggregate()
+        self._dirty.add(key)
+        return aggregate
+
+    def _add_duration(self, endpoint_id: int, start: datetime, end: datetime, up: bool, horizon: datetime):
+        """Distribui o intervalo [start, end) entre os períodos que ele atravessa."""
+        # Nada antes do início do recálculo: esses períodos já estão gravados
+        if self._floor is not None:
+            start = max(start, self._floor)
+        while start < end:
+            period_start = self.period_start(start)
+            segment_end = min(end, period_start + self.period)
+            aggregate = self._aggregate(endpoint_id, period_start, horizon)
+            if aggregate is not None:
+                seconds = (segment_end - start).total_seconds()
+                if up:
+                    aggregate.up += seconds
+                else:
+                    aggregate.down += seconds
+            start = segment_end
+
+    def consume(self, endpoint_id: int, status: Optional[bool], ping_rtt: Any, at: datetime, horizon: datetime):
+        """
+        Aplica uma coleta aos acumuladores.
+        Args:
+            endpoint_id (int): ID do endpoint.
+            status (bool): Status coletado (None conta como offline).
+            ping_rtt (Any): Tempo de resposta em ms.
+            at (datetime): Momento da coleta (last_updated).
+            horizon (datetime): Limite dos períodos abertos.
+        """
+        status = bool(status)
+        aggregate = self._aggregate(endpoint_id, self.period_start(at), horizon)
+        if aggregate is None:
+            self.counters["late_samples"] += 1
+            return
+        self.counters["samples"] += 1
+        rtt = _to_float(ping_rtt)
+        if status and rtt is not None:
+            aggregate.add_response_time(rtt)
+
+        state = self._states.get(endpoint_id)
+        if state is not None and at <= state.at:
+            # Fora de ordem: conta o tempo de resposta, mas não altera a linha do tempo
+            return
+        if state is not None:
+            self._add_duration(endpoint_id, state.at, min(at, state.at + self.max_gap), state.status, horizon)
+        down_since = state.down_since if state is not None else None
+        if not status and down_since is None:
+            down_since = at
+            aggregate.incidents += 1
+        elif status and down_since is not None:
+            aggregate.recoveries += 1
+            aggregate.recovery_seconds += (at - down_since).total_seconds()
+            down_since = None
+        aggregate.last_status = status
+        self._states[endpoint_id] = EndpointState(at, status, down_since)
+
+    async def _rebuild_start(self, session: AsyncSession, now: datetime) -> datetime:
+        """
+        Início do recálculo: o último período gravado (ou o histórico de SLA_BACKFILL_DAYS),
+        recuando até o período anterior ao atual, que ainda aceita coletas atrasadas.
+        """
+        last = await session.scalar(
+            select(func.max(SLAMetrics.timestamp)).where(SLAMetrics.measurement_period_hours == self.period_hours)
+        )
+        start = min(last or self.period_start(now - timedelta(days=self.backfill_days)), self.horizon(now))
+        self._floor = start
+        # Status vigente de cada endpoint no início do recálculo (última coleta anterior)
+        latest = (
+            select(func.max(EndPointsData.id))
+            .where(EndPointsData.last_updated < start)
+            .group_by(EndPointsData.id_end_point)
+        )
+        for row in (await session.execute(
+            select(EndPointsData.id_end_point, EndPointsData.status, EndPointsData.last_updated)
+            .where(EndPointsData.id.in_(latest))
+        )).all():
+            status = bool(row.status)
+            # Queda já em andamento: o tempo de recuperação conta a partir de start
+            self._states[row.id_end_point] = EndpointState(row.last_updated, status, None if status else start)
+        return start
+
+    async def load(self, session: AsyncSession, now: datetime) -> int:
+        """
+        Consome as coletas novas (id acima do checkpoint, ou lacunas ainda na janela) em lotes (yield_per).
+        Returns:
+            int: Coletas lidas.
+        """
+        horizon = self.horizon(now)
+        query = select(*SAMPLE_COLUMNS)
+        if self._rebuilding:
+            start = await self._rebuild_start(session, now)
+            query = query.where(EndPointsData.last_updated >= start)
+        else:
+            query = query.where(or_(EndPointsData.id > self._last_data_id, EndPointsData.id.in_(list(self._gaps))))
+
+        read = 0
+        # No recálculo os ids pulados incluem coletas anteriores ao início: só conta a partir da primeira lida
+        checkpoint = self._last_data_id
+        expected = None if self._rebuilding else checkpoint
+        missing = deque()
+        result = await session.stream(query.order_by(EndPointsData.id).execution_options(yield_per=STREAM_CHUNK_SIZE))
+        async for partition in result.partitions():
+            for data_id, endpoint_id, status, ping_rtt, last_updated in partition:
+                if data_id <= checkpoint:
+                    del self._gaps[data_id]
+                    self.counters["gap_recovered"] += 1
+                else:
+                    # Ids pulados entre as coletas lidas (só os SLA_GAP_SCAN mais recentes importam)
+                    if expected is not None and data_id > expected + 1:
+                        missing.append((max(expected + 1, data_id - self.gap_scan), data_id))
+                    while missing and missing[0][1] <= data_id - self.gap_scan:
+                        missing.popleft()
+                    expected = data_id
+                if last_updated is not None:
+                    self.consume(endpoint_id, status, ping_rtt, last_updated, horizon)
+            read += len(partition)
+            # Cede o loop entre os lotes (o recálculo inicial pode ler muitas coletas)
+            await asyncio.sleep(0)
+        if expected is not None:
+            self._last_data_id = expected
+        self._track_gaps(missing)
+        return read
+
+    def _track_gaps(self, missing: deque):
+        """Guarda os ids pulados neste ciclo e descarta os que passaram da janela (rollback ou salto da sequência)."""
+        noticed = time.monotonic()
+        for gap, noticed_at in list(self._gaps.items()):
+            if noticed - noticed_at >= self.safety_window:
+                del self._gaps[gap]
+                self.counters["gap_expired"] += 1
+        low = self._last_data_id - self.gap_scan
+        for first, end in missing:
+            for gap in range(max(first, low + 1), end):
+                self._gaps[gap] = noticed
+
+    async def flush(self, session: AsyncSession, now: datetime) -> int:
+        """
+        Grava (upsert) os períodos alterados e descarta da memória os já fechados.
+        Returns:
+            int: Linhas gravadas.
+        """
+        rows = [
+            self._aggregates[key].row(key[0], key[1], self.period_hours, self.target)
+            for key in sorted(self._dirty, key=lambda key: (key[1], key[0]))
+        ]
+        if rows:
+            dialect = (await session.connection()).dialect.name
+            for index in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                await self._upsert(session, dialect, rows[index:index + UPSERT_CHUNK_SIZE])
+            await session.commit()
+        self._dirty.clear()
+
+        horizon = self.horizon(now)
+        for key in [key for key in self._aggregates if key[1] < horizon]:
+            del self._aggregates[key]
+        return len(rows)
+
+    async def _upsert(self, session: AsyncSession, dialect: str, rows: List[dict]):
+        if dialect in _INSERTS:
+            statement = _INSERTS[dialect](SLAMetrics.__table__)
+            key = ("endpoint_id", "timestamp", "measurement_period_hours")
+            await session.execute(statement.on_conflict_do_update(
+                index_elements=list(key),
+                set_={name: statement.excluded[name] for name in rows[0] if name not in key}
+            ), rows)
+            return
+        # Outros bancos: atualiza as linhas existentes e insere as demais
+        for row in rows:
+            metric = await session.scalar(select(SLAMetrics).where(and_(
+                SLAMetrics.endpoint_id == row["endpoint_id"],
+                SLAMetrics.timestamp == row["timestamp"],
+                SLAMetrics.measurement_period_hours == row["measurement_period_hours"],
+            )))
+            if metric is None:
+                metric = SLAMetrics(row["endpoint_id"], row["availability_percentage"])
+                session.add(metric)
+            for name, value in row.items():
+                setattr(metric, name, value)
+
+    async def run_cycle(self, session: AsyncSession) -> dict:
+        """
+        Executa um ciclo: consome as coletas novas e grava os períodos alterados.
+        Returns:
+            dict: Coletas lidas, linhas gravadas e duração do ciclo.
+        """
+        start = datetime.now()
+        rebuilding = self._rebuilding
+        read = await self.load(session, start)
+        written = await self.flush(session, start)
+        self._rebuilding = False
+
+        self.counters["cycles"] += 1
+        self.counters["rows_written"] += written
+        self.last_cycle = {
+            "at": start.isoformat(),
+            "rebuild": rebuilding,
+            "samples": read,
+            "rows_written": written,
+            "duration_ms": round((datetime.now() - start).total_seconds() * 1000, 2),
+        }
+        return self.last_cycle
+
+    def reset(self):
+        """Descarta o estado em memória: o próximo ciclo recalcula desde o último período gravado."""
+        self._last_data_id = 0
+        self._gaps.clear()
+        self._rebuilding = True
+        self._floor = None
+        self._states.clear()
+        self._aggregates.clear()
+        self._dirty.clear()
+
+    def start(self, session_factory):
+        """Inicia os ciclos periódicos em segundo plano (uma vez por processo)."""
+        if self.interval > 0 and self._task is None:
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run_forever(session_factory))
+
+    async def stop(self, timeout: float = 5.0):
+        """
+        Interrompe os ciclos; o ciclo em andamento termina antes (até timeout segundos).
+        Args:
+            timeout (float): Tempo máximo de espera pelo ciclo em andamento.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        _, pending = await asyncio.wait({self._task}, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run_forever(self, session_factory):
+        while not self._stopping:
+            try:
+                async with session_factory() as session:
+                    await self.run_cycle(session)
+            except Exception as e:
+                self.last_error = str(e)
+                # O ciclo pode ter consumido coletas sem gravá-las: recalcula no próximo
+                self.reset()
+                print(f"⚠️ Falha no ciclo do motor de SLA: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval": self.interval,
+            "period_hours": self.period_hours,
+            "target": self.target,
+            "max_gap_seconds": self.max_gap.total_seconds(),
+            "last_data_id": self._last_data_id,
+            "pending_gaps": len(self._gaps),
+            "endpoints": len(self._states),
+            "open_periods": len(self._aggregates),
+            **self.counters,
+            "last_cycle": self.last_cycle,
+            "last_error": self.last_error,
+        }
+
+
+# Intervalo do ciclo periódico (0 desativa; com vários workers, ative em apenas um processo)
+sla_engine = SLAEngine(
+    interval=float(os.getenv("SLA_ENGINE_INTERVAL", 0)),
+    period_hours=int(os.getenv("SLA_PERIOD_HOURS", 24)),
+    target=float(os.getenv("SLA_TARGET", 99.9)),
+    max_gap=float(os.getenv("SLA_MAX_GAP_SECONDS", 300)),
+    backfill_days=float(os.getenv("SLA_BACKFILL_DAYS", 30)),
+    safety_window=float(os.getenv("SLA_SAFETY_WINDOW", 60)),
+    gap_scan=int(os.getenv("SLA_GAP_SCAN", 1000)),
+)
@@ -1,182 +1,475 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
+import os
+import json
+import asyncio
+from functools import partial
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, desc, select
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from .dependencies import verify_token, init_session
+from .dependencies import verify_token_short_session, open_read_session
+from .database import STREAM_CHUNK_SIZE, writer_queue
+from .cache import request_flight, stream_flight
+from .sla_engine import sla_engine
+from .pagination import encode_cursor, decode_cursor
 from .models import (SLAMetrics, IncidentTracking, PerformanceMetrics,
                     EndPoints, EndPointsData, Alerts)
 
 
 
-sla_router = APIRouter(prefix="/sla", tags=["sla"], dependencies=[Depends(verify_token)])
+# Autenticação com sessão própria: requisições aguardando um relatório compartilhado
+# não seguram conexões de que o próprio cálculo precisa
+sla_router = APIRouter(prefix="/sla", tags=["sla"], dependencies=[Depends(verify_token_short_session)])
+
+
+async def _shared_report(route: str, compute: Callable[..., Awaitable[Any]], **params: Any) -> Response:
+    """
+    Executa o relatório uma única vez para requisições simultâneas com os mesmos
+    parâmetros (request_flight) e devolve o JSON já serializado, também compartilhado.
+    Args:
+        route (str): Identificador da rota (ex.: "sla.summary").
+        compute (Callable): Corrotina que recebe a sessão e os parâmetros e retorna o conteúdo.
+        **params: Parâmetros normalizados da requisição.
+    Returns:
+        Response: Resposta JSON.
+    """
+    async def render() -> bytes:
+        # Sessão própria: o cálculo pode continuar depois que a requisição que o iniciou terminou
+        async with open_read_session() as session:
+            content = await compute(session, **params)
+            # Conteúdo já serializado (bytes) é compartilhado como está
+            return content if isinstance(content, bytes) else JSONResponse(content).body
+
+    body = await request_flight.run(request_flight.key(route, **params), render)
+    return Response(content=body, media_type="application/json")
+
+
+# Seções de /sla/summary: coluna da janela de dias (None = sem janela), ordem por id
+# (mais recentes primeiro nas séries temporais) e campos projetados -> colunas
+SUMMARY_SECTIONS = {
+    "endpoints": {
+        "window": None,
+        "descending": False,
+        "fields": {
+            "id": EndPoints.id,
+            "ip": EndPoints.ip,
+            "nickname": EndPoints.nickname,
+            "interval": EndPoints.interval,
+        },
+    },
+    "sla_metrics": {
+        "window": SLAMetrics.timestamp,
+        "descending": True,
+        "fields": {
+            "id": SLAMetrics.id,
+            "endpoint_id": SLAMetrics.endpoint_id,
+            "timestamp": SLAMetrics.timestamp,
+            "availability_percentage": SLAMetrics.availability_percentage,
+            "uptime_seconds": SLAMetrics.uptime_seconds,
+            "downtime_seconds": SLAMetrics.downtime_seconds,
+            "mttr_minutes": SLAMetrics.mttr_minutes,
+            "incidents_count": SLAMetrics.incidents_count,
+            "sla_target": SLAMetrics.sla_target,
+            "sla_compliance": SLAMetrics.sla_compliance,
+            "avg_response_time": SLAMetrics.avg_response_time,
+        },
+    },
+    "incidents": {
+        "window": IncidentTracking.start_time,
+        "descending": True,
+        "fields": {
+            "id": IncidentTracking.id,
+            "endpoint_id": IncidentTracking.endpoint_id,
+            "incident_type": IncidentTracking.incident_type,
+            "severity": IncidentTracking.severity,
+            "status": IncidentTracking.status,
+            "start_time": IncidentTracking.start_time,
+            "end_time": IncidentTracking.end_time,
+            "duration_seconds": IncidentTracking.duration_seconds,
+            "resolution_time_minutes": IncidentTracking.resolution_time_minutes,
+            "impact_description": IncidentTracking.impact_description,
+        },
+    },
+    "performance_data": {
+        "window": EndPointsData.last_updated,
+        "descending": True,
+        "fields": {
+            "id": EndPointsData.id,
+            "endpoint_id": EndPointsData.id_end_point,
+            "timestamp": EndPointsData.last_updated,
+            "status": EndPointsData.status,
+            "ping_rtt": EndPointsData.ping_rtt,
+            "snmp_rtt": EndPointsData.snmp_rtt,
+            "cpu_load": EndPointsData.hrProcessorLoad,
+            "memory_total": EndPointsData.memTotalReal,
+            "memory_avail": EndPointsData.memAvailReal,
+        },
+    },
+    "alerts": {
+        "window": Alerts.created_at,
+        "descending": True,
+        "fields": {
+            "id": Alerts.id,
+            "endpoint_id": Alerts.id_endpoint,
+            "title": Alerts.title,
+            "severity": Alerts.severity,
+            "category": Alerts.category,
+            "status": Alerts.status,
+            "created_at": Alerts.created_at,
+            "resolved_at": Alerts.resolved_at,
+        },
+    },
+}
+
+# Seções aceitas em sections= ("summary" traz os totais do período)
+SUMMARY_SECTION_NAMES = (*SUMMARY_SECTIONS, "summary")
+
+# Maior limit aceito por seção
+SLA_SUMMARY_MAX_LIMIT = int(os.getenv("SLA_SUMMARY_MAX_LIMIT", 10000))
+
+# Linhas lidas e serializadas de cada vez por /sla/summary antes de devolver o event loop
+SUMMARY_RENDER_SLICE = int(os.getenv("SLA_SUMMARY_RENDER_SLICE", 100))
+
+# Vez de serializar: relatórios simultâneos se alternam, um lote por volta do event loop
+_render_turn = asyncio.Lock()
+
+# Leituras de lote simultâneas entre todos os relatórios; fica separado da vez de serializar
+# para que um banco lento atrase só os relatórios que esperam por ele. No SQLite a leitura é
+# CPU na thread do driver e disputa o GIL com o event loop, então o padrão é uma por vez
+SUMMARY_FETCH_SLOTS = int(os.getenv("SLA_SUMMARY_FETCH_SLOTS", 1 if writer_queue is not None else 4))
+_fetch_slots = asyncio.Semaphore(SUMMARY_FETCH_SLOTS)
+
+# Mesmo encoder do JSONResponse
+_dumps = partial(json.dumps, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def _split_values(values: Optional[List[str]]) -> List[str]:
+    return sorted({value for item in values or [] for value in item.split(",") if value})
+
+
+def _summary_plan(
+    sections: Optional[List[str]],
+    fields: Optional[List[str]],
+    cursor: Optional[str]
+) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, Tuple[str, ...]], ...], Tuple[Tuple[str, int], ...]]:
+    """
+    Valida e normaliza sections=, fields= e cursor= de /sla/summary.
+    Args:
+        sections (list): Seções pedidas (padrão: todas).
+        fields (list): Campos no formato seção.campo (padrão: todos os campos).
+        cursor (str): next_cursor da página anterior.
+    Raises:
+        HTTPException: Se uma seção, campo ou o cursor for inválido.
+    Returns:
+        tuple: Seções, campos por seção e última posição (id) de cada seção a continuar.
+    """
+    names = _split_values(sections) or list(SUMMARY_SECTION_NAMES)
+    invalid = [name for name in names if name not in SUMMARY_SECTION_NAMES]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Seção inválida: {', '.join(invalid)}")
+
+    projection: Dict[str, List[str]] = {}
+    invalid = []
+    for value in _split_values(fields):
+        section, _, field = value.partition(".")
+        if field not in SUMMARY_SECTIONS.get(section, {}).get("fields", {}):
+            invalid.append(value)
+        else:
+            projection.setdefault(section, []).append(field)
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Campo inválido: {', '.join(invalid)}")
+
+    positions: Dict[str, int] = {}
+    if cursor:
+        values = decode_cursor(cursor, None)
+        pairs = list(zip(values[::2], values[1::2]))
+        if len(values) % 2 or any(
+            section not in SUMMARY_SECTIONS or not isinstance(position, int) for section, position in pairs
+        ):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        positions = dict(pairs)
+        # Seções esgotadas na página anterior não voltam
+        names = [name for name in names if name in positions or name == "summary"]
+
+    # A ordem das seções na resposta segue SUMMARY_SECTION_NAMES
+    ordered = tuple(name for name in SUMMARY_SECTION_NAMES if name in names)
+    return (
+        ordered,
+        tuple(sorted((section, tuple(sorted(chosen))) for section, chosen in projection.items())),
+        tuple(sorted(positions.items())),
+    )
+
+
+def _json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _render_partition(
+    name: str,
+    names: List[str],
+    rows: List[Any],
+    sent: int,
+    limit: Optional[int],
+    ndjson: bool
+) -> Tuple[str, int, Any, bool]:
+    """
+    Serializa um lote de linhas de uma seção de /sla/summary.
+    Args:
+        name (str): Seção.
+        names (list): Campos projetados (as linhas trazem o id antes deles).
+        rows (list): Lote lido do banco.
+        sent (int): Itens da seção já enviados.
+        limit (int): Máximo de itens da seção (None = sem limite).
+        ndjson (bool): Uma linha por item em vez de itens de um array JSON.
+    Returns:
+        tuple: Texto do lote, itens serializados, id do último item e se a seção continua além de limit.
+    """
+    parts = []
+    count, last_id = 0, None
+    for row in rows:
+        if limit is not None and sent + count == limit:
+            return "".join(parts), count, last_id, True
+        item = {field: _json_value(value) for field, value in zip(names, row[1:])}
+        if ndjson:
+            parts.append(_dumps({"section": name, "data": item}) + "\n")
+        else:
+            parts.append(("," if sent + count else "") + _dumps(item))
+        count += 1
+        last_id = row[0]
+    return "".join(parts), count, last_id, False
+
+
+async def _summary_totals(session: AsyncSession, days: int, cutoff_date: datetime) -> dict:
+    """
+    Totais do período (independentes de limit e das seções pedidas): contagens e a
+    disponibilidade geral, somada das linhas de sla_metrics gravadas pelo motor de SLA
+    (sem reler as coletas).
+    """
+    sla = select(
+        func.sum(SLAMetrics.uptime_seconds), func.sum(SLAMetrics.downtime_seconds),
+        func.sum(SLAMetrics.sla_breach_minutes),
+    ).where(and_(
+        # Períodos que começam antes do corte contam inteiros
+        SLAMetrics.timestamp >= sla_engine.period_start(cutoff_date),
+        SLAMetrics.measurement_period_hours == sla_engine.period_hours,
+    )).subquery()
+    totals = (await session.execute(select(
+        select(func.count()).select_from(EndPoints).scalar_subquery(),
+        select(func.count()).select_from(IncidentTracking)
+        .where(IncidentTracking.start_time >= cutoff_date).scalar_subquery(),
+        select(func.count()).select_from(Alerts).where(Alerts.created_at >= cutoff_date).scalar_subquery(),
+        *sla.c,
+    ))).one()
+    uptime, downtime, breach = totals[3] or 0, totals[4] or 0, totals[5] or 0
+    return {
+        "period_days": days,
+        "total_endpoints": totals[0],
+        "total_incidents": totals[1],
+        "total_alerts": totals[2],
+        "availability_percentage": round(uptime / (uptime + downtime) * 100, 4) if uptime + downtime else None,
+        "uptime_seconds": uptime,
+        "downtime_seconds": downtime,
+        "sla_breach_minutes": round(breach, 2),
+        "analysis_start_date": cutoff_date.isoformat(),
+        "analysis_end_date": datetime.now().isoformat()
+    }
+
+
+async def _summary_chunks(
+    session: AsyncSession,
+    days: int,
+    sections: Tuple[str, ...],
+    fields: Tuple[Tuple[str, Tuple[str, ...]], ...],
+    positions: Tuple[Tuple[str, int], ...],
+    limit: Optional[int],
+    ndjson: bool
+) -> AsyncIterator[str]:
+    """
+    Gera /sla/summary em pedaços de texto: cada seção é lida com yield_per (cursor do
+    lado do servidor) e cada lote vira um pedaço, então a memória usada depende do
+    tamanho do lote, e não de days.
+    - JSON: o mesmo formato de sempre ({"status", "data": {seção: [...], "summary"}}),
+      mais data.next_cursor.
+    - NDJSON: uma linha {"section", "data"} por item; a última linha tem section "end"
+      e o next_cursor.
+    Com limit, cada seção traz no máximo limit itens e next_cursor continua as seções
+    que ainda têm itens (None quando todas terminaram).
+    """
+    cutoff_date = datetime.now() - timedelta(days=days)
+    projection = dict(fields)
+    start = dict(positions)
+    next_positions: List[Any] = []
+    if not ndjson:
+        yield '{"status":"success","data":{'
+    first_section = True
+
+    for name in sections:
+        if name == "summary":
+            continue
+        spec = SUMMARY_SECTIONS[name]
+        names = list(projection.get(name) or spec["fields"])
+        id_column = spec["fields"]["id"]
+        query = select(id_column, *[spec["fields"][field] for field in names])
+        if spec["window"] is not None:
+            query = query.where(spec["window"] >= cutoff_date)
+        if name in start:
+            query = query.where(id_column < start[name] if spec["descending"] else id_column > start[name])
+        query = query.order_by(id_column.desc() if spec["descending"] else id_column)
+        if limit is not None:
+            # Uma linha a mais indica que a seção continua na próxima página
+            query = query.limit(limit + 1)
+
+        if not ndjson:
+            yield f'{"" if first_section else ","}"{name}":['
+        first_section = False
+        sent, last_id, has_more = 0, None, False
+        # Lotes pequenos: ler e serializar um lote ocupa o event loop por pouco tempo
+        result = await session.stream(query.execution_options(yield_per=SUMMARY_RENDER_SLICE))
+        partitions = result.partitions()
+        while True:
+            # A leitura (ida ao banco) fica fora da vez: um relatório lento não segura os demais
+            async with _fetch_slots:
+                partition = await anext(partitions, None)
+            if partition is None:
+                break
+            # Serializar é CPU no event loop: um lote por vez entre todos os relatórios,
+            # então outras requisições esperam no máximo um lote
+            async with _render_turn:
+                chunk, count, partition_last, has_more = _render_partition(name, names, partition, sent, limit, ndjson)
+            if count:
+                sent += count
+                last_id = partition_last
+                yield chunk
+            if has_more:
+                break
+        await result.close()
+        if has_more:
+            next_positions.extend([name, last_id])
+        if not ndjson:
+            yield "]"
+
+    next_cursor = encode_cursor(next_positions) if next_positions else None
+    summary = await _summary_totals(session, days, cutoff_date) if "summary" in sections else None
+    if ndjson:
+        if summary is not None:
+            yield _dumps({"section": "summary", "data": summary}) + "\n"
+        yield _dumps({"section": "end", "next_cursor": next_cursor}) + "\n"
+    else:
+        if summary is not None:
+            yield f'{"" if first_section else ","}"summary":{_dumps(summary)}'
+            first_section = False
+        yield f'{"" if first_section else ","}"next_cursor":{_dumps(next_cursor)}}}}}'
 
 
 @sla_router.get("/summary")
 async def get_sla_summary(
     days: int = Query(30, description="Número de dias para análise"),
-    session: Session = Depends(init_session)
+    sections: Optional[List[str]] = Query(None, description="Seções: endpoints, sla_metrics, incidents, performance_data, alerts, summary (padrão: todas)"),
+    fields: Optional[List[str]] = Query(None, description="Campos por seção, no formato seção.campo (ex.: performance_data.status)"),
+    limit: Optional[int] = Query(None, ge=1, le=SLA_SUMMARY_MAX_LIMIT, description="Máximo de itens por seção"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json ou ndjson (um item por linha)")
 ):
     """
     Retorna dados brutos de SLA dos últimos N dias para processamento no frontend.
+    - sections= e fields= escolhem as seções e os campos de cada uma.
+    - Com limit, cada seção é paginada por id (mais recentes primeiro) e a resposta traz
+      next_cursor; páginas JSON são montadas uma única vez para requisições simultâneas
+      com os mesmos parâmetros.
+    - Sem limit (ou com format=ndjson) a resposta é transmitida enquanto é lida do banco,
+      com memória limitada qualquer que seja days; requisições simultâneas com os mesmos
+      parâmetros recebem a mesma leitura.
     """
+    plan_sections, plan_fields, positions = _summary_plan(sections, fields, cursor)
+    ndjson = format == "ndjson"
+    if limit is not None and not ndjson:
+        return await _shared_report(
+            "sla.summary", _sla_summary_page, days=days, sections=plan_sections,
+            fields=plan_fields, positions=positions, limit=limit
+        )
+
+    async def body() -> AsyncIterator[str]:
+        # Sessão própria: a resposta continua sendo gerada depois do retorno da rota e é
+        # compartilhada com as requisições simultâneas de mesmos parâmetros
+        async with open_read_session() as session:
+            try:
+                async for chunk in _summary_chunks(session, days, plan_sections, plan_fields, positions, limit, ndjson):
+                    yield chunk
+            except Exception as e:
+                # O status 200 já foi enviado: a conexão é encerrada com o JSON incompleto
+                print(f"⚠️ Falha ao transmitir o resumo de SLA: {e}")
+                raise
+
+    key = request_flight.key(
+        "sla.summary.stream", days=days, sections=plan_sections, fields=plan_fields,
+        positions=positions, limit=limit, ndjson=ndjson
+    )
+    return StreamingResponse(
+        stream_flight.stream(key, body), media_type="application/x-ndjson" if ndjson else "application/json"
+    )
+
+
+async def _sla_summary_page(session: AsyncSession, days: int, sections, fields, positions, limit: int) -> bytes:
     try:
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        # Buscar dados básicos dos endpoints
-        endpoints = session.query(EndPoints).all()
-        
-        # Buscar métricas SLA
-        sla_metrics = session.query(SLAMetrics).filter(
-            SLAMetrics.timestamp >= cutoff_date
-        ).all()
-        
-        # Buscar incidentes
-        incidents = session.query(IncidentTracking).filter(
-            IncidentTracking.start_time >= cutoff_date
-        ).all()
-        
-        # Buscar dados de performance
-        performance_data = session.query(EndPointsData).filter(
-            EndPointsData.last_updated >= cutoff_date
-        ).order_by(EndPointsData.last_updated.desc()).all()
-        
-        # Buscar alertas
-        alerts = session.query(Alerts).filter(
-            Alerts.created_at >= cutoff_date
-        ).all()
-        
-        return {
-            "status": "success",
-            "data": {
-                "endpoints": [
-                    {
-                        "id": ep.id,
-                        "ip": ep.ip,
-                        "nickname": ep.nickname,
-                        "interval": ep.interval
-                    } for ep in endpoints
-                ],
-                "sla_metrics": [
-                    {
-                        "id": sla.id,
-                        "endpoint_id": sla.endpoint_id,
-                        "timestamp": sla.timestamp.isoformat(),
-                        "availability_percentage": sla.availability_percentage,
-                        "uptime_seconds": sla.uptime_seconds,
-                        "downtime_seconds": sla.downtime_seconds,
-                        "mttr_minutes": sla.mttr_minutes,
-                        "incidents_count": sla.incidents_count,
-                        "sla_target": sla.sla_target,
-                        "sla_compliance": sla.sla_compliance,
-                        "avg_response_time": sla.avg_response_time
-                    } for sla in sla_metrics
-                ],
-                "incidents": [
-                    {
-                        "id": inc.id,
-                        "endpoint_id": inc.endpoint_id,
-                        "incident_type": inc.incident_type,
-                        "severity": inc.severity,
-                        "status": inc.status,
-                        "start_time": inc.start_time.isoformat(),
-                        "end_time": inc.end_time.isoformat() if inc.end_time else None,
-                        "duration_seconds": inc.duration_seconds,
-                        "resolution_time_minutes": inc.resolution_time_minutes,
-                        "impact_description": inc.impact_description
-                    } for inc in incidents
-                ],
-                "performance_data": [
-                    {
-                        "id": pd.id,
-                        "endpoint_id": pd.id_end_point,
-                        "timestamp": pd.last_updated.isoformat(),
-                        "status": pd.status,
-                        "ping_rtt": pd.ping_rtt,
-                        "snmp_rtt": pd.snmp_rtt,
-                        "cpu_load": pd.hrProcessorLoad,
-                        "memory_total": pd.memTotalReal,
-                        "memory_avail": pd.memAvailReal
-                    } for pd in performance_data
-                ],
-                "alerts": [
-                    {
-                        "id": alert.id,
-                        "endpoint_id": alert.id_endpoint,
-                        "title": alert.title,
-                        "severity": alert.severity,
-                        "category": alert.category,
-                        "status": alert.status,
-                        "created_at": alert.created_at.isoformat(),
-                        "resolved_at": alert.resolved_at.isoformat() if alert.resolved_at else None
-                    } for alert in alerts
-                ],
-                "summary": {
-                    "period_days": days,
-                    "total_endpoints": len(endpoints),
-                    "total_incidents": len(incidents),
-                    "total_alerts": len(alerts),
-                    "analysis_start_date": cutoff_date.isoformat(),
-                    "analysis_end_date": datetime.now().isoformat()
-                }
-            }
-        }
-        
+        chunks = [chunk async for chunk in _summary_chunks(session, days, sections, fields, positions, limit, False)]
+        return "".join(chunks).encode()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar dados de SLA: {str(e)}")
-    finally:
-        session.close()
 
 
 @sla_router.get("/endpoint/{endpoint_id}")
 async def get_endpoint_sla_details(
     endpoint_id: int,
-    days: int = Query(30, description="Número de dias para análise"),
-    session: Session = Depends(init_session)
+    days: int = Query(30, description="Número de dias para análise")
 ):
     """
     Retorna dados detalhados de SLA para um endpoint específico.
     """
+    return await _shared_report("sla.endpoint", _endpoint_sla_details, endpoint_id=endpoint_id, days=days)
+
+
+async def _endpoint_sla_details(session: AsyncSession, endpoint_id: int, days: int) -> dict:
     try:
         cutoff_date = datetime.now() - timedelta(days=days)
         
         # Verificar se endpoint existe
-        endpoint = session.query(EndPoints).filter(EndPoints.id == endpoint_id).first()
+        endpoint = await session.get(EndPoints, endpoint_id)
         if not endpoint:
             raise HTTPException(status_code=404, detail="Endpoint não encontrado")
         
         # Buscar métricas SLA específicas
-        sla_metrics = session.query(SLAMetrics).filter(
+        sla_metrics = (await session.scalars(select(SLAMetrics).where(
             and_(
                 SLAMetrics.endpoint_id == endpoint_id,
                 SLAMetrics.timestamp >= cutoff_date
             )
-        ).order_by(SLAMetrics.timestamp.desc()).all()
+        ).order_by(SLAMetrics.timestamp.desc()))).all()
         
         # Buscar incidentes específicos
-        incidents = session.query(IncidentTracking).filter(
+        incidents = (await session.scalars(select(IncidentTracking).where(
             and_(
                 IncidentTracking.endpoint_id == endpoint_id,
                 IncidentTracking.start_time >= cutoff_date
             )
-        ).order_by(IncidentTracking.start_time.desc()).all()
+        ).order_by(IncidentTracking.start_time.desc()))).all()
         
         # Buscar métricas de performance específicas
-        performance_metrics = session.query(PerformanceMetrics).filter(
+        performance_metrics = (await session.scalars(select(PerformanceMetrics).where(
             and_(
                 PerformanceMetrics.endpoint_id == endpoint_id,
                 PerformanceMetrics.timestamp >= cutoff_date
             )
-        ).order_by(PerformanceMetrics.timestamp.desc()).all()
+        ).order_by(PerformanceMetrics.timestamp.desc()))).all()
         
         # Buscar dados brutos de monitoramento
-        raw_data = session.query(EndPointsData).filter(
+        raw_data = (await session.scalars(select(EndPointsData).where(
             and_(
                 EndPointsData.id_end_point == endpoint_id,
                 EndPointsData.last_updated >= cutoff_date
             )
-        ).order_by(EndPointsData.last_updated.desc()).limit(1000).all()
+        ).order_by(EndPointsData.last_updated.desc()).limit(1000))).all()
         
         return {
             "status": "success",
@@ -244,34 +537,34 @@ async def get_endpoint_sla_details(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar detalhes de SLA: {str(e)}")
-    finally:
-        session.close()
 
 
 @sla_router.get("/compliance")
-async def get_sla_compliance_report(
-    session: Session = Depends(init_session)
-):
+async def get_sla_compliance_report():
     """
     Retorna relatório de compliance de SLA de todos os endpoints.
     """
+    return await _shared_report("sla.compliance", _sla_compliance_report)
+
+
+async def _sla_compliance_report(session: AsyncSession) -> dict:
     try:
         # Buscar últimas métricas de cada endpoint
-        latest_sla = session.query(
+        latest_sla = select(
             SLAMetrics.endpoint_id,
             func.max(SLAMetrics.timestamp).label('latest_timestamp')
         ).group_by(SLAMetrics.endpoint_id).subquery()
         
-        current_sla_metrics = session.query(SLAMetrics).join(
+        current_sla_metrics = (await session.scalars(select(SLAMetrics).join(
             latest_sla,
             and_(
                 SLAMetrics.endpoint_id == latest_sla.c.endpoint_id,
                 SLAMetrics.timestamp == latest_sla.c.latest_timestamp
             )
-        ).all()
+        ))).all()
         
         # Buscar informações dos endpoints
-        endpoints = session.query(EndPoints).all()
+        endpoints = (await session.scalars(select(EndPoints))).all()
         endpoint_dict = {ep.id: ep for ep in endpoints}
         
         compliance_data = []
@@ -312,8 +605,6 @@ async def get_sla_compliance_report(
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao gerar relatório de compliance: {str(e)}")
-    finally:
-        session.close()
 
 
 @sla_router.get("/incidents/summary")
@@ -321,27 +612,30 @@ async def get_incidents_summary(
     days: int = Query(30, description="Número de dias para análise"),
     status: Optional[str] = Query(None, description="Filtrar por status"),
     severity: Optional[str] = Query(None, description="Filtrar por severidade"),
-    session: Session = Depends(init_session),
-    current_user = Depends(verify_token)
+    current_user = Depends(verify_token_short_session)
 ):
     """
     Retorna resumo de incidentes para análise.
     """
+    return await _shared_report("sla.incidents", _incidents_summary, days=days, status=status, severity=severity)
+
+
+async def _incidents_summary(session: AsyncSession, days: int, status: Optional[str], severity: Optional[str]) -> dict:
     try:
         cutoff_date = datetime.now() - timedelta(days=days)
         
         # Construir query base
-        query = session.query(IncidentTracking).filter(
+        query = select(IncidentTracking).where(
             IncidentTracking.start_time >= cutoff_date
         )
         
         # Aplicar filtros opcionais
         if status:
-            query = query.filter(IncidentTracking.status == status)
+            query = query.where(IncidentTracking.status == status)
         if severity:
-            query = query.filter(IncidentTracking.severity == severity)
+            query = query.where(IncidentTracking.severity == severity)
             
-        incidents = query.order_by(IncidentTracking.start_time.desc()).all()
+        incidents = (await session.scalars(query.order_by(IncidentTracking.start_time.desc()))).all()
         
         # Estatísticas
         total_incidents = len(incidents)
@@ -393,32 +687,33 @@ async def get_incidents_summary(
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar resumo de incidentes: {str(e)}")
-    finally:
-        session.close()
 
 
 @sla_router.get("/performance-metrics")
 async def get_performance_metrics(
     endpoint_id: Optional[int] = Query(None, description="ID do endpoint específico"),
     days: int = Query(7, description="Número de dias para análise"),
-    session: Session = Depends(init_session),
-    current_user = Depends(verify_token)
+    current_user = Depends(verify_token_short_session)
 ):
     """
     Retorna métricas de performance detalhadas.
     """
+    return await _shared_report("sla.performance", _performance_metrics, endpoint_id=endpoint_id, days=days)
+
+
+async def _performance_metrics(session: AsyncSession, endpoint_id: Optional[int], days: int) -> dict:
     try:
         cutoff_date = datetime.now() - timedelta(days=days)
         
         # Construir query base
-        query = session.query(PerformanceMetrics).filter(
+        query = select(PerformanceMetrics).where(
             PerformanceMetrics.timestamp >= cutoff_date
         )
         
         if endpoint_id:
-            query = query.filter(PerformanceMetrics.endpoint_id == endpoint_id)
+            query = query.where(PerformanceMetrics.endpoint_id == endpoint_id)
             
-        performance_metrics = query.order_by(PerformanceMetrics.timestamp.desc()).all()
+        performance_metrics = (await session.scalars(query.order_by(PerformanceMetrics.timestamp.desc()))).all()
         
         return {
             "status": "success",
@@ -465,5 +760,3 @@ async def get_performance_metrics(
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar métricas de performance: {str(e)}")
-    finally:
-        session.close()
@@ -0,0 +1,85 @@
+import os
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from api.models import Users
+from api.dependencies import verify_token_short_session
+from api.events import event_broker, status_watcher
+
+
+
+# Intervalo (segundos) dos comentários de keep-alive enviados a clientes sem eventos
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", 15))
+
+# Tempo (ms) que o navegador espera antes de reconectar (campo retry do SSE)
+STREAM_RETRY_MS = int(os.getenv("STREAM_RETRY_MS", 3000))
+
+# Tópicos aceitos em topics= (também como prefixo: "alert" recebe todos os eventos de alerta)
+STREAM_TOPICS = {
+    "alert", "alert.created", "alert.reopened", "alert.updated", "alert.acknowledged",
+    "alert.resolved", "alert.assigned", "alert.deleted",
+    "endpoint", "endpoint.status", "endpoint.active",
+}
+
+stream_router = APIRouter(prefix="/stream", tags=["stream"])
+
+
+@stream_router.get("/events")
+async def stream_events(
+    request: Request,
+    topics: Optional[List[str]] = Query(None, description="Tópicos: alert, endpoint ou eventos específicos (ex.: alert.resolved)"),
+    logged_user: Users = Depends(verify_token_short_session)
+):
+    """
+    Stream Server-Sent Events com as alterações de alertas (alert.created, alert.reopened,
+    alert.updated, alert.acknowledged, alert.resolved, alert.assigned, alert.deleted) e de
+    endpoints (endpoint.status, endpoint.active), publicadas assim que acontecem.
+    Cada evento traz o mesmo conteúdo JSON enviado aos webhooks. O cliente deve carregar o
+    estado completo (/alerts/, /monitor/status) ao conectar e aplicar os eventos em seguida;
+    um cliente que não acompanha o ritmo recebe o evento "dropped" e é desconectado.
+    """
+    topics = sorted({topic for value in topics or [] for topic in value.split(",") if topic})
+    invalid = [topic for topic in topics if topic not in STREAM_TOPICS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Tópico inválido: {', '.join(invalid)}")
+
+    subscription = event_broker.subscribe(topics or None)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Limite de clientes do stream atingido")
+
+    async def events():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n: conectado\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    yield "event: dropped\ndata: {}\n\n"
+                    break
+                yield message
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # Desativa o buffer de proxies (nginx), que atrasaria os eventos
+        "X-Accel-Buffering": "no",
+    })
+
+
+@stream_router.get("/status")
+async def stream_status(logged_user: Users = Depends(verify_token_short_session)):
+    """
+    Retorna os contadores do stream deste processo (clientes, eventos publicados e
+    clientes desconectados por lentidão) e do leitor de mudanças de status.
+    Requer permissão de ADMIN.
+    """
+    if logged_user.access_level != "ADMIN":
+        raise HTTPException(status_code=403, detail="Operação não permitida: requer nível ADMIN")
+    return {**event_broker.snapshot(), "watcher": status_watcher.snapshot()}
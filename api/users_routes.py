@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, func, select
 from typing import Optional
 from math import ceil
 from datetime import datetime
 
 from api.models import Users
-from api.dependencies import init_session, verify_token
+from api.cache import stats_cache
+from api.pagination import apply_keyset, next_cursor, count_rows
+from api.dependencies import init_session, init_read_session, verify_token
 from api.encryption import bcrypt_context
 from api.schemas import (
     UserResponseSchemas, 
@@ -20,23 +23,36 @@ from api.schemas import (
 
 users_router = APIRouter(prefix="/users", tags=["users"], dependencies=[Depends(verify_token)])
 
+# Chave da paginação por cursor dos usuários
+USER_KEYSET = (Users.id,)
 
-def get_user_stats(session: Session) -> UserStatsSchemas:
-    """Calcula as estatísticas dos usuários."""
-    total_users = session.query(Users).count()
-    admins = session.query(Users).filter(Users.access_level == "ADMIN").count()
-    monitors = session.query(Users).filter(Users.access_level == "MONITOR").count()
-    viewers = session.query(Users).filter(Users.access_level == "VIEWER").count()
-    active_users = session.query(Users).filter(Users.state == True).count()
-    inactive_users = session.query(Users).filter(Users.state == False).count()
+
+async def get_user_stats(session: AsyncSession) -> UserStatsSchemas:
+    """
+    Retorna as estatísticas dos usuários.
+    O resultado fica em cache até a próxima alteração de usuários (ou o fim do TTL).
+    """
+    return await stats_cache.get_or_compute("users", "stats", lambda: _compute_user_stats(session))
+
+
+async def _compute_user_stats(session: AsyncSession) -> UserStatsSchemas:
+    """Calcula as estatísticas dos usuários em uma única consulta."""
+    stats = (await session.execute(select(
+        func.count().label("total_users"),
+        func.count().filter(Users.access_level == "ADMIN").label("admins"),
+        func.count().filter(Users.access_level == "MONITOR").label("monitors"),
+        func.count().filter(Users.access_level == "VIEWER").label("viewers"),
+        func.count().filter(Users.state == True).label("active_users"),
+        func.count().filter(Users.state == False).label("inactive_users")
+    ).select_from(Users))).one()
     
     return UserStatsSchemas(
-        total_users=total_users,
-        admins=admins,
-        monitors=monitors,
-        viewers=viewers,
-        active_users=active_users,
-        inactive_users=inactive_users
+        total_users=stats.total_users,
+        admins=stats.admins,
+        monitors=stats.monitors,
+        viewers=stats.viewers,
+        active_users=stats.active_users,
+        inactive_users=stats.inactive_users
     )
 
 
@@ -53,11 +69,14 @@ async def list_users(
     search: Optional[str] = Query(None, description="Buscar por nome ou email"),
     status: Optional[str] = Query(None, description="Filtrar por status: active, inactive"),
     access_level: Optional[str] = Query(None, description="Filtrar por nível de acesso: ADMIN, MONITOR, VIEWER"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (next_cursor); substitui page"),
+    count: str = Query("exact", description="Contagem do total: exact, estimated ou none"),
     current_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Lista todos os usuários com paginação e filtros.
+    Aceita paginação por page/limit ou por cursor (ordenado por id).
     
     Permissões:
     - ADMIN: Visualiza todos os usuários
@@ -65,7 +84,7 @@ async def list_users(
     """
     
     # Query base
-    query = session.query(Users)
+    query = select(Users)
     
     # Aplicar filtros baseados no nível de acesso do usuário logado
     if current_user.access_level != "ADMIN":
@@ -97,24 +116,34 @@ async def list_users(
             raise HTTPException(status_code=400, detail="Invalid access level")
     
     # Contar total de registros
-    total = query.count()
+    total, total_is_estimate = await count_rows(
+        session, query, count, "users",
+        cache_key=(current_user.access_level == "ADMIN", search, status, access_level),
+        filtered=bool(search or status or access_level) or current_user.access_level != "ADMIN"
+    )
     
     # Calcular número de páginas
-    pages = ceil(total / limit) if total > 0 else 1
+    pages = (ceil(total / limit) if total > 0 else 1) if total is not None else None
     
-    # Aplicar paginação
-    offset = (page - 1) * limit
-    users = query.offset(offset).limit(limit).all()
+    # Aplicar paginação (uma linha extra indica se há próxima página)
+    query = apply_keyset(query, USER_KEYSET, descending=False, cursor=cursor)
+    if not cursor:
+        query = query.offset((page - 1) * limit)
+    users = (await session.scalars(query.limit(limit + 1))).all()
+    cursor_out = next_cursor(users, USER_KEYSET, limit)
+    users = users[:limit]
     
     # Obter estatísticas
-    stats = get_user_stats(session)
+    stats = await get_user_stats(session)
     
     return UserListResponse(
         users=[UserResponseSchemas.model_validate(user) for user in users],
         total=total,
         page=page,
         pages=pages,
-        stats=stats
+        stats=stats,
+        total_is_estimate=total_is_estimate,
+        next_cursor=cursor_out
     )
 
 
@@ -122,7 +151,7 @@ async def list_users(
 async def create_user(
     user_data: UserCreateSchemas,
     current_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Cria um novo usuário.
@@ -139,12 +168,12 @@ async def create_user(
         raise HTTPException(status_code=400, detail="Invalid access level")
     
     # Verificar se email já existe
-    existing_user = session.query(Users).filter(Users.email == user_data.email).first()
+    existing_user = (await session.scalars(select(Users).where(Users.email == user_data.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Criptografar senha
-    hashed_password = bcrypt_context.hash(user_data.password)
+    # Criptografar senha (fora do event loop)
+    hashed_password = await run_in_threadpool(bcrypt_context.hash, user_data.password)
     
     # Criar novo usuário
     new_user = Users(
@@ -158,8 +187,9 @@ async def create_user(
     )
     
     session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    await session.commit()
+    stats_cache.invalidate("users")
+    await session.refresh(new_user)
     
     return {
         "message": "Usuário criado com sucesso",
@@ -171,7 +201,7 @@ async def create_user(
 async def get_user(
     user_id: int,
     current_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Obtém um usuário específico pelo ID.
@@ -182,7 +212,7 @@ async def get_user(
     """
     
     # Verificar se o usuário existe
-    user = session.query(Users).filter(Users.id == user_id).first()
+    user = await session.get(Users, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -198,7 +228,7 @@ async def update_user(
     user_id: int,
     user_data: UserUpdateSchemas,
     current_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Atualiza um usuário existente.
@@ -209,7 +239,7 @@ async def update_user(
     """
     
     # Verificar se o usuário existe
-    user = session.query(Users).filter(Users.id == user_id).first()
+    user = await session.get(Users, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -232,7 +262,7 @@ async def update_user(
     
     # Verificar email único se alterado
     if user_data.email is not None and user_data.email != user.email:
-        existing_user = session.query(Users).filter(Users.email == user_data.email).first()
+        existing_user = (await session.scalars(select(Users).where(Users.email == user_data.email))).first()
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -242,12 +272,13 @@ async def update_user(
     for field, value in update_data.items():
         if field == "password" and value is not None:
             # Criptografar nova senha
-            setattr(user, field, bcrypt_context.hash(value))
+            setattr(user, field, await run_in_threadpool(bcrypt_context.hash, value))
         else:
             setattr(user, field, value)
     
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    stats_cache.invalidate("users")
+    await session.refresh(user)
     
     return {
         "message": "Usuário atualizado com sucesso",
@@ -259,7 +290,7 @@ async def update_user(
 async def delete_user(
     user_id: int,
     current_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Exclui um usuário.
@@ -271,7 +302,7 @@ async def delete_user(
     check_admin_permission(current_user)
     
     # Verificar se o usuário existe
-    user = session.query(Users).filter(Users.id == user_id).first()
+    user = await session.get(Users, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -281,15 +312,18 @@ async def delete_user(
     
     # Verificar se não é o último admin
     if user.access_level == "ADMIN":
-        admin_count = session.query(Users).filter(Users.access_level == "ADMIN").count()
+        admin_count = await session.scalar(
+            select(func.count()).select_from(Users).where(Users.access_level == "ADMIN")
+        )
         if admin_count <= 1:
             raise HTTPException(
                 status_code=409, 
                 detail="Cannot delete the last administrator"
             )
     
-    session.delete(user)
-    session.commit()
+    await session.delete(user)
+    await session.commit()
+    stats_cache.invalidate("users")
     
     return {"message": "Usuário excluído com sucesso"}
 
@@ -299,7 +333,7 @@ async def update_user_status(
     user_id: int,
     status_data: UserStatusUpdateSchemas,
     current_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_session)
 ):
     """
     Altera o status (ativo/inativo) de um usuário.
@@ -311,7 +345,7 @@ async def update_user_status(
     check_admin_permission(current_user)
     
     # Verificar se o usuário existe
-    user = session.query(Users).filter(Users.id == user_id).first()
+    user = await session.get(Users, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -321,10 +355,10 @@ async def update_user_status(
     
     # Verificar se não é o último admin ativo
     if (user.access_level == "ADMIN" and user.state and not status_data.state):
-        active_admin_count = session.query(Users).filter(
+        active_admin_count = await session.scalar(select(func.count()).select_from(Users).where(
             Users.access_level == "ADMIN",
             Users.state == True
-        ).count()
+        ))
         if active_admin_count <= 1:
             raise HTTPException(
                 status_code=409, 
@@ -332,8 +366,9 @@ async def update_user_status(
             )
     
     user.state = status_data.state
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    stats_cache.invalidate("users")
+    await session.refresh(user)
     
     return {
         "message": "Status do usuário atualizado com sucesso",
@@ -348,7 +383,7 @@ async def update_user_status(
 @users_router.get("/stats/summary", response_model=UserStatsSchemas)
 async def get_users_stats(
     current_user: Users = Depends(verify_token),
-    session: Session = Depends(init_session)
+    session: AsyncSession = Depends(init_read_session)
 ):
     """
     Obtém estatísticas dos usuários.
@@ -356,4 +391,4 @@ async def get_users_stats(
     Permissões: Todos os usuários logados
     """
     
-    return get_user_stats(session)
+    return await get_user_stats(session)
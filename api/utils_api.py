@@ -77,7 +77,7 @@ def valid_end_point(end_point: AddEndPointRequest) -> bool:
             raise HTTPException(status_code=400, detail="Comunidade inválida")
         if end_point.port is None or end_point.port <= 0:
             raise HTTPException(status_code=400, detail="Porta inválida")
-        if not check_oids(end_point):
+        if not end_point.id_oid_profile and not check_oids(end_point):
             raise HTTPException(status_code=400, detail="OIDs inválidos")
         return True
 
@@ -87,7 +87,7 @@ def valid_end_point(end_point: AddEndPointRequest) -> bool:
             raise HTTPException(status_code=400, detail="Porta inválida")
         if end_point.user is None or end_point.user.strip() == "":
             raise HTTPException(status_code=400, detail="Usuário inválido")
-        if not check_oids(end_point):
+        if not end_point.id_oid_profile and not check_oids(end_point):
             raise HTTPException(status_code=400, detail="OIDs inválidos")
         return True
 
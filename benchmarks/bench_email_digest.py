@@ -0,0 +1,173 @@
+"""
+Benchmark do canal de email com resumo (EmailDigestChannel, api/notifications.py).
+
+Sobe um servidor SMTP local (aiosmtpd, com AUTH e latência por comando) e simula uma
+tempestade de alertas para alguns destinatários, medindo:
+- envio ingênuo: uma conexão, login e email por alerta e destinatário;
+- EmailDigestChannel: um resumo por destinatário na mesma conexão autenticada.
+Informa tempo, conexões, logins e emails recebidos pelo servidor, e confere a
+reconexão depois que o servidor derruba a conexão ociosa.
+
+Requer aiosmtpd (apenas para o benchmark): pip install aiosmtpd
+
+Uso:
+    python benchmarks/bench_email_digest.py [--alerts 300] [--recipients 3] [--latency-ms 2]
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import sys
+import logging
+import time
+from email.message import EmailMessage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+except ImportError:
+    sys.exit("aiosmtpd não instalado: pip install aiosmtpd")
+
+
+USER, PASSWORD = "alertas@infrawatch.local", "segredo"
+
+
+class StandIn:
+    """Servidor SMTP local: conta conexões, logins e mensagens."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+        self.servers = []
+
+    def drop_connections(self, controller: Controller):
+        """Fecha, do lado do servidor, as conexões abertas."""
+        for server in self.servers:
+            if server.transport is not None:
+                controller.loop.call_soon_threadsafe(server.transport.close)
+
+    def reset(self):
+        self.connections = self.logins = 0
+        self.messages = []
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        ok = auth_data.login == USER.encode() and auth_data.password == PASSWORD.encode()
+        if ok:
+            self.logins += 1
+        return AuthResult(success=ok)
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        if server not in self.servers:
+            self.servers.append(server)
+            self.connections += 1
+        await asyncio.sleep(self.latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        self.messages.append((envelope.rcpt_tos, envelope.content))
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stand_in(stand_in: StandIn, port: int) -> Controller:
+    controller = Controller(
+        stand_in, hostname="127.0.0.1", port=port,
+        authenticator=stand_in.authenticate, auth_require_tls=False,
+    )
+    controller.start()
+    return controller
+
+
+def events(count: int) -> list:
+    return [
+        {"event": "alert.created", "alert": {
+            "id": i, "title": f"CPU alta em srv-{i}", "severity": "high", "system": f"srv-{i}",
+            "description": "Uso de CPU acima de 90%", "created_at": "2025-01-01T00:00:00",
+        }}
+        for i in range(count)
+    ]
+
+
+def naive_send(port: int, recipients: list, alerts: list):
+    """Abre conexão e faz login para cada alerta de cada destinatário."""
+    for event in alerts:
+        for recipient in recipients:
+            message = EmailMessage()
+            message["From"], message["To"] = USER, recipient
+            message["Subject"] = f"[InfraWatch] Alerta {event['alert']['title']}"
+            message.set_content(event["alert"]["description"])
+            with smtplib.SMTP("127.0.0.1", port, timeout=30) as smtp:
+                smtp.login(USER, PASSWORD)
+                smtp.send_message(message)
+
+
+async def main_async(args):
+    from api.notifications import EmailDigestChannel, SMTPSettings
+
+    stand_in = StandIn(args.latency_ms / 1000)
+    port = free_port()
+    controller = start_stand_in(stand_in, port)
+    recipients = [f"ops{i}@infrawatch.local" for i in range(args.recipients)]
+    alerts = events(args.alerts)
+    try:
+        naive_alerts = alerts[:min(args.alerts, 100)]
+        start = time.perf_counter()
+        await asyncio.to_thread(naive_send, port, recipients, naive_alerts)
+        elapsed = time.perf_counter() - start
+        per_alert = elapsed / len(naive_alerts)
+        print(f"{'ingênuo (login por email)':<28} {len(naive_alerts)} alertas em {elapsed:6.2f}s  "
+              f"(estimado p/ {args.alerts}: {per_alert * args.alerts:6.2f}s)  conexões={stand_in.connections}  "
+              f"logins={stand_in.logins}  emails={len(stand_in.messages)}")
+
+        stand_in.reset()
+        channel = EmailDigestChannel(window=3600, idle_timeout=60, timeout=30)
+        channel.start()
+        settings = SMTPSettings("127.0.0.1", port, USER, PASSWORD)
+        start = time.perf_counter()
+        for event in alerts:
+            channel.add(settings, recipients, [event])
+        await channel.flush()
+        elapsed = time.perf_counter() - start
+        print(f"{'EmailDigestChannel':<28} {args.alerts} alertas em {elapsed:6.2f}s  "
+              f"conexões={stand_in.connections}  logins={stand_in.logins}  emails={len(stand_in.messages)}  "
+              f"digests={channel.counters['digests']}")
+
+        # Conexão derrubada entre lotes: o próximo lote deve reconectar e entregar
+        stand_in.drop_connections(controller)
+        await asyncio.sleep(0.1)
+        stand_in.reset()
+        channel.add(settings, recipients, alerts[:1])
+        await channel.flush()
+        print(f"{'após queda da conexão':<28} conexões={stand_in.connections}  logins={stand_in.logins}  "
+              f"emails={len(stand_in.messages)}  falhas={channel.counters['failed']}")
+        await channel.stop()
+    finally:
+        controller.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=300, help="Alertas na tempestade")
+    parser.add_argument("--recipients", type=int, default=3, help="Destinatários")
+    parser.add_argument("--latency-ms", type=float, default=2, help="Latência do servidor SMTP por comando")
+    args = parser.parse_args()
+    # aiosmtpd registra um aviso de API interna obsoleta a cada login
+    logging.getLogger("mail.log").setLevel(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
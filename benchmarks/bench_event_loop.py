@@ -0,0 +1,206 @@
+"""
+Benchmark de concorrência do event loop da API.
+
+Sobe a API com uvicorn em um banco SQLite populado e mede a latência do health check (/)
+em repouso e enquanto várias requisições pesadas de /sla/summary rodam em paralelo.
+Com as sessões assíncronas o p99 de / deve permanecer praticamente estável.
+
+Uso:
+    python benchmarks/bench_event_loop.py [--rows 50000] [--heavy 8] [--samples 400]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def seed_database(db_path: str, rows: int):
+    """Popula um banco SQLite com endpoints, dados de monitoramento, alertas e métricas de SLA."""
+    os.environ["DATABASE_URL"] = ""
+    os.environ["SQLITE_DATABASE_URL"] = f"sqlite:///{db_path}"
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+    from api.models import Base, db, Users, EndPoints, EndPointsData, Alerts, SLAMetrics
+    from api.encryption import bcrypt_context
+
+    Base.metadata.create_all(db)
+    now = datetime.now()
+    with Session(db) as session:
+        session.add(Users("bench", "bench@local", bcrypt_context.hash("bench"), True, None, "ADMIN", None))
+        session.flush()
+        session.bulk_insert_mappings(EndPoints, [
+            {"ip": f"10.0.{i // 250}.{i % 250}", "nickname": f"bench-{i}", "interval": 60, "active": True, "id_user": 1}
+            for i in range(50)
+        ])
+        endpoint_ids = session.scalars(select(EndPoints.id)).all()
+        session.bulk_insert_mappings(EndPointsData, [
+            {
+                "id_end_point": endpoint_ids[i % 50],
+                "status": True,
+                "sysDescr": "Linux bench",
+                "sysName": f"bench-{i % 50}",
+                "sysUpTime": "1000",
+                "hrProcessorLoad": str(random.randint(0, 100)),
+                "memTotalReal": "8000000",
+                "memAvailReal": str(random.randint(0, 8000000)),
+                "hrStorageSize": "1000",
+                "hrStorageUsed": "500",
+                "hrStorageDescr": "/",
+                "ifOperStatus": "1",
+                "ifInOctets": "1",
+                "ifOutOctets": "1",
+                "ping_rtt": str(random.random()),
+                "snmp_rtt": str(random.random()),
+                "last_updated": now - timedelta(seconds=i * 10),
+            }
+            for i in range(rows)
+        ])
+        session.bulk_insert_mappings(Alerts, [
+            {
+                "title": f"Alerta {i}",
+                "severity": random.choice(["critical", "high", "medium", "low"]),
+                "status": random.choice(["active", "acknowledged", "resolved"]),
+                "category": random.choice(["infrastructure", "performance", "network"]),
+                "system": f"bench-{i % 50}",
+                "impact": "medium",
+                "id_user_created": 1,
+                "created_at": now - timedelta(minutes=i),
+            }
+            for i in range(rows // 10)
+        ])
+        session.bulk_insert_mappings(SLAMetrics, [
+            {
+                "endpoint_id": endpoint_ids[i % 50],
+                "timestamp": now - timedelta(hours=i),
+                "availability_percentage": 99.0,
+                "uptime_seconds": 3600,
+                "downtime_seconds": 0,
+                "mttr_minutes": 0,
+                "mtbf_hours": 0,
+                "incidents_count": 0,
+                "sla_target": 99.9,
+                "sla_compliance": False,
+                "avg_response_time": 1.0,
+                "max_response_time": 2.0,
+                "min_response_time": 0.5,
+            }
+            for i in range(rows // 10)
+        ])
+        session.commit()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as client:
+        while time.monotonic() < deadline:
+            try:
+                async with client.get(base_url + "/") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("API não respondeu a tempo")
+
+
+async def sample_health(client: aiohttp.ClientSession, base_url: str, samples: int):
+    """Mede a latência (ms) de / em requisições sequenciais."""
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        async with client.get(base_url + "/") as response:
+            await response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def heavy_load(client: aiohttp.ClientSession, base_url: str, headers: dict, stop: asyncio.Event, counter: list):
+    """Dispara /sla/summary continuamente até o evento de parada."""
+    while not stop.is_set():
+        async with client.get(base_url + "/sla/summary", params={"days": 365}, headers=headers) as response:
+            await response.read()
+            counter.append(response.status)
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label: str, latencies):
+    print(f"{label:<28} p50={statistics.median(latencies):7.2f}ms  "
+          f"p99={percentile(latencies, 99):7.2f}ms  max={max(latencies):7.2f}ms")
+
+
+async def run(base_url: str, token: str, heavy: int, samples: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    await wait_ready(base_url)
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300)) as client:
+        idle = await sample_health(client, base_url, samples)
+
+        stop = asyncio.Event()
+        completed = []
+        workers = [asyncio.create_task(heavy_load(client, base_url, headers, stop, completed)) for _ in range(heavy)]
+        await asyncio.sleep(0.5)
+        start = time.perf_counter()
+        loaded = await sample_health(client, base_url, samples)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*workers)
+
+    report("/ em repouso", idle)
+    report(f"/ com {heavy}x /sla/summary", loaded)
+    print(f"/sla/summary concluídas durante a medição: {len(completed)} em {elapsed:.1f}s "
+          f"(status {sorted(set(completed))})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="Linhas de EndPointsData a gerar")
+    parser.add_argument("--heavy", type=int, default=8, help="Requisições /sla/summary simultâneas")
+    parser.add_argument("--samples", type=int, default=400, help="Amostras de latência de /")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="infrawatch-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    print(f"Populando {db_path} com {args.rows} registros...")
+    seed_database(db_path, args.rows)
+
+    from api.auth_routes import create_token
+    token = create_token(1)
+
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL="", SQLITE_DATABASE_URL=f"sqlite:///{db_path}", SLA_ENGINE_INTERVAL="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        asyncio.run(run(f"http://127.0.0.1:{port}", token, args.heavy, args.samples))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark do despachante de notificações (api/notifications.py).
+
+Sobe um servidor HTTP local (aiohttp) que simula um webhook com latência fixa e uma
+fração de respostas 503, e mede entregas/s:
+- sequencial, uma conexão nova por entrega (requests.post, como seria feito de forma
+  síncrona dentro da rota);
+- NotificationDispatcher com a sessão compartilhada, para alguns números de workers.
+Também informa quantas conexões TCP o servidor recebeu (reuso de keep-alive) e as
+tentativas repetidas pelo backoff.
+
+Por fim simula uma tempestade de --storm alertas para um webhook com lote, limite de
+concorrência e token bucket (WebHookConfig.batch_size/max_concurrency/rate_limit),
+informando requisições recebidas, pico de requisições simultâneas e duração.
+
+Uso:
+    python benchmarks/bench_notifications.py [--deliveries 5000] [--latency-ms 5] [--fail-rate 0.05] [--storm 1000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import requests
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class StandIn:
+    """Webhook local: conta requisições e conexões e falha uma fração das chamadas."""
+
+    def __init__(self, latency: float, fail_rate: float):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.items = 0
+        self.active = 0
+        self.peak = 0
+        self.peers = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.peers.add(request.transport.get_extra_info("peername"))
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        if random.random() < self.fail_rate:
+            return web.Response(status=503)
+        self.items += len(body) if isinstance(body, list) else 1
+        return web.json_response({"ok": True})
+
+
+async def start_stand_in(stand_in: StandIn):
+    app = web.Application()
+    app.router.add_post("/hook", stand_in.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/hook"
+
+
+def payload(i: int) -> dict:
+    return {"event": "alert.created", "alert": {"id": i, "title": f"Alerta {i}", "severity": "high"}}
+
+
+async def run_sequential(url: str, deliveries: int) -> float:
+    """Uma requisição por vez, conexão nova a cada entrega, sem repetição."""
+    def send_all():
+        for i in range(deliveries):
+            requests.post(url, json=payload(i), timeout=30, headers={"Connection": "close"})
+
+    start = time.perf_counter()
+    await asyncio.to_thread(send_all)
+    return time.perf_counter() - start
+
+
+async def run_dispatcher(url: str, deliveries: int, workers: int):
+    from api.notifications import NotificationDispatcher, WebhookTarget
+
+    dispatcher = NotificationDispatcher(
+        workers=workers, queue_size=deliveries, max_attempts=5,
+        backoff_base=0.05, backoff_max=1.0, max_connections=100
+    )
+    await dispatcher.start()
+    target = WebhookTarget(1, url, 10, "token")
+    start = time.perf_counter()
+    for i in range(deliveries):
+        dispatcher.enqueue([target], payload(i))
+    while dispatcher.counters["delivered"] + dispatcher.counters["failed"] < deliveries:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    counters = dict(dispatcher.counters)
+    await dispatcher.stop()
+    return elapsed, counters
+
+
+async def run_storm(stand_in: StandIn, url: str, alerts: int, **limits):
+    """Tempestade de alertas para um único webhook; aguarda todas as entregas."""
+    from api.notifications import NotificationDispatcher, WebhookTarget
+
+    dispatcher = NotificationDispatcher(
+        workers=8, queue_size=alerts, max_attempts=5,
+        backoff_base=0.05, backoff_max=1.0, max_connections=100
+    )
+    await dispatcher.start()
+    target = WebhookTarget(1, url, 10, None, **limits)
+    stand_in.requests = stand_in.items = stand_in.peak = 0
+    start = time.perf_counter()
+    futures = [future for i in range(alerts) for future in dispatcher.submit([target], payload(i))]
+    results = await asyncio.gather(*futures)
+    elapsed = time.perf_counter() - start
+    counters = dict(dispatcher.counters)
+    await dispatcher.stop()
+    return elapsed, sum(1 for error in results if error is not None), counters
+
+
+async def main_async(args):
+    random.seed(1)
+    stand_in = StandIn(args.latency_ms / 1000, args.fail_rate)
+    runner, url = await start_stand_in(stand_in)
+    try:
+        sequential = min(args.deliveries, 500)
+        elapsed = await run_sequential(url, sequential)
+        print(f"{'sequencial (conexão por entrega)':<34} {sequential / elapsed:8.0f} entregas/s  "
+              f"conexões={len(stand_in.peers)}")
+
+        for workers in args.workers:
+            stand_in.peers.clear()
+            elapsed, counters = await run_dispatcher(url, args.deliveries, workers)
+            print(f"{f'dispatcher ({workers} workers)':<34} {args.deliveries / elapsed:8.0f} entregas/s  "
+                  f"conexões={len(stand_in.peers)}  entregues={counters['delivered']}  "
+                  f"repetidas={counters['retried']}  falhas={counters['failed']}")
+
+        stand_in.fail_rate = 0
+        scenarios = [
+            ("sem lote/limites", {}),
+            ("lote 100 / 500ms", {"batch_size": 100, "batch_wait_ms": 500}),
+            ("lote 100 + 2 simult. + 2 req/s", {"batch_size": 100, "batch_wait_ms": 500,
+                                                "max_concurrency": 2, "rate_limit": 2, "rate_burst": 2}),
+        ]
+        print(f"\nTempestade de {args.storm} alertas para um webhook:")
+        for name, limits in scenarios:
+            elapsed, failed, counters = await run_storm(stand_in, url, args.storm, **limits)
+            print(f"  {name:<32} requisições={stand_in.requests:5d}  alertas={stand_in.items}  "
+                  f"pico simultâneo={stand_in.peak:3d}  tempo={elapsed:5.2f}s  falhas={failed}  "
+                  f"adiadas(taxa)={counters['rate_limited']}")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=5000, help="Entregas por cenário do dispatcher")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Latência do webhook local")
+    parser.add_argument("--fail-rate", type=float, default=0.05, help="Fração de respostas 503")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32], help="Workers a testar")
+    parser.add_argument("--storm", type=int, default=1000, help="Alertas na tempestade com lote/limites")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
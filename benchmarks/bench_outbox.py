@@ -0,0 +1,186 @@
+"""
+Benchmark da outbox de notificações (api/outbox.py).
+
+Grava N alertas com record_alerts (alerta + evento na mesma transação) em um banco
+SQLite temporário e drena a notification_outbox com o OutboxRelay, entregando a um
+webhook local (aiohttp) com latência fixa. Mede eventos/s para algumas combinações de
+workers e tamanho de lote e confere a garantia at-least-once:
+- todos os alertas chegam ao webhook (perdidos=0) e a tabela termina vazia;
+- um lote reivindicado por um processo "morto" é entregue de novo após a expiração
+  da reivindicação (reclaimed);
+- dois relays (donos diferentes) drenando a mesma tabela não entregam a mesma linha duas vezes.
+
+Uso:
+    python benchmarks/bench_outbox.py [--events 5000] [--latency-ms 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class StandIn:
+    """Webhook local: registra o id de cada alerta recebido."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.received = Counter()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(self.latency)
+        self.received[body["alert"]["id"]] += 1
+        return web.json_response({"ok": True})
+
+
+async def start_stand_in(stand_in: StandIn):
+    app = web.Application()
+    app.router.add_post("/hook", stand_in.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/hook"
+
+
+def setup_database(database_url: str):
+    os.environ["DATABASE_URL"] = ""
+    os.environ["SQLITE_DATABASE_URL"] = database_url
+    from sqlalchemy import insert
+    from api.models import Base, db, Users
+
+    Base.metadata.create_all(db)
+    with db.begin() as conn:
+        conn.execute(insert(Users), [{"name": "bench", "email": "bench@local", "password": "x", "state": True, "access_level": "ADMIN"}])
+
+
+async def record(count: int, offset: int):
+    """Grava count alertas novos (e seus eventos na outbox) em transações de 500."""
+    from api.database import AsyncSessionLocal
+    from api.alert_dedup import record_alerts
+
+    async with AsyncSessionLocal() as session:
+        for start in range(0, count, 500):
+            await record_alerts(session, [
+                {"title": f"Alerta {offset + i}", "severity": "high", "category": "network",
+                 "system": f"srv-{offset + i}", "id_user_created": 1}
+                for i in range(start, min(count, start + 500))
+            ])
+            await session.commit()
+
+
+async def drain(relays, timeout: float = 120) -> float:
+    """Inicia os relays e aguarda a outbox esvaziar; retorna o tempo decorrido."""
+    from sqlalchemy import func, select
+    from api.database import AsyncSessionLocal
+    from api.models import NotificationOutbox
+
+    start = time.perf_counter()
+    for relay in relays:
+        relay.start(AsyncSessionLocal)
+    async with AsyncSessionLocal() as session:
+        while time.perf_counter() - start < timeout:
+            if not await session.scalar(select(func.count()).select_from(NotificationOutbox)):
+                break
+            await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    for relay in relays:
+        await relay.stop()
+    return elapsed
+
+
+def new_relay(workers: int, batch_size: int, claim_timeout: float = 300, owner: str = None):
+    from api.outbox import OutboxRelay
+
+    relay = OutboxRelay(workers=workers, batch_size=batch_size, max_inflight=8,
+                        poll_interval=0.05, claim_timeout=claim_timeout)
+    if owner:
+        relay.owner = owner
+    return relay
+
+
+async def main_async(args):
+    from sqlalchemy import insert, update
+    from api.database import AsyncSessionLocal, close_database
+    from api.models import NotificationOutbox, WebHookConfig
+    from api.notifications import notification_dispatcher
+
+    stand_in = StandIn(args.latency_ms / 1000)
+    runner, url = await start_stand_in(stand_in)
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(WebHookConfig), [{"url": url, "active": True, "timeout": 10}])
+        await session.commit()
+    await notification_dispatcher.start()
+
+    offset = 0
+    try:
+        for workers, batch_size in args.configs:
+            stand_in.received.clear()
+            await record(args.events, offset)
+            elapsed = await drain([new_relay(workers, batch_size)])
+            expected = range(offset + 1, offset + args.events + 1)
+            lost = sum(1 for alert_id in expected if alert_id not in stand_in.received)
+            print(f"{f'{workers} worker(s), lote {batch_size}':<26} {args.events / elapsed:8.0f} eventos/s  "
+                  f"perdidos={lost}  duplicados={sum(stand_in.received.values()) - len(stand_in.received)}")
+            offset += args.events
+
+        # Processo que caiu com um lote reivindicado: a reivindicação expira e o lote é reentregue
+        stand_in.received.clear()
+        await record(500, offset)
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(NotificationOutbox).where(NotificationOutbox.id_alert <= offset + 200)
+                .values(status="claimed", claimed_by="morto:1", claimed_at=datetime.now() - timedelta(seconds=10),
+                        attempts=1)
+            )
+            await session.commit()
+        relay = new_relay(2, 100, claim_timeout=5)
+        await drain([relay])
+        lost = sum(1 for alert_id in range(offset + 1, offset + 501) if alert_id not in stand_in.received)
+        print(f"{'reivindicação expirada':<26} reclaimed={relay.counters['reclaimed']}  perdidos={lost}")
+        offset += 500
+
+        # Dois processos drenando a mesma tabela
+        stand_in.received.clear()
+        await record(args.events, offset)
+        relays = [new_relay(2, 100, owner="a:1"), new_relay(2, 100, owner="b:2")]
+        elapsed = await drain(relays)
+        print(f"{'2 relays concorrentes':<26} {args.events / elapsed:8.0f} eventos/s  "
+              f"lotes={[r.counters['claimed'] for r in relays]}  "
+              f"duplicados={sum(stand_in.received.values()) - len(stand_in.received)}")
+    finally:
+        await notification_dispatcher.stop()
+        await runner.cleanup()
+        await close_database()
+
+
+def parse_config(value: str):
+    workers, batch_size = value.split("x")
+    return int(workers), int(batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000, help="Eventos por cenário")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Latência do webhook local")
+    parser.add_argument("--configs", type=parse_config, nargs="+", default=[(1, 50), (1, 200), (4, 200)],
+                        help="Combinações workers x lote (ex.: 4x200)")
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='infrawatch-bench-'), 'outbox.db')}"
+    setup_database(database_url)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
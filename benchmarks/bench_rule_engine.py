@@ -0,0 +1,145 @@
+"""
+Benchmark do motor de regras de alerta (api/rule_engine.py).
+
+Popula um banco com N endpoints (uma coleta cada) e R regras aleatórias e mede:
+compilação das regras, primeiro ciclo (carga das amostras + criação dos alertas),
+ciclos seguintes (apenas coletas novas) e a avaliação vetorizada isolada.
+Também confere que o segundo ciclo não cria alertas duplicados.
+
+Uso:
+    python benchmarks/bench_rule_engine.py [--endpoints 10000] [--rules 500] [--repeat 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# Comparações no formato típico de regras de monitoramento: (métrica, operador, faixa de limites)
+LEAVES = [
+    ("cpu", ">=", (90, 100)),
+    ("memory", ">=", (90, 100)),
+    ("storage", ">", (95, 100)),
+    ("ping_rtt", ">", (180, 200)),
+    ("snmp_rtt", ">", (180, 200)),
+    ("status", "==", (0, 0)),
+    ("if_oper_status", "!=", (1, 1)),
+    ("age_seconds", ">", (300, 900)),
+]
+
+
+def random_condition(depth: int = 0) -> dict:
+    """Gera uma condição aleatória com comparações simples e combinações all/any/not."""
+    kind = random.random()
+    if depth < 2 and kind < 0.3:
+        key = random.choice(["all", "any"])
+        return {key: [random_condition(depth + 1) for _ in range(random.randint(2, 3))]}
+    if depth < 2 and kind < 0.35:
+        return {"not": {"metric": "cpu", "operator": "<", "value": random.randint(95, 100)}}
+    metric, op, (low, high) = random.choice(LEAVES)
+    return {"metric": metric, "operator": op, "value": random.randint(low, high)}
+
+
+def seed(database_url: str, endpoints: int, rules: int):
+    os.environ["DATABASE_URL"] = ""
+    os.environ["SQLITE_DATABASE_URL"] = database_url
+    from sqlalchemy import insert
+    from api.models import Base, db, Users, EndPoints, EndPointsData, AlertRules
+
+    Base.metadata.create_all(db)
+    random.seed(7)
+    now = datetime.now()
+    with db.begin() as conn:
+        conn.execute(insert(Users), [{"name": "bench", "email": "bench@local", "password": "x", "state": True, "access_level": "ADMIN"}])
+        conn.execute(insert(EndPoints), [
+            {"ip": f"10.{i // 65536}.{i // 256 % 256}.{i % 256}", "nickname": f"bench-{i}", "interval": 60, "active": True, "id_user": 1}
+            for i in range(endpoints)
+        ])
+        conn.execute(insert(EndPointsData), [
+            {
+                "id_end_point": i + 1,
+                "status": random.random() > 0.01,
+                "hrProcessorLoad": str(min(100, int(random.expovariate(1 / 20)))),
+                "memTotalReal": "8000000",
+                "memAvailReal": str(int(8000000 * (1 - min(1.0, random.expovariate(1 / 0.3))))),
+                "hrStorageSize": "1000",
+                "hrStorageUsed": str(min(1000, int(random.expovariate(1 / 300)))),
+                "ifOperStatus": "2" if random.random() < 0.01 else "1",
+                "ping_rtt": str(random.expovariate(1 / 30)),
+                "snmp_rtt": str(random.expovariate(1 / 30)),
+                "last_updated": now,
+            }
+            for i in range(endpoints)
+        ])
+        conn.execute(insert(AlertRules), [
+            {
+                "name": f"Regra {i}",
+                "condition": json.dumps(random_condition()),
+                "severity": random.choice(["critical", "high", "medium", "low"]),
+                "category": "performance",
+                "is_active": True,
+                "id_user_created": 1,
+            }
+            for i in range(rules)
+        ])
+
+
+async def run(repeat: int):
+    from sqlalchemy import func, select
+    from api.database import AsyncSessionLocal, close_database
+    from api.models import Alerts
+    from api.rule_engine import AlertRuleEngine
+
+    engine = AlertRuleEngine()
+    async with AsyncSessionLocal() as session:
+        start = time.perf_counter()
+        await engine.sync_rules(session)
+        print(f"Compilação de {len(engine.rules)} regras: {(time.perf_counter() - start) * 1000:.1f}ms "
+              f"({len(engine.errors)} inválidas)")
+
+        first = await engine.run_cycle(session)
+        print(f"1º ciclo: {first}")
+        second = await engine.run_cycle(session)
+        print(f"2º ciclo: {second}")
+        total_alerts = await session.scalar(select(func.count()).select_from(Alerts))
+
+        cycles = [(await engine.run_cycle(session)) for _ in range(repeat)]
+        batch = await engine.load_batch(session)
+    await close_database()
+
+    evaluations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.evaluate(batch)
+        evaluations.append((time.perf_counter() - start) * 1000)
+
+    cycle_ms = [sum(cycle[key] for key in ("sync_ms", "load_ms", "evaluate_ms", "write_ms")) for cycle in cycles]
+    print(f"Alertas criados: {total_alerts} (duplicados no 2º ciclo: {second['alerts_created']})")
+    print(f"Avaliação ({len(engine.rules)} regras x {batch.size} endpoints): mediana={statistics.median(evaluations):.1f}ms")
+    print(f"Ciclo completo sem coletas novas: mediana={statistics.median(cycle_ms):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", type=int, default=10000, help="Quantidade de endpoints")
+    parser.add_argument("--rules", type=int, default=500, help="Quantidade de regras")
+    parser.add_argument("--repeat", type=int, default=20, help="Execuções medidas")
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='infrawatch-bench-'), 'rules.db')}"
+    print(f"Populando {database_url} com {args.endpoints} endpoints e {args.rules} regras...")
+    seed(database_url, args.endpoints, args.rules)
+    asyncio.run(run(args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Benchmark do stream de eventos (GET /stream/events) contra o polling dos dashboards.
+
+Sobe a API com uvicorn em um banco SQLite populado e, durante a mesma janela, compara:
+- polling: N clientes buscando /alerts/ e /monitor/status a cada --interval segundos;
+- SSE: N clientes conectados ao stream, enquanto alertas são criados/resolvidos e
+  endpoints mudam de status.
+Informa requisições, bytes recebidos e o tempo de CPU gasto pelo processo da API
+(lido de /proc, apenas Linux), e confere que um cliente que não consome a fila é
+desconectado (EventBroker em processo).
+
+Uso:
+    python benchmarks/bench_stream.py [--clients 200] [--interval 5] [--duration 20]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def seed_database(db_path: str, endpoints: int, alerts: int):
+    """Popula um banco SQLite com endpoints, uma coleta por endpoint e alertas."""
+    os.environ["DATABASE_URL"] = ""
+    os.environ["SQLITE_DATABASE_URL"] = f"sqlite:///{db_path}"
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+    from api.models import Base, db, Users, EndPoints, EndPointsData, Alerts
+    from api.encryption import bcrypt_context
+
+    Base.metadata.create_all(db)
+    now = datetime.now()
+    with Session(db) as session:
+        session.add(Users("bench", "bench@local", bcrypt_context.hash("bench"), True, None, "ADMIN", None))
+        session.flush()
+        session.bulk_insert_mappings(EndPoints, [
+            {"ip": f"10.0.{i // 250}.{i % 250}", "nickname": f"bench-{i}", "interval": 60, "active": True, "id_user": 1}
+            for i in range(endpoints)
+        ])
+        endpoint_ids = session.scalars(select(EndPoints.id)).all()
+        session.bulk_insert_mappings(EndPointsData, [
+            {"id_end_point": endpoint_id, "status": True, "ping_rtt": "1.0", "last_updated": now}
+            for endpoint_id in endpoint_ids
+        ])
+        session.bulk_insert_mappings(Alerts, [
+            {"title": f"Alerta {i}", "severity": "high", "status": "active", "category": "network",
+             "system": f"bench-{i % endpoints}", "impact": "medium", "id_user_created": 1,
+             "created_at": now, "updated_at": now, "occurrences": 1}
+            for i in range(alerts)
+        ])
+        session.commit()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def cpu_seconds(pid: int) -> float:
+    """Tempo de CPU (usuário + sistema) do processo, em segundos."""
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as client:
+        while time.monotonic() < deadline:
+            try:
+                async with client.get(base_url + "/") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("API não respondeu a tempo")
+
+
+async def poller(client, base_url, headers, interval, offset, deadline, totals):
+    await asyncio.sleep(offset)
+    while time.monotonic() < deadline:
+        for path in ("/alerts/?size=50", "/monitor/status"):
+            async with client.get(base_url + path, headers=headers) as response:
+                totals["bytes"] += len(await response.read())
+                totals["requests"] += 1
+        await asyncio.sleep(interval)
+
+
+async def listener(client, base_url, headers, totals, connected):
+    async with client.get(base_url + "/stream/events", headers=headers) as response:
+        totals["requests"] += 1
+        connected.append(1)
+        async for line in response.content:
+            totals["bytes"] += len(line)
+            if line.startswith(b"event:"):
+                totals["events"] += 1
+
+
+async def produce(client, base_url, headers, db_path, deadline, endpoints):
+    """Um alerta criado e resolvido e uma mudança de status por segundo."""
+    import sqlite3
+    step = 0
+    while time.monotonic() < deadline:
+        async with client.post(base_url + "/alerts/", headers=headers, json={
+            "title": f"Evento {step}", "severity": "high", "category": "network", "system": "bench"
+        }) as response:
+            alert_id = (await response.json())["id"]
+        async with client.post(base_url + f"/alerts/{alert_id}/actions", headers=headers, json={"action": "resolve"}):
+            pass
+        with sqlite3.connect(db_path) as connection:
+            connection.execute(
+                "INSERT INTO endpoints_data (id_end_point, status, last_updated) VALUES (?, ?, ?)",
+                (step % endpoints + 1, step % 2, datetime.now())
+            )
+        step += 1
+        await asyncio.sleep(1)
+
+
+async def run(base_url, pid, token, args, db_path):
+    headers = {"Authorization": f"Bearer {token}"}
+    await wait_ready(base_url)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=None)) as client:
+        totals = {"requests": 0, "bytes": 0, "events": 0}
+        start_cpu, deadline = cpu_seconds(pid), time.monotonic() + args.duration
+        await asyncio.gather(*[
+            poller(client, base_url, headers, args.interval, i * args.interval / args.clients, deadline, totals)
+            for i in range(args.clients)
+        ])
+        print(f"{'polling':<8} {args.clients} clientes  requisições={totals['requests']:6d}  "
+              f"recebido={totals['bytes'] / 1e6:8.2f} MB  CPU da API={cpu_seconds(pid) - start_cpu:6.2f}s")
+
+        totals = {"requests": 0, "bytes": 0, "events": 0}
+        connected = []
+        listeners = [asyncio.create_task(listener(client, base_url, headers, totals, connected))
+                     for _ in range(args.clients)]
+        while len(connected) < args.clients:
+            await asyncio.sleep(0.1)
+        start_cpu, deadline = cpu_seconds(pid), time.monotonic() + args.duration
+        await produce(client, base_url, headers, db_path, deadline, args.endpoints)
+        await asyncio.sleep(1)
+        cpu = cpu_seconds(pid) - start_cpu
+        async with client.get(base_url + "/stream/status", headers=headers) as response:
+            status = await response.json()
+        for task in listeners:
+            task.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+        print(f"{'SSE':<8} {args.clients} clientes  requisições={totals['requests']:6d}  "
+              f"recebido={totals['bytes'] / 1e6:8.2f} MB  CPU da API={cpu:6.2f}s  "
+              f"eventos/cliente={totals['events'] / args.clients:.0f}  publicados={status['published']}")
+
+
+def slow_consumer():
+    """Cliente que não consome a fila: é desconectado quando ela enche."""
+    from api.events import EventBroker
+
+    broker = EventBroker(queue_size=16, max_clients=10)
+    fast, slow = broker.subscribe(), broker.subscribe(["alert"])
+    for i in range(100):
+        broker.publish("alert.created", {"alert": {"id": i}})
+        while not fast.queue.empty():
+            fast.queue.get_nowait()
+    print(f"{'lento':<8} desconectado={slow.dropped}  clientes restantes={broker.snapshot()['clients']}  "
+          f"dropped_clients={broker.counters['dropped_clients']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="Dashboards abertos")
+    parser.add_argument("--interval", type=float, default=5, help="Intervalo do polling em segundos")
+    parser.add_argument("--duration", type=float, default=20, help="Duração de cada cenário em segundos")
+    parser.add_argument("--endpoints", type=int, default=200, help="Endpoints monitorados")
+    parser.add_argument("--alerts", type=int, default=2000, help="Alertas existentes")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="infrawatch-bench-"), "stream.db")
+    seed_database(db_path, args.endpoints, args.alerts)
+
+    from api.auth_routes import create_token
+    token = create_token(1)
+
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL="", SQLITE_DATABASE_URL=f"sqlite:///{db_path}",
+               STREAM_STATUS_INTERVAL="1", ALERT_ARCHIVE_INTERVAL="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--limit-concurrency", "10000"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        asyncio.run(run(f"http://127.0.0.1:{port}", server.pid, token, args, db_path))
+    finally:
+        server.terminate()
+        server.wait()
+    slow_consumer()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from api.models import Base, db, Users, get_database_url
 from api.encryption import bcrypt_context
+from api.oid_profiles import DEFAULT_OID_PROFILES, get_or_create_profile
 from sqlalchemy.orm import sessionmaker
 
 def init_database():
@@ -58,6 +59,12 @@ def init_database():
                 print("   ⚠️  ALTERE A SENHA EM PRODUÇÃO!")
             else:
                 print("👤 Usuário admin já existe")
+
+            # Perfis de OIDs padrão compartilhados pelos endpoints
+            for profile_name in DEFAULT_OID_PROFILES:
+                get_or_create_profile(session, profile_name)
+            session.commit()
+            print(f"📡 Perfis de OIDs disponíveis: {', '.join(DEFAULT_OID_PROFILES)}")
                 
         except Exception as e:
             print(f"⚠️ Erro ao criar dados iniciais: {e}")